@@ -2,7 +2,7 @@ from .core import *
 
 
 def setup_action_handlers():
-    return discover_actions(module_name="app.actions.handlers", prefix="action_")
+    return get_action_handlers(module_name="app.actions.handlers", prefix="action_")
 
 
-action_handlers = setup_action_handlers()
+action_handlers = LazyActionHandlers(module_name="app.actions.handlers", prefix="action_")
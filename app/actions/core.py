@@ -1,6 +1,8 @@
+import functools
 import importlib
 import inspect
-from typing import Optional
+from types import MappingProxyType
+from typing import Iterator, Mapping, Optional
 
 from pydantic import BaseModel
 from app.services.utils import UISchemaModelMixin
@@ -58,5 +60,34 @@ def discover_actions(module_name, prefix):
     return action_handlers
 
 
+@functools.lru_cache(maxsize=None)
+def get_action_handlers(module_name="app.actions.handlers", prefix="action_") -> Mapping:
+    # Discovered once per process, read-only so that callers can't change the registry
+    return MappingProxyType(discover_actions(module_name=module_name, prefix=prefix))
+
+
 def get_actions():
-    return list(discover_actions(module_name="app.actions.handlers", prefix="action_").keys())
+    return list(get_action_handlers().keys())
+
+
+class LazyActionHandlers(Mapping):
+    """
+    Action handlers discovered on first use instead of on import. Importing the handlers
+    pulls in the datasource clients, which is slow and not needed to start serving requests.
+    """
+
+    def __init__(self, module_name="app.actions.handlers", prefix="action_"):
+        self.module_name = module_name
+        self.prefix = prefix
+
+    def _get_handlers(self) -> Mapping:
+        return get_action_handlers(module_name=self.module_name, prefix=self.prefix)
+
+    def __getitem__(self, action_id):
+        return self._get_handlers()[action_id]
+
+    def __iter__(self) -> Iterator:
+        return iter(self._get_handlers())
+
+    def __len__(self) -> int:
+        return len(self._get_handlers())
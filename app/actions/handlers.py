@@ -1,11 +1,15 @@
+import asyncio
+import hashlib
+import json
 from datetime import date, datetime, timedelta, timezone
 import logging
-from typing import Dict, List
+from typing import Dict, Iterable, List, Optional
 
 import httpx
 from gundi_core.schemas.v2 import Integration, LogLevel
 from pyinaturalist import Observation
 
+from app import settings
 from app.actions.configurations import PullEventsConfig
 from app.services.activity_logger import activity_logger, log_action_activity
 from app.services.gundi import (
@@ -14,6 +18,7 @@ from app.services.gundi import (
     update_event_in_gundi,
 )
 from app.datasource.inaturalist import get_observations
+from app.services.locks import current_lease
 from app.services.state import IntegrationStateManager
 
 GUNDI_SUBMISSION_CHUNK_SIZE = 100
@@ -21,8 +26,16 @@ GUNDI_SUBMISSION_CHUNK_SIZE = 100
 # Pull-events state: single key for the cursor (legacy "updated_to" still read for backward compatibility)
 STATE_LAST_RUN_KEY = "last_run"
 STATE_DATETIME_FMT = "%Y-%m-%d %H:%M:%S%z"
+# Pull-events state: progress of an in-flight sliced backfill (absent once the backfill completes)
+STATE_BACKFILL_KEY = "backfill"
 # Per-observation state: when we last synced this observation to Gundi (so we only patch when it changes)
 STATE_INAT_UPDATED_AT_KEY = "inat_updated_at"
+# Per-observation state: hash of the Gundi event we last sent (so updates that change nothing we send are skipped)
+STATE_EVENT_HASH_KEY = "event_hash"
+# Per-observation state: hash of each field of the Gundi event we last sent (so patches only carry what changed)
+STATE_EVENT_FIELD_HASHES_KEY = "event_field_hashes"
+# event_details fields left out of the hashes: iNat bumps them for comments, faves, etc.
+EVENT_HASH_IGNORED_DETAILS = ("updated_at",)
 
 logger = logging.getLogger(__name__)
 state_manager = IntegrationStateManager()
@@ -36,9 +49,87 @@ def _get_load_since(state: dict, fallback_days: int) -> datetime:
     return datetime.now(tz=timezone.utc) - timedelta(days=fallback_days)
 
 
-def _build_pull_events_state(last_updated: datetime) -> dict:
+def _build_pull_events_state(last_updated: datetime, backfill: Optional[dict] = None) -> dict:
     """Build the state dict to persist after a pull_events run."""
-    return {STATE_LAST_RUN_KEY: last_updated.strftime(STATE_DATETIME_FMT)}
+    state = {STATE_LAST_RUN_KEY: last_updated.strftime(STATE_DATETIME_FMT)}
+    if backfill:
+        state[STATE_BACKFILL_KEY] = backfill
+    return state
+
+
+def _get_event_fields(event: dict) -> dict:
+    """JSON-compatible copy of a transformed Gundi event, without fields that change on every iNat update."""
+    event_details = {
+        key: value for key, value in event.get("event_details", {}).items()
+        if key not in EVENT_HASH_IGNORED_DETAILS
+    }
+    return json.loads(json.dumps({**event, "event_details": event_details}, default=str))
+
+
+def _get_hash(value) -> str:
+    return hashlib.sha1(json.dumps(value, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def _get_event_hash(event: dict) -> str:
+    """Stable hash of a transformed Gundi event, ignoring fields that change on every iNat update."""
+    return _get_hash(_get_event_fields(event))
+
+
+def _get_event_field_hashes(event: dict) -> dict:
+    """Hash of each top-level field of a transformed Gundi event, to tell which ones changed since we sent it."""
+    return {key: _get_hash(value) for key, value in _get_event_fields(event).items()}
+
+
+def _get_event_hashes(event: dict) -> tuple:
+    """(_get_event_hash(event), _get_event_field_hashes(event)), copying the event only once."""
+    fields = _get_event_fields(event)
+    return _get_hash(fields), {key: _get_hash(value) for key, value in fields.items()}
+
+
+def _get_event_patch(event: dict, field_hashes: Optional[dict], current_field_hashes: Optional[dict] = None) -> dict:
+    """
+    Return the top-level fields of event that changed since we last sent it, given the hashes of what we sent.
+    current_field_hashes are the hashes of event, if already computed.
+    Gundi replaces event_details as a whole rather than merging it, so it's always sent complete. It's included
+    in every patch to keep the fields left out of the hashes (e.g. updated_at) current.
+    Without hashes (legacy state) the whole event is returned.
+    """
+    if not field_hashes:
+        return event
+    if current_field_hashes is None:
+        current_field_hashes = _get_event_field_hashes(event)
+    patch = {
+        key: event[key] for key, value_hash in current_field_hashes.items()
+        if field_hashes.get(key) != value_hash
+    }
+    if patch and "event_details" in event:
+        patch["event_details"] = event["event_details"]
+    return patch
+
+
+def _get_backfill_slices(since: datetime, until: datetime, slice_size: timedelta) -> List[tuple]:
+    """
+    Split [since, until] into consecutive (start, end) windows of slice_size.
+    A final remainder shorter than half a slice is merged into the previous window.
+    """
+    slices = []
+    start = since
+    while start < until:
+        end = min(start + slice_size, until)
+        if slices and end - start < slice_size / 2:
+            slices[-1] = (slices[-1][0], end)
+        else:
+            slices.append((start, end))
+        start = end
+    return slices
+
+
+def _get_backfill_until(state: dict) -> Optional[datetime]:
+    """End of the backfill in progress, so that a retry keeps the same window and slice boundaries."""
+    backfill = state.get(STATE_BACKFILL_KEY) or {}
+    if backfill.get("until"):
+        return datetime.strptime(backfill["until"], STATE_DATETIME_FMT)
+    return None
 
 async def handle_transformed_data(transformed_data, integration_id, action_id):
     try:
@@ -72,43 +163,154 @@ async def action_pull_events(integration: Integration, action_config: PullEvents
     state = await state_manager.get_state(integration.id, "pull_events")
     load_since = _get_load_since(state, action_config.days_to_load)
 
+    now = datetime.now(tz=timezone.utc)
+    # Only a stored cursor can be far behind: without one, the window is days_to_load (7 days at most)
+    has_cursor = bool(state.get(STATE_LAST_RUN_KEY) or state.get("updated_to"))
+    if backfill_until := _get_backfill_until(state):
+        # Resume the backfill interrupted by a failure
+        return await backfill_pull_events(integration, action_config, load_since, backfill_until)
+    if has_cursor and now - load_since > timedelta(days=settings.INAT_BACKFILL_THRESHOLD_DAYS):
+        # Long catch-up (e.g. after an outage): fetch in time slices and commit them one by one
+        return await backfill_pull_events(integration, action_config, load_since, now)
+
     # Todo: write an async version of get_observations that uses httpx.AsyncClient to fetch the observations.
-    observations = get_observations(
-        load_since,
-        bounding_box=action_config.bounding_box,
-        taxa=action_config.taxa,
-        projects=action_config.projects,
-        quality_grade=action_config.quality_grade,
-        annotations=action_config.annotations,
-    )
+    observations = _fetch_observations(action_config, load_since)
 
     if not observations:
-        msg = f"No new iNaturalist observations to process for integration ID: {str(integration.id)}."
-        logger.info(msg)
-        await log_action_activity(
-            integration_id=integration.id,
-            action_id="pull_events",
-            level=LogLevel.WARNING,
-            title=msg,
-            data={"message": msg}
-        )
+        await _log_no_new_observations(integration)
         # Advance cursor so next run doesn't re-query the same window (avoids repeated heavy requests)
         now = datetime.now(tz=timezone.utc)
         await state_manager.set_state(
-            str(integration.id), "pull_events", _build_pull_events_state(now)
+            str(integration.id), "pull_events", _build_pull_events_state(now), lease=current_lease.get()
         )
         return {'result': {'events_extracted': 0,
                            'events_updated': 0,
                            'photos_attached': 0}}
 
+    async def checkpoint(last_updated):
+        logger.info("Updating state through %s", last_updated)
+        await state_manager.set_state(
+            str(integration.id), "pull_events", _build_pull_events_state(last_updated), lease=current_lease.get()
+        )
+
+    result = await process_observations(observations, action_config, integration, checkpoint=checkpoint)
+
+    return {'result': result}
+
+
+async def _log_no_new_observations(integration):
+    msg = f"No new iNaturalist observations to process for integration ID: {str(integration.id)}."
+    logger.info(msg)
+    await log_action_activity(
+        integration_id=integration.id,
+        action_id="pull_events",
+        level=LogLevel.WARNING,
+        title=msg,
+        data={"message": msg}
+    )
+
+
+async def backfill_pull_events(integration, action_config, load_since, load_until):
+    """
+    Load [load_since, load_until] in time slices. Slices are fetched in parallel (up to
+    INAT_BACKFILL_MAX_CONCURRENCY at a time) but processed and committed in order, so the
+    cursor always points at the end of the last finished slice. The end of the window is stored
+    with the cursor until the backfill completes, so a retry resumes it with the same slices.
+    """
+    slices = _get_backfill_slices(
+        load_since, load_until, timedelta(hours=settings.INAT_BACKFILL_SLICE_HOURS)
+    )
+    logger.info(
+        f"Backfilling iNaturalist observations from {load_since} to {load_until} "
+        f"in {len(slices)} slices for integration ID: {str(integration.id)}."
+    )
+    totals = {'events_extracted': 0, 'events_updated': 0, 'photos_attached': 0}
+    completed = 0
+    found_observations = False
+
+    async def checkpoint(last_updated):
+        await state_manager.set_state(
+            str(integration.id),
+            "pull_events",
+            _build_pull_events_state(
+                last_updated,
+                backfill={
+                    "until": load_until.strftime(STATE_DATETIME_FMT),
+                    "completed_slices": completed,
+                    "total_slices": len(slices),
+                } if completed < len(slices) else None
+            ),
+            lease=current_lease.get(),
+        )
+
+    for wave in chunk_list(slices, settings.INAT_BACKFILL_MAX_CONCURRENCY):
+        wave_observations = await asyncio.gather(*[
+            asyncio.to_thread(_fetch_observations, action_config, slice_start, slice_end)
+            for slice_start, slice_end in wave
+        ])
+        for (slice_start, slice_end), observations in zip(wave, wave_observations):
+            if observations:
+                found_observations = True
+                logger.info(f"Processing {len(observations)} observations from slice {slice_start} - {slice_end}.")
+                result = await process_observations(observations, action_config, integration, checkpoint=checkpoint)
+                for key, value in result.items():
+                    totals[key] += value
+            completed += 1
+            await checkpoint(slice_end)
+    if not found_observations:
+        await _log_no_new_observations(integration)
+    return {'result': totals}
+
+
+def _fetch_observations(action_config: PullEventsConfig, load_since: datetime, load_until: datetime = None):
+    return get_observations(
+        load_since,
+        until=load_until,
+        bounding_box=action_config.bounding_box,
+        taxa=action_config.taxa,
+        projects=action_config.projects,
+        quality_grade=action_config.quality_grade,
+        annotations=action_config.annotations,
+    )
+
+
+async def process_observations(observations, action_config, integration, checkpoint=None):
+    """
+    Create new observations as Gundi events and patch the ones that changed since the last sync.
+
+    Observations are handled in updated_at order, one chunk at a time. Once a chunk is fully
+    processed, checkpoint (if given) is awaited with the chunk's last updated_at, so the cursor
+    can be persisted and a run that dies midway resumes after the last completed chunk.
+    """
+
     logger.info(f"Processing {len(observations)} observations from iNaturalist.")
 
+    totals = {'events_extracted': 0, 'events_updated': 0, 'photos_attached': 0}
+    transformer = ObservationTransformer(action_config)
+    ordered_observations = sorted(observations.values(), key=lambda ob: ob.updated_at)
+    for i, chunk in enumerate(chunk_list(ordered_observations, GUNDI_SUBMISSION_CHUNK_SIZE)):
+
+        logger.info(f"Processing chunk #{i+1}")
+
+        result = await _process_observations_chunk(chunk, action_config, integration, transformer)
+        for key, value in result.items():
+            totals[key] += value
+
+        if checkpoint:
+            await checkpoint(chunk[-1].updated_at)
+
+    return totals
+
+
+async def _process_observations_chunk(observations, action_config, integration, transformer):
+
     async def get_inaturalist_events_to_patch():
         # Split observations into: new (create in Gundi) vs existing (patch only if observation changed).
         patch_these_events = []
         process_these_events = []
-        for event_id, observation in observations.items():
-            saved_event = await state_manager.get_state(str(integration.id), "pull_events", str(event_id))
+        saved_events = {}
+        for observation in observations:
+            saved_event = await state_manager.get_state(str(integration.id), "pull_events", str(observation.id))
             if not saved_event:
                 process_these_events.append(observation)
                 continue
@@ -127,30 +329,48 @@ async def action_pull_events(integration: Integration, action_config: PullEvents
                         continue  # Already in sync, skip patch
                 except (ValueError, TypeError):
                     pass  # Bad or legacy value, patch to be safe
+            saved_events[str(observation.id)] = saved_event
             patch_these_events.append((saved_event.get("object_id"), observation))
-        return process_these_events, patch_these_events
-
-    filtered_observations, events_to_patch = await get_inaturalist_events_to_patch()
+        return process_these_events, patch_these_events, saved_events
+
+    filtered_observations, events_to_patch, saved_events = await get_inaturalist_events_to_patch()
+    if not filtered_observations and not events_to_patch:
+        return {'events_extracted': 0, 'events_updated': 0, 'photos_attached': 0}
+
+    # Transform the chunk once; both new and patched events reuse these payloads
+    transformed_events = transformer.transform_many(filtered_observations)
+    transformed_events.update(transformer.transform_many(ob for _, ob in events_to_patch))
+    # Hashes of each event, persisted in the per-observation state once it is synced
+    sync_state = {}
+    for inat_id, event in transformed_events.items():
+        event_hash, field_hashes = _get_event_hashes(event)
+        sync_state[inat_id] = {
+            STATE_EVENT_HASH_KEY: event_hash,
+            STATE_EVENT_FIELD_HASHES_KEY: field_hashes,
+        }
 
-    events_to_process = []
+    # iNat bumps updated_at for comments, faves, etc. Only patch when what we send actually changed.
+    changed_events = [
+        (object_id, ob) for object_id, ob in events_to_patch
+        if saved_events[str(ob.id)].get(STATE_EVENT_HASH_KEY) != sync_state[str(ob.id)][STATE_EVENT_HASH_KEY]
+    ]
+    if len(changed_events) < len(events_to_patch):
+        logger.info(f"Skipping {len(events_to_patch) - len(changed_events)} updated observations with no changes to send.")
+    events_to_patch = changed_events
 
     updated_count = 0
     added_count = 0
     attachment_count = 0
 
     if filtered_observations:
+        events_to_process = []
         all_event_photos = {}
         inat_updated_at_map = {}  # inat_id -> updated_at for state we persist after create
-        newest = None
         for ob in filtered_observations:
 
-            if(not newest or (newest < ob.created_at)):
-                newest = ob.created_at
-
-            e = _transform_inat_to_gundi_event(ob, action_config)
-            events_to_process.append(e)
+            inat_id = str(ob.id)
+            events_to_process.append(transformed_events[inat_id])
 
-            inat_id = e['event_details']['inat_id']
             inat_updated_at_map[inat_id] = ob.updated_at
             all_event_photos[inat_id] = []
             for photo in ob.photos:
@@ -158,40 +378,36 @@ async def action_pull_events(integration: Integration, action_config: PullEvents
 
         logger.info(f"Submitting {len(events_to_process)} iNaturalist observations to Gundi")
 
-        for i, to_add_chunk in enumerate(chunk_list(events_to_process, GUNDI_SUBMISSION_CHUNK_SIZE)):
+        response = await send_events_to_gundi(events=events_to_process, integration_id=str(integration.id))
+        added_count += len(response)
 
-            logger.info(f"Processing chunk #{i+1}")
-
-            response = await send_events_to_gundi(events=to_add_chunk, integration_id=str(integration.id))
-            added_count += len(response)
-
-            if response:
-                # Send images as attachments (if available)
-                if action_config.include_photos:
-                    attachments_response = await process_attachments(to_add_chunk, response, all_event_photos, integration)
-                    attachment_count += attachments_response
-                # Process events to patch
-                await save_events_state(response, to_add_chunk, integration, inat_updated_at_map)
-
-    else:
-        logger.info(f"No new iNaturalist observations to process for integration ID: {str(integration.id)}.")
+        if response:
+            # Send images as attachments (if available)
+            if action_config.include_photos:
+                attachments_response = await process_attachments(events_to_process, response, all_event_photos, integration)
+                attachment_count += attachments_response
+            # Process events to patch
+            await save_events_state(response, events_to_process, integration, inat_updated_at_map, sync_state)
 
     if events_to_patch:
         # Process events to patch
         logger.info(f"Updating {len(events_to_patch)} events from iNaturalist observations to Gundi for integration ID: {str(integration.id)}.")
-        response = await patch_events(events_to_patch, action_config, integration)
+        # Send only the fields that changed since the last sync
+        event_patches = {
+            str(ob.id): _get_event_patch(
+                transformed_events[str(ob.id)],
+                saved_events[str(ob.id)].get(STATE_EVENT_FIELD_HASHES_KEY),
+                sync_state[str(ob.id)][STATE_EVENT_FIELD_HASHES_KEY],
+            )
+            for _, ob in events_to_patch
+        }
+        response = await patch_events(events_to_patch, action_config, integration, event_patches)
         updated_count += len(response)
-        await save_patched_events_state(events_to_patch, integration)
+        await save_patched_events_state(events_to_patch, integration, sync_state)
 
-    last_updated = max(ob.updated_at for ob in observations.values())
-    logger.info("Updating state through %s", last_updated)
-    await state_manager.set_state(
-        str(integration.id), "pull_events", _build_pull_events_state(last_updated)
-    )
-        
-    return {'result': {'events_extracted': added_count,
-                       'events_updated': updated_count,
-                       'photos_attached': attachment_count}}
+    return {'events_extracted': added_count,
+            'events_updated': updated_count,
+            'photos_attached': attachment_count}
 
 
 async def process_attachments(events, response, all_event_photos, integration):
@@ -249,12 +465,21 @@ async def process_attachments(events, response, all_event_photos, integration):
     return attachments_processed
 
 
-async def patch_events(events, updated_config_data, integration):
+async def patch_events(events, updated_config_data, integration, transformed_events=None):
+    """
+    Patch existing Gundi events. transformed_events (inat_id -> Gundi event) lets callers
+    reuse payloads they already built; missing ones are transformed here.
+    """
+    transformed_events = transformed_events or {}
+    transformer = None
     responses = []
     for event in events:
         gundi_object_id = event[0]
         new_event = event[1]
-        transformed_data = _transform_inat_to_gundi_event(new_event, updated_config_data)
+        transformed_data = transformed_events.get(str(new_event.id))
+        if transformed_data is None:
+            transformer = transformer or ObservationTransformer(updated_config_data)
+            transformed_data = transformer.transform(new_event)
         if transformed_data:
             response = await update_event_in_gundi(
                 event_id=gundi_object_id,
@@ -265,9 +490,13 @@ async def patch_events(events, updated_config_data, integration):
     return responses
 
 
-async def save_events_state(response, events, integration, inat_updated_at_map=None):
-    """Persist Gundi event state per observation so we know what we created and when we last synced."""
+async def save_events_state(response, events, integration, inat_updated_at_map=None, sync_state=None):
+    """
+    Persist Gundi event state per observation so we know what we created and when we last synced.
+    sync_state (inat_id -> dict) holds extra fields to store, such as the event hashes.
+    """
     inat_updated_at_map = inat_updated_at_map or {}
+    sync_state = sync_state or {}
     for saved_event, event in zip(response, events):
         try:
             event_id = event["event_details"]["inat_id"]
@@ -278,11 +507,13 @@ async def save_events_state(response, events, integration, inat_updated_at_map=N
                     updated_at.strftime(STATE_DATETIME_FMT)
                     if hasattr(updated_at, "strftime") else str(updated_at)
                 )
+            state.update(sync_state.get(event_id, {}))
             await state_manager.set_state(
                 integration_id=str(integration.id),
                 action_id="pull_events",
                 state=state,
-                source_id=event_id
+                source_id=event_id,
+                lease=current_lease.get(),
             )
         except Exception as e:
             inat_id = event.get("event_details", {}).get("inat_id", "unknown")
@@ -294,8 +525,9 @@ async def save_events_state(response, events, integration, inat_updated_at_map=N
             raise e
 
 
-async def save_patched_events_state(events_to_patch, integration):
+async def save_patched_events_state(events_to_patch, integration, sync_state=None):
     """After patching, update per-observation state so we don't patch again until the observation changes."""
+    sync_state = sync_state or {}
     for gundi_object_id, observation in events_to_patch:
         try:
             updated_at = observation.updated_at
@@ -306,11 +538,13 @@ async def save_patched_events_state(events_to_patch, integration):
                     if hasattr(updated_at, "strftime") else str(updated_at)
                 ),
             }
+            state.update(sync_state.get(str(observation.id), {}))
             await state_manager.set_state(
                 integration_id=str(integration.id),
                 action_id="pull_events",
                 state=state,
                 source_id=str(observation.id),
+                lease=current_lease.get(),
             )
         except Exception as e:
             logger.exception(
@@ -333,12 +567,21 @@ def _normalize_recorded_at(observed_on, created_at):
     return observed_on
 
 
-def _transform_inat_to_gundi_event(ob: Observation, config: PullEventsConfig):
-    
-    event = {
-        "event_type": config.event_type,
-        "recorded_at": _normalize_recorded_at(ob.observed_on, ob.created_at),
-        "event_details": {
+class ObservationTransformer:
+    """
+    Turns iNaturalist observations into Gundi events for one PullEventsConfig.
+
+    Everything that depends only on the configuration (event type, title prefix and the
+    fallback title) is computed once here instead of for every observation.
+    """
+
+    def __init__(self, config: PullEventsConfig):
+        self.event_type = config.event_type
+        self.event_prefix = config.event_prefix or ""
+        self.unknown_title = self.event_prefix + "Unknown"
+
+    def transform(self, ob: Observation) -> dict:
+        event_details = {
             "inat_id": str(ob.id),
             "captive": ob.captive,
             "location_obscured": ob.obscured,
@@ -349,38 +592,52 @@ def _transform_inat_to_gundi_event(ob: Observation, config: PullEventsConfig):
             "updated_at": ob.updated_at,
             "inat_url": ob.uri
         }
-    }
-
-    if(ob.user):
-        event['event_details']['user_id'] = ob.user.id
-        event['event_details']['user_name'] = ob.user.name if ob.user.name else ob.user.login
-
-    if(ob.location):
-        event["location"] = {
-            "lat": ob.location[0],
-            "lon": ob.location[1] }
-
-    if ob.place_ids:
-        event["event_details"]["place_ids"] = ",".join(str(pid) for pid in ob.place_ids)
-
-    if(ob.taxon):
-        event["event_details"].update({
-            "taxon_id": ob.taxon.id,
-            "taxon_rank": ob.taxon.rank,
-            "taxon_name": ob.taxon.name,
-            "taxon_common_name": ob.taxon.preferred_common_name,
-            "taxon_wikipedia_url": ob.taxon.wikipedia_url,
-            "taxon_conservation_status": ob.taxon.conservation_status
-        })
-
-        if(ob.taxon.preferred_common_name):
-            event["title"] = ob.taxon.preferred_common_name
-        if ob.taxon.ancestor_ids:
-            event["event_details"]["taxon_ancestors"] = ",".join(str(aid) for aid in ob.taxon.ancestor_ids)
+        event = {
+            "event_type": self.event_type,
+            "recorded_at": _normalize_recorded_at(ob.observed_on, ob.created_at),
+            "event_details": event_details
+        }
 
-    if(not event.get("title")):
-        event["title"] = "Unknown" if not ob.species_guess else ob.species_guess
+        user = ob.user
+        if user:
+            event_details["user_id"] = user.id
+            event_details["user_name"] = user.name or user.login
+
+        location = ob.location
+        if location:
+            event["location"] = {"lat": location[0], "lon": location[1]}
+
+        if ob.place_ids:
+            event_details["place_ids"] = ",".join(map(str, ob.place_ids))
+
+        title = None
+        taxon = ob.taxon
+        if taxon:
+            common_name = taxon.preferred_common_name
+            event_details["taxon_id"] = taxon.id
+            event_details["taxon_rank"] = taxon.rank
+            event_details["taxon_name"] = taxon.name
+            event_details["taxon_common_name"] = common_name
+            event_details["taxon_wikipedia_url"] = taxon.wikipedia_url
+            event_details["taxon_conservation_status"] = taxon.conservation_status
+            title = common_name
+            if taxon.ancestor_ids:
+                event_details["taxon_ancestors"] = ",".join(map(str, taxon.ancestor_ids))
+
+        if title:
+            event["title"] = self.event_prefix + title
+        elif ob.species_guess:
+            event["title"] = self.event_prefix + ob.species_guess
+        else:
+            event["title"] = self.unknown_title
+
+        return event
+
+    def transform_many(self, observations: Iterable[Observation]) -> Dict[str, dict]:
+        """Transform a whole page of observations. Returns a dict of inat_id -> Gundi event."""
+        transform = self.transform
+        return {str(ob.id): transform(ob) for ob in observations}
 
-    event["title"] = config.event_prefix + event["title"]
 
-    return event
\ No newline at end of file
+def _transform_inat_to_gundi_event(ob: Observation, config: PullEventsConfig):
+    return ObservationTransformer(config).transform(ob)
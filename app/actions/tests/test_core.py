@@ -0,0 +1,57 @@
+import subprocess
+import sys
+
+import pytest
+
+from app.actions.core import discover_actions, get_action_handlers, get_actions, LazyActionHandlers
+from app.webhooks.core import get_webhook_handler, GenericJsonPayload, GenericJsonTransformConfig
+
+
+def test_action_handlers_are_discovered_once(mocker):
+    get_action_handlers.cache_clear()
+    mock_discover_actions = mocker.patch("app.actions.core.discover_actions", wraps=discover_actions)
+
+    actions = get_actions()
+
+    assert get_actions() == actions
+    assert "pull_events" in actions
+    assert mock_discover_actions.call_count == 1
+    get_action_handlers.cache_clear()
+
+
+def test_action_handlers_registry_is_read_only():
+    with pytest.raises(TypeError):
+        get_action_handlers()["new_action"] = None
+
+
+def test_lazy_action_handlers_are_discovered_on_first_use(mocker):
+    mock_get_action_handlers = mocker.patch(
+        "app.actions.core.get_action_handlers", return_value={"pull_events": ("handler", "config")}
+    )
+    action_handlers = LazyActionHandlers(module_name="app.actions.handlers", prefix="action_")
+    assert not mock_get_action_handlers.called
+
+    assert action_handlers["pull_events"] == ("handler", "config")
+    assert list(action_handlers.items()) == [("pull_events", ("handler", "config"))]
+    mock_get_action_handlers.assert_called_with(module_name="app.actions.handlers", prefix="action_")
+
+
+def test_app_starts_without_importing_the_action_handlers():
+    code = "import sys, app.main; print('app.actions.handlers' in sys.modules, 'pyinaturalist' in sys.modules)"
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+
+    assert result.stdout.split() == ["False", "False"]
+
+
+def test_webhook_handler_is_resolved_once(mocker):
+    async def webhook_handler(payload: GenericJsonPayload, integration=None, webhook_config: GenericJsonTransformConfig = None):
+        pass
+
+    get_webhook_handler.cache_clear()
+    mock_import_module = mocker.patch("app.webhooks.core.importlib.import_module")
+    mock_import_module.return_value.webhook_handler = webhook_handler
+
+    assert get_webhook_handler() == (webhook_handler, GenericJsonPayload, GenericJsonTransformConfig)
+    assert get_webhook_handler() == (webhook_handler, GenericJsonPayload, GenericJsonTransformConfig)
+    assert mock_import_module.call_count == 1
+    get_webhook_handler.cache_clear()
@@ -10,13 +10,23 @@ from app.actions.handlers import (
     STATE_DATETIME_FMT,
     STATE_LAST_RUN_KEY,
     STATE_INAT_UPDATED_AT_KEY,
+    STATE_BACKFILL_KEY,
+    STATE_EVENT_HASH_KEY,
+    STATE_EVENT_FIELD_HASHES_KEY,
+    _get_event_hash,
+    _get_event_patch,
+    _get_event_field_hashes,
+    _get_event_hashes,
     _build_pull_events_state,
+    _get_backfill_slices,
     _get_load_since,
     _normalize_recorded_at,
     _transform_inat_to_gundi_event,
+    ObservationTransformer,
     action_pull_events,
     chunk_list,
     handle_transformed_data,
+    patch_events,
 )
 from app.actions.configurations import PullEventsConfig
 
@@ -67,6 +77,43 @@ def test_build_pull_events_state():
     assert parsed == dt
 
 
+def test_build_pull_events_state_with_backfill_progress():
+    dt = datetime(2024, 6, 1, 12, 0, 0, tzinfo=timezone.utc)
+    progress = {"until": "2024-06-30 00:00:00+0000", "completed_slices": 3, "total_slices": 29}
+    result = _build_pull_events_state(dt, backfill=progress)
+    assert result[STATE_LAST_RUN_KEY] == "2024-06-01 12:00:00+0000"
+    assert result[STATE_BACKFILL_KEY] == progress
+
+
+# --- _get_backfill_slices ---
+
+
+def test_get_backfill_slices_covers_window_without_gaps():
+    since = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    until = datetime(2024, 1, 3, 12, tzinfo=timezone.utc)
+    slices = _get_backfill_slices(since, until, timedelta(days=1))
+    assert slices == [
+        (since, datetime(2024, 1, 2, tzinfo=timezone.utc)),
+        (datetime(2024, 1, 2, tzinfo=timezone.utc), datetime(2024, 1, 3, tzinfo=timezone.utc)),
+        (datetime(2024, 1, 3, tzinfo=timezone.utc), until),
+    ]
+
+
+def test_get_backfill_slices_merges_short_remainder():
+    since = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    until = datetime(2024, 1, 3, 0, 0, 1, tzinfo=timezone.utc)
+    slices = _get_backfill_slices(since, until, timedelta(days=1))
+    assert slices == [
+        (since, datetime(2024, 1, 2, tzinfo=timezone.utc)),
+        (datetime(2024, 1, 2, tzinfo=timezone.utc), until),
+    ]
+
+
+def test_get_backfill_slices_empty_window():
+    since = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    assert _get_backfill_slices(since, since, timedelta(days=1)) == []
+
+
 # --- chunk_list ---
 
 
@@ -204,6 +251,40 @@ def test_transform_inat_to_gundi_event_title_fallback_to_species_guess():
     assert event["title"] == "Unknown Bird"
 
 
+def test_observation_transformer_transform_many_matches_single_transform():
+    config = PullEventsConfig(days_to_load=3, event_prefix="iNat: ")
+    observations = [
+        _make_observation(id_=1),
+        _make_observation(id_=2, species_guess=None),
+        _make_observation(
+            id_=3,
+            taxon={"id": 5, "rank": "species", "name": "Spp", "preferred_common_name": "Common"},
+        ),
+    ]
+    events = ObservationTransformer(config).transform_many(observations)
+    assert list(events.keys()) == ["1", "2", "3"]
+    for ob in observations:
+        assert events[str(ob.id)] == _transform_inat_to_gundi_event(ob, config)
+    assert events["2"]["title"] == "iNat: Unknown"
+    assert events["3"]["title"] == "iNat: Common"
+
+
+@pytest.mark.asyncio
+async def test_patch_events_reuses_transformed_payloads(mocker):
+    mock_update = mocker.patch("app.actions.handlers.update_event_in_gundi", AsyncMock(return_value={}))
+    mock_transform = mocker.patch.object(ObservationTransformer, "transform")
+    integration = MagicMock()
+    ob = _make_observation(id_=7)
+    payload = {"title": "already transformed"}
+
+    await patch_events([("gundi-7", ob)], PullEventsConfig(days_to_load=3), integration, {"7": payload})
+
+    mock_transform.assert_not_called()
+    mock_update.assert_awaited_once_with(
+        event_id="gundi-7", event=payload, integration_id=str(integration.id)
+    )
+
+
 # --- action_pull_events: no observations path (state still updated) ---
 
 
@@ -238,6 +319,129 @@ async def test_action_pull_events_no_observations_updates_state(mocker):
     assert parsed.tzinfo is not None
 
 
+@pytest.mark.asyncio
+async def test_action_pull_events_first_run_with_max_days_to_load_does_not_backfill(mocker):
+    from uuid import UUID
+
+    mock_state = AsyncMock()
+    mock_state.get_state.return_value = {}
+    mocker.patch("app.actions.handlers.state_manager", mock_state)
+    mock_get_observations = mocker.patch("app.actions.handlers.get_observations", return_value={})
+    mock_log_activity = mocker.patch("app.actions.handlers.log_action_activity", AsyncMock())
+    mocker.patch("app.services.activity_logger.publish_event", AsyncMock())
+
+    integration = MagicMock()
+    integration.id = UUID("f03ec73e-f3fe-41b6-8597-3eb89dde5ae1")
+    config = PullEventsConfig(days_to_load=7, event_prefix="iNat: ")
+
+    await action_pull_events(integration, config)
+
+    mock_get_observations.assert_called_once()
+    mock_log_activity.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_action_pull_events_resumes_backfill_with_the_same_window(mocker):
+    from uuid import UUID
+
+    cursor = datetime(2024, 1, 5, tzinfo=timezone.utc)
+    until = datetime(2024, 1, 8, tzinfo=timezone.utc)
+    mock_state = AsyncMock()
+    mock_state.get_state.return_value = {
+        STATE_LAST_RUN_KEY: cursor.strftime(STATE_DATETIME_FMT),
+        STATE_BACKFILL_KEY: {"until": until.strftime(STATE_DATETIME_FMT), "completed_slices": 4, "total_slices": 7},
+    }
+    mocker.patch("app.actions.handlers.state_manager", mock_state)
+    mock_get_observations = mocker.patch("app.actions.handlers.get_observations", return_value={})
+    mocker.patch("app.actions.handlers.log_action_activity", AsyncMock())
+    mocker.patch("app.services.activity_logger.publish_event", AsyncMock())
+    mocker.patch("app.actions.handlers.settings.INAT_BACKFILL_SLICE_HOURS", 24)
+
+    integration = MagicMock()
+    integration.id = UUID("f03ec73e-f3fe-41b6-8597-3eb89dde5ae1")
+    config = PullEventsConfig(days_to_load=3, event_prefix="iNat: ")
+
+    await action_pull_events(integration, config)
+
+    windows = [(c.args[0], c.kwargs["until"]) for c in mock_get_observations.call_args_list]
+    assert windows == [(cursor + timedelta(days=i), cursor + timedelta(days=i + 1)) for i in range(3)]
+    final_state = mock_state.set_state.call_args_list[-1][0][2]
+    assert final_state[STATE_LAST_RUN_KEY] == until.strftime(STATE_DATETIME_FMT)
+    assert STATE_BACKFILL_KEY not in final_state
+
+
+@pytest.mark.asyncio
+async def test_action_pull_events_long_window_backfills_in_slices(mocker):
+    from uuid import UUID
+
+    since = datetime.now(tz=timezone.utc) - timedelta(days=10, minutes=-1)
+    mock_state = AsyncMock()
+    mock_state.get_state.return_value = {STATE_LAST_RUN_KEY: since.strftime(STATE_DATETIME_FMT)}
+    mocker.patch("app.actions.handlers.state_manager", mock_state)
+    mock_get_observations = mocker.patch("app.actions.handlers.get_observations", return_value={})
+    mocker.patch("app.actions.handlers.log_action_activity", AsyncMock())
+    mocker.patch("app.services.activity_logger.publish_event", AsyncMock())
+    mocker.patch("app.actions.handlers.settings.INAT_BACKFILL_SLICE_HOURS", 24)
+
+    integration = MagicMock()
+    integration.id = UUID("f03ec73e-f3fe-41b6-8597-3eb89dde5ae1")
+    config = PullEventsConfig(days_to_load=3, event_prefix="iNat: ")
+
+    result = await action_pull_events(integration, config)
+
+    assert result["result"]["events_extracted"] == 0
+    # One fetch per day-long slice, each bounded on both sides
+    assert mock_get_observations.call_count == 10
+    for c in mock_get_observations.call_args_list:
+        assert c.kwargs["until"] is not None
+    # The cursor is committed after every slice, and the progress marker is dropped at the end
+    assert mock_state.set_state.call_count == 10
+    states = [c[0][2] for c in mock_state.set_state.call_args_list]
+    assert states[0][STATE_BACKFILL_KEY]["completed_slices"] == 1
+    assert states[0][STATE_BACKFILL_KEY]["total_slices"] == 10
+    assert STATE_BACKFILL_KEY not in states[-1]
+    cursors = [datetime.strptime(st[STATE_LAST_RUN_KEY], STATE_DATETIME_FMT) for st in states]
+    assert cursors == sorted(cursors)
+
+
+@pytest.mark.asyncio
+async def test_action_pull_events_checkpoints_cursor_after_each_chunk(mocker):
+    from uuid import UUID
+
+    base = datetime(2024, 6, 15, 12, 0, 0, tzinfo=timezone.utc)
+    # Deliberately out of order: chunks are built in updated_at order
+    observations_map = {
+        i: _make_observation(id_=i, updated_at=base + timedelta(minutes=i))
+        for i in (3, 1, 2)
+    }
+    mock_state = AsyncMock()
+    mock_state.get_state.return_value = {}
+    mocker.patch("app.actions.handlers.state_manager", mock_state)
+    mocker.patch("app.actions.handlers.get_observations", return_value=observations_map)
+    mocker.patch("app.services.activity_logger.publish_event", AsyncMock())
+    mocker.patch("app.actions.handlers.GUNDI_SUBMISSION_CHUNK_SIZE", 2)
+    mock_send = mocker.patch(
+        "app.actions.handlers.send_events_to_gundi",
+        AsyncMock(side_effect=[[{"object_id": "a"}, {"object_id": "b"}], RuntimeError("Gundi is down")]),
+    )
+
+    integration = MagicMock()
+    integration.id = UUID("f03ec73e-f3fe-41b6-8597-3eb89dde5ae1")
+    config = PullEventsConfig(days_to_load=3, event_prefix="iNat: ", include_photos=False)
+
+    with pytest.raises(RuntimeError):
+        await action_pull_events(integration, config)
+
+    first_chunk_ids = [e["event_details"]["inat_id"] for e in mock_send.call_args_list[0].kwargs["events"]]
+    assert first_chunk_ids == ["1", "2"]
+    cursor_updates = [
+        c.args[2] for c in mock_state.set_state.call_args_list
+        if len(c.args) > 2 and STATE_LAST_RUN_KEY in c.args[2]
+    ]
+    # Only the first chunk completed, so the cursor stops at its last observation
+    assert cursor_updates == [_build_pull_events_state(base + timedelta(minutes=2))]
+
+
 # --- handle_transformed_data ---
 
 
@@ -306,6 +510,138 @@ async def test_action_pull_events_skips_patch_when_observation_already_in_sync(m
     mock_patch_events.assert_not_called()
 
 
+def test_get_event_hash_ignores_inat_updated_at():
+    config = PullEventsConfig(days_to_load=3, event_prefix="iNat: ")
+    ob = _make_observation(updated_at=datetime(2024, 6, 1, tzinfo=timezone.utc))
+    bumped = _make_observation(updated_at=datetime(2024, 6, 2, tzinfo=timezone.utc))
+    regraded = _make_observation(quality_grade="needs_id")
+    assert _get_event_hash(_transform_inat_to_gundi_event(ob, config)) == \
+        _get_event_hash(_transform_inat_to_gundi_event(bumped, config))
+    assert _get_event_hash(_transform_inat_to_gundi_event(ob, config)) != \
+        _get_event_hash(_transform_inat_to_gundi_event(regraded, config))
+
+
+@pytest.mark.asyncio
+async def test_action_pull_events_skips_patch_when_event_content_unchanged(mocker):
+    """updated_at moved forward (e.g. a new comment) but the event we would send is identical."""
+    from uuid import UUID
+
+    config = PullEventsConfig(days_to_load=3, event_prefix="iNat: ")
+    synced = _make_observation(id_=999, updated_at=datetime(2024, 6, 1, tzinfo=timezone.utc))
+    commented = _make_observation(id_=999, updated_at=datetime(2024, 6, 15, tzinfo=timezone.utc))
+
+    async def get_state_side_effect(integration_id, action_id, source_id="no-source"):
+        if source_id == "999":
+            return {
+                "object_id": "gundi-uuid-999",
+                STATE_INAT_UPDATED_AT_KEY: "2024-06-01 00:00:00+0000",
+                STATE_EVENT_HASH_KEY: _get_event_hash(_transform_inat_to_gundi_event(synced, config)),
+            }
+        return {}
+
+    mock_state = AsyncMock()
+    mock_state.get_state.side_effect = get_state_side_effect
+    mocker.patch("app.actions.handlers.state_manager", mock_state)
+    mocker.patch("app.actions.handlers.get_observations", return_value={999: commented})
+    mocker.patch("app.services.activity_logger.publish_event", AsyncMock())
+    mock_update = mocker.patch("app.actions.handlers.update_event_in_gundi", new_callable=AsyncMock)
+
+    integration = MagicMock()
+    integration.id = UUID("f03ec73e-f3fe-41b6-8597-3eb89dde5ae1")
+
+    result = await action_pull_events(integration, config)
+
+    assert result["result"]["events_updated"] == 0
+    mock_update.assert_not_called()
+
+
+def test_get_event_patch_without_snapshot_sends_full_event():
+    event = _transform_inat_to_gundi_event(_make_observation(), PullEventsConfig(days_to_load=3))
+    assert _get_event_patch(event, None) is event
+
+
+def test_get_event_patch_sends_only_changed_fields():
+    config = PullEventsConfig(days_to_load=3, event_prefix="iNat: ")
+    sent = _transform_inat_to_gundi_event(_make_observation(location=[1.0, 2.0]), config)
+    regraded_at = datetime(2024, 7, 1, tzinfo=timezone.utc)
+    event = _transform_inat_to_gundi_event(
+        _make_observation(location=[1.0, 2.0], quality_grade="needs_id", updated_at=regraded_at), config
+    )
+
+    patch = _get_event_patch(event, _get_event_field_hashes(sent))
+
+    assert patch == {"event_details": event["event_details"]}
+    assert patch["event_details"]["quality_grade"] == "needs_id"
+    assert patch["event_details"]["updated_at"] == regraded_at
+
+
+def test_get_event_patch_no_changes_is_empty():
+    config = PullEventsConfig(days_to_load=3, event_prefix="iNat: ")
+    event = _transform_inat_to_gundi_event(_make_observation(), config)
+    assert _get_event_patch(event, _get_event_field_hashes(event)) == {}
+
+
+def test_get_event_hashes_copies_the_event_once(mocker):
+    from app.actions import handlers
+    event = _transform_inat_to_gundi_event(_make_observation(), PullEventsConfig(days_to_load=3))
+    expected = (_get_event_hash(event), _get_event_field_hashes(event))
+    get_event_fields = mocker.spy(handlers, "_get_event_fields")
+
+    assert _get_event_hashes(event) == expected
+    get_event_fields.assert_called_once_with(event)
+
+
+@pytest.mark.asyncio
+async def test_action_pull_events_patches_only_changed_fields(mocker):
+    from uuid import UUID
+
+    config = PullEventsConfig(days_to_load=3, event_prefix="iNat: ")
+    synced = _make_observation(id_=999, updated_at=datetime(2024, 6, 1, tzinfo=timezone.utc))
+    retitled = _make_observation(
+        id_=999, species_guess="Another species", updated_at=datetime(2024, 6, 15, tzinfo=timezone.utc)
+    )
+    synced_event = _transform_inat_to_gundi_event(synced, config)
+
+    async def get_state_side_effect(integration_id, action_id, source_id="no-source"):
+        if source_id == "999":
+            return {
+                "object_id": "gundi-uuid-999",
+                STATE_INAT_UPDATED_AT_KEY: "2024-06-01 00:00:00+0000",
+                STATE_EVENT_HASH_KEY: _get_event_hash(synced_event),
+                STATE_EVENT_FIELD_HASHES_KEY: _get_event_field_hashes(synced_event),
+            }
+        return {}
+
+    mock_state = AsyncMock()
+    mock_state.get_state.side_effect = get_state_side_effect
+    mocker.patch("app.actions.handlers.state_manager", mock_state)
+    mocker.patch("app.actions.handlers.get_observations", return_value={999: retitled})
+    mocker.patch("app.services.activity_logger.publish_event", AsyncMock())
+    mock_update = mocker.patch("app.actions.handlers.update_event_in_gundi", AsyncMock(return_value={}))
+
+    integration = MagicMock()
+    integration.id = UUID("f03ec73e-f3fe-41b6-8597-3eb89dde5ae1")
+
+    result = await action_pull_events(integration, config)
+
+    assert result["result"]["events_updated"] == 1
+    mock_update.assert_awaited_once_with(
+        event_id="gundi-uuid-999",
+        event={
+            "title": "iNat: Another species",
+            "event_details": _transform_inat_to_gundi_event(retitled, config)["event_details"],
+        },
+        integration_id=str(integration.id),
+    )
+    saved_state = next(
+        c.kwargs["state"] for c in mock_state.set_state.call_args_list if c.kwargs.get("source_id") == "999"
+    )
+    assert saved_state[STATE_EVENT_FIELD_HASHES_KEY] == _get_event_field_hashes(
+        _transform_inat_to_gundi_event(retitled, config)
+    )
+    assert saved_state[STATE_EVENT_HASH_KEY] == _get_event_hash(_transform_inat_to_gundi_event(retitled, config))
+
+
 @pytest.mark.asyncio
 async def test_handle_transformed_data_http_error_returns_message(mocker):
     import httpx
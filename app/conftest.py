@@ -35,6 +35,10 @@ from app.actions import (
 )
 from app.services.utils import GlobalUISchemaOptions, FieldWithUIOptions, UIOptions
 from app.services.action_scheduler import CrontabSchedule
+from app.services.config_manager import _integration_details_cache
+from app.services.webhooks import _dynamic_payload_models
+from app.services.locks import ActionLeaseManager
+from app.webhooks.core import get_jq_program
 from app.webhooks import (
     GenericJsonTransformConfig,
     GenericJsonPayload,
@@ -54,6 +58,27 @@ def async_return(result):
     return f
 
 
+@pytest.fixture(autouse=True)
+def clear_in_memory_caches():
+    yield
+    _integration_details_cache.clear()
+    _dynamic_payload_models.clear()
+    get_jq_program.cache_clear()
+
+
+@pytest.fixture(autouse=True)
+def mock_lease_manager(mocker):
+    # Actions run without Redis in tests, leases are always granted
+    mock_db_client = MagicMock()
+    mock_db_client.incr.side_effect = lambda *args, **kwargs: async_return(1)
+    mock_db_client.set.side_effect = lambda *args, **kwargs: async_return(True)
+    mock_db_client.eval.side_effect = lambda *args, **kwargs: async_return(1)
+    lease_manager = ActionLeaseManager()
+    lease_manager.db_client = mock_db_client
+    mocker.patch("app.services.action_runner.lease_manager", lease_manager)
+    return lease_manager
+
+
 @pytest.fixture
 def mock_integration_state():
     return {"last_execution": "2024-01-29T11:20:00+0200"}
@@ -67,6 +92,9 @@ def mock_redis(mocker, mock_integration_state):
     redis_client.get.return_value = async_return(
         json.dumps(mock_integration_state, default=str)
     )
+    redis_client.mget.return_value = async_return(
+        [json.dumps(mock_integration_state, default=str)]
+    )
     redis_client.delete.return_value = async_return(MagicMock())
     redis_client.setex.return_value = async_return(None)
     redis_client.incr.return_value = redis_client
@@ -86,6 +114,7 @@ def mock_redis_empty(mocker, mock_integration_state):
     redis_client = mocker.MagicMock()
     redis_client.set.return_value = async_return(MagicMock())
     redis_client.get.return_value = async_return(None)
+    redis_client.mget.return_value = async_return([None])
     redis_client.delete.return_value = async_return(MagicMock())
     redis_client.setex.return_value = async_return(None)
     redis_client.incr.return_value = redis_client
@@ -105,6 +134,9 @@ def mock_redis_with_integration_config(mocker, integration_v2_as_json):
     redis_client = mocker.MagicMock()
     redis_client.set.return_value = async_return(MagicMock())
     redis_client.get.return_value = async_return(integration_v2_as_json)
+    redis_client.mget.return_value = async_return(
+        [json.dumps(c) for c in json.loads(integration_v2_as_json)["configurations"]]
+    )
     redis_client.delete.return_value = async_return(MagicMock())
     redis_client.setex.return_value = async_return(None)
     redis_client.incr.return_value = redis_client
@@ -124,6 +156,7 @@ def mock_redis_with_action_config(mocker, pull_observations_config_as_json):
     redis_client = mocker.MagicMock()
     redis_client.set.return_value = async_return(MagicMock())
     redis_client.get.return_value = async_return(pull_observations_config_as_json)
+    redis_client.mget.return_value = async_return([pull_observations_config_as_json])
     redis_client.delete.return_value = async_return(MagicMock())
     redis_client.setex.return_value = async_return(None)
     redis_client.incr.return_value = redis_client
@@ -875,6 +908,22 @@ def mock_config_manager(mocker, integration_v2):
     return mock_config_manager
 
 
+@pytest.fixture
+def mock_config_manager_for_webhooks(mocker, integration_v2_with_webhook):
+    mock_config_manager = mocker.MagicMock()
+    mock_config_manager.get_integration_details.return_value = async_return(integration_v2_with_webhook)
+    return mock_config_manager
+
+
+@pytest.fixture
+def mock_config_manager_for_webhooks_generic(mocker, integration_v2_with_webhook_generic):
+    mock_config_manager = mocker.MagicMock()
+    mock_config_manager.get_integration_details.side_effect = lambda *args, **kwargs: async_return(
+        integration_v2_with_webhook_generic
+    )
+    return mock_config_manager
+
+
 @pytest.fixture
 def mock_pubsub_client(
     mocker, integration_event_pubsub_message, gcp_pubsub_publish_response
@@ -50,6 +50,7 @@ def _get_observations_for_taxa_batch(
     taxa_batch: Optional[str],
     annotations: Optional[Dict],
     fields: str,
+    until: Optional[datetime] = None,
 ) -> Dict[int, Observation]:
     params = {**base_params}
     if taxa_batch:
@@ -65,12 +66,20 @@ def _get_observations_for_taxa_batch(
         response = get_observations_v2(**{**params, "page": page, "per_page": INAT_PAGE_SIZE, "fields": fields})
         observations = Observation.from_json_list(response)
         logger.info("Loaded %s observations from iNaturalist before annotation filters.", len(observations))
+        reached_until = False
         for o in observations:
+            # Results are ordered by updated_at ascending, so the first observation past the
+            # upper bound means the rest of this page (and any later page) is out of range too.
+            if until and o.updated_at and o.updated_at >= until:
+                reached_until = True
+                break
             if annotations:
                 if _match_annotations_to_config(o.annotations, annotations):
                     observation_map[o.id] = o
             else:
                 observation_map[o.id] = o
+        if reached_until:
+            break
 
     return observation_map
 
@@ -78,6 +87,7 @@ def _get_observations_for_taxa_batch(
 def get_observations(
     since: datetime,
     *,
+    until: Optional[datetime] = None,
     bounding_box: Optional[List[float]] = None,
     taxa: Optional[str] = None,
     projects: Optional[List[str]] = None,
@@ -87,6 +97,9 @@ def get_observations(
     """
     Fetch observations from iNaturalist updated since the given datetime.
 
+    When until is set, only observations updated before it are returned, which lets
+    callers split a long window into independent time slices.
+
     Returns a dict mapping observation id -> Observation for all observations
     that match the filters (and annotation filter when annotations is set).
     """
@@ -101,6 +114,8 @@ def get_observations(
         "order_by": "updated_at",
         "order": "asc",
     }
+    if until is not None:
+        base_params["updated_before"] = until.isoformat()
     if projects is not None:
         base_params["project_id"] = projects
     if quality_grade is not None:
@@ -122,7 +137,7 @@ def get_observations(
 
     observation_map = {}
     for batch in batches:
-        batch_results = _get_observations_for_taxa_batch(base_params, batch, annotations, fields)
+        batch_results = _get_observations_for_taxa_batch(base_params, batch, annotations, fields, until)
         observation_map.update(batch_results)
 
     return observation_map
@@ -128,6 +128,44 @@ def test_get_observations_passes_bounding_box_and_filters(mocker):
     assert first.get("quality_grade") == ["research"]
 
 
+def test_get_observations_with_until_stops_at_upper_bound(mocker):
+    base = {
+        "observed_on": "2024-06-01",
+        "created_at": "2024-06-01T12:00:00+00:00",
+        "captive": False,
+        "obscured": False,
+        "quality_grade": "research",
+        "species_guess": "Bird",
+        "uri": "https://www.inaturalist.org/observations/1",
+        "photos": [],
+        "user": None,
+        "location": None,
+        "place_ids": [],
+        "taxon": None,
+        "annotations": [],
+    }
+    results = [
+        {**base, "id": 1, "updated_at": "2024-06-01T12:00:00+00:00"},
+        {**base, "id": 2, "updated_at": "2024-06-02T12:00:00+00:00"},
+    ]
+    call_params = []
+
+    def side_effect(**kwargs):
+        call_params.append(kwargs.copy())
+        if kwargs.get("per_page") == 0:
+            return {"total_results": 400, "results": []}
+        return {"total_results": 400, "results": results}
+
+    mocker.patch("app.datasource.inaturalist.get_observations_v2", side_effect=side_effect)
+    until = datetime(2024, 6, 2, tzinfo=timezone.utc)
+    result = get_observations(datetime(2024, 6, 1, tzinfo=timezone.utc), until=until)
+
+    assert list(result.keys()) == [1]
+    assert call_params[0]["updated_before"] == until.isoformat()
+    # Two pages were announced, but the first one already went past the upper bound
+    assert len(call_params) == 2
+
+
 def test_get_observations_annotation_filter_includes_only_matching(mocker):
     from pyinaturalist import Observation
 
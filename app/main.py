@@ -1,33 +1,66 @@
+import asyncio
 import base64
 import json
 import logging
 import os
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, Request, status, BackgroundTasks
+from fastapi import FastAPI, Request, status
 from fastapi.encoders import jsonable_encoder
 from fastapi.exceptions import RequestValidationError
 from fastapi.responses import JSONResponse
-from app.routers import actions, webhooks, config_events
+from app.routers import actions, webhooks, config_events, metrics
 import app.settings as settings
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.services.action_runner import execute_action, _portal
 from app.services.self_registration import register_integration_in_gundi
+from app.services.redis_pool import close_connection_pools
+from app.services.outbox import get_outbox
+from app.services.pubsub_publisher import event_publisher, start_outbox_replay, stop_outbox_replay
+from app.services.action_executor import action_executor, ActionExecutorSaturated
+from app.services.logs import is_sampled, get_payload_preview
+from app.settings.log_handlers import stop_queue_logging
+from app.actions import get_action_handlers
+from app.webhooks import get_webhook_handler
 
 
 # For running behind a proxy, we'll want to configure the root path for OpenAPI browser.
 root_path = os.environ.get("ROOT_PATH", "")
 
 
+def load_handlers():
+    # Resolve action and webhook handlers now instead of on the first request
+    get_action_handlers()
+    try:
+        get_webhook_handler()
+    except (ImportError, AttributeError, NotImplementedError) as e:
+        logger.debug(f"No webhook handler found: {e}")
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup Hook
+    if settings.FAST_START:
+        # Serve requests right away, handlers and their dependencies are imported in the background
+        app.state.handlers_loading = asyncio.create_task(asyncio.to_thread(load_handlers))
+    else:
+        load_handlers()
     if settings.REGISTER_ON_START:
         await register_integration_in_gundi(gundi_client=_portal)
         # ToDo: set env var to false in GCP after registration
+    if settings.PUBSUB_BATCH_PUBLISHING:
+        await event_publisher.start()
+    start_outbox_replay()
     yield
     # Shotdown Hook
+    await action_executor.shutdown(timeout=settings.ACTION_EXECUTOR_SHUTDOWN_TIMEOUT)
+    await stop_outbox_replay()
+    await event_publisher.stop()  # Publishes the events of the actions too, cancelled ones included
+    if outbox := get_outbox():
+        await outbox.flush()
     await _portal.close()
+    await close_connection_pools()
+    stop_queue_logging()  # Write pending logs
 
 
 app = FastAPI(
@@ -70,29 +103,39 @@ def read_root(
 )
 async def execute(
     request: Request,
-    background_tasks: BackgroundTasks
 ):
-    body = await request.body()
-    print(f"Message Received. RAW body: {body}")
     json_data = await request.json()
-    print(f"JSON: {json_data}")
-    payload = base64.b64decode(json_data["message"]["data"]).decode("utf-8").strip()
-    print(f"Payload: {payload}")
+    message = json_data["message"]
+    payload = base64.b64decode(message["data"]).decode("utf-8").strip()
     json_payload = json.loads(payload)
-    print(f"JSON Payload: {json_payload}")
-    if settings.PROCESS_PUBSUB_MESSAGES_IN_BACKGROUND:
-        background_tasks.add_task(
+    integration_id = json_payload.get("integration_id")
+    log_data = {
+        "message_id": message.get("message_id", message.get("messageId")),
+        "integration_id": integration_id,
+        "action_id": json_payload.get("action_id"),
+    }
+    if is_sampled(settings.PUBSUB_MESSAGES_LOG_SAMPLE_RATE):
+        logger.info("Message Received.", extra={**log_data, "payload_preview": get_payload_preview(json_payload)})
+    else:
+        logger.debug("Message Received.", extra=log_data)
+    try:
+        execution = action_executor.submit(
+            integration_id,
             execute_action,
-            integration_id=json_payload.get("integration_id"),
+            integration_id=integration_id,
             action_id=json_payload.get("action_id"),
             config_overrides=json_payload.get("config_overrides"),
         )
-    else:
-        await execute_action(
-            integration_id=json_payload.get("integration_id"),
-            action_id=json_payload.get("action_id"),
-            config_overrides=json_payload.get("config_overrides"),
+    except ActionExecutorSaturated as e:
+        # PubSub will redeliver the message later
+        logger.warning(f"Action rejected: {e}")
+        return JSONResponse(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            content={"detail": str(e)},
         )
+    action_executor.run_in_background(execution)  # Awaited on shutdown either way
+    if not settings.PROCESS_PUBSUB_MESSAGES_IN_BACKGROUND:
+        await execution
     return {}
 
 
@@ -105,6 +148,9 @@ app.include_router(
 app.include_router(
     config_events.router, prefix="/config-events", tags=["configurations"], responses={}
 )
+app.include_router(
+    metrics.router, prefix="/metrics", tags=["metrics"], responses={}
+)
 
 
 @app.exception_handler(RequestValidationError)
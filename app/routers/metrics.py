@@ -0,0 +1,23 @@
+import logging
+from fastapi import APIRouter
+from app.services.redis_pool import get_connection_pools_stats
+from app.services.pubsub_publisher import event_publisher
+from app.services.outbox import get_outbox
+from app.services.action_executor import action_executor
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+
+@router.get(
+    "/",
+    summary="Get runtime metrics of this service instance",
+)
+async def get_metrics():
+    return {
+        "redis_connection_pools": get_connection_pools_stats(),
+        "action_executor": action_executor.get_stats(),
+        "pubsub_publisher": event_publisher.get_stats(),
+        "events_outbox": outbox.get_stats() if (outbox := get_outbox()) else None,
+    }
@@ -1,6 +1,6 @@
 import logging
-from fastapi import APIRouter, BackgroundTasks, Request
-from app.services.webhooks import process_webhook
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Request, status
+from app.services.webhooks import process_webhook, check_content_length, read_body, WebhookBodyTooLarge
 from app import settings
 
 logger = logging.getLogger(__name__)
@@ -16,17 +16,23 @@ async def webhooks(
     request: Request,
     background_tasks: BackgroundTasks
 ):
-    body = await request.body()
-    print(f"Message Received through Webhooks. RAW body: {body}")
-    headers = dict(request.headers)
-    print(f"Headers: {headers}")
-    if settings.PROCESS_WEBHOOKS_IN_BACKGROUND:
-        background_tasks.add_task(
-            process_webhook,
-            request=request,
-        )
-        return {}
-    else:
-        return await process_webhook(
-            request=request,
-        )
+    logger.debug(
+        f"Message Received through Webhooks. Content-Type: {request.headers.get('content-type')}, "
+        f"Content-Length: {request.headers.get('content-length')}"
+    )
+    try:
+        check_content_length(request)
+        if settings.PROCESS_WEBHOOKS_IN_BACKGROUND:
+            # The body can't be read once the response is sent
+            await read_body(request)
+            background_tasks.add_task(
+                process_webhook,
+                request=request,
+            )
+            return {}
+        else:
+            return await process_webhook(
+                request=request,
+            )
+    except WebhookBodyTooLarge as e:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
@@ -0,0 +1,116 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Optional, Set
+
+from app import settings
+
+
+logger = logging.getLogger(__name__)
+
+
+class ActionExecutorSaturated(Exception):
+    pass
+
+
+class IntegrationBusy(ActionExecutorSaturated):
+    pass
+
+
+class ActionExecutor:
+    """
+    Runs actions in this worker with bounded concurrency.
+    At most max_concurrency actions run at once, and up to max_queue_size more can wait for a slot.
+    Only one action per integration is accepted at a time. Beyond these limits, submissions are rejected with
+    ActionExecutorSaturated (IntegrationBusy for a busy integration) so that the caller can answer 429
+    and let PubSub redeliver the message later.
+    """
+
+    def __init__(self, max_concurrency: int = 10, max_queue_size: int = 20):
+        self.max_concurrency = max_concurrency
+        self.max_queue_size = max_queue_size
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._busy_integrations: Set[str] = set()
+        self._tasks: Set[asyncio.Task] = set()
+        self._queued = 0
+        self._running = 0
+        self._rejected_count = 0
+        self._completed_count = 0
+
+    @property
+    def is_saturated(self) -> bool:
+        return self._queued + self._running >= self.max_concurrency + self.max_queue_size
+
+    def submit(self, integration_id: str, func: Callable[..., Awaitable], /, **kwargs) -> asyncio.Task:
+        """
+        Starts a task that runs func(**kwargs) once there's a free slot, and returns it.
+        Raises IntegrationBusy when an action of the integration is queued or running already,
+        and ActionExecutorSaturated when too many actions are running or waiting.
+        """
+        integration_id = str(integration_id)
+        if integration_id in self._busy_integrations:
+            self._rejected_count += 1
+            raise IntegrationBusy(f"An action for integration {integration_id} is in progress already. Retry later.")
+        if self.is_saturated:
+            self._rejected_count += 1
+            raise ActionExecutorSaturated(
+                f"Too many actions in progress ({self._running} running, {self._queued} queued). Retry later."
+            )
+        self._busy_integrations.add(integration_id)
+        self._queued += 1
+        started = []  # Set once the action takes a slot
+        task = asyncio.ensure_future(self._execute(func, kwargs, started))
+        # Done callbacks run even if the task is cancelled before it starts, so the counters never leak
+        task.add_done_callback(lambda _: self._release(integration_id, bool(started)))
+        return task
+
+    def run_in_background(self, task: asyncio.Task) -> asyncio.Task:
+        """Keeps track of a submitted action, so that it's awaited on shutdown."""
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def shutdown(self, timeout: float = None):
+        """Waits for the actions running in background, up to timeout seconds, then cancels the rest."""
+        if not self._tasks:
+            return
+        done, pending = await asyncio.wait(list(self._tasks), timeout=timeout)
+        for task in pending:
+            task.cancel()
+        if pending:
+            logger.warning(f"{len(pending)} actions were cancelled on shutdown.")
+            # Let them handle the cancellation (i.e. to queue their error events), without waiting for long
+            await asyncio.wait(pending, timeout=1.0)
+
+    def get_stats(self) -> dict:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_queue_size": self.max_queue_size,
+            "running": self._running,
+            "queued": self._queued,
+            "saturated": self.is_saturated,
+            "completed": self._completed_count,
+            "rejected": self._rejected_count,
+        }
+
+    async def _execute(self, func: Callable[..., Awaitable], kwargs: dict, started: list) -> Any:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        async with self._semaphore:
+            self._queued -= 1
+            self._running += 1
+            started.append(True)
+            return await func(**kwargs)
+
+    def _release(self, integration_id: str, started: bool):
+        if started:
+            self._running -= 1
+            self._completed_count += 1
+        else:  # Cancelled while waiting
+            self._queued -= 1
+        self._busy_integrations.discard(integration_id)
+
+
+action_executor = ActionExecutor(
+    max_concurrency=settings.MAX_CONCURRENT_ACTIONS,
+    max_queue_size=settings.MAX_QUEUED_ACTIONS,
+)
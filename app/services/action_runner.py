@@ -16,11 +16,14 @@ from fastapi.responses import JSONResponse
 from gundi_core.events import IntegrationActionFailed, ActionExecutionFailed
 
 from .config_manager import IntegrationConfigurationManager
+from .locks import ActionLeaseManager, ActionLeaseLost, current_lease
 from .utils import find_config_for_action
 from .activity_logger import publish_event
+from .event_payloads import get_config_data_for_event, truncate
 
 _portal = GundiClient()
 config_manager = IntegrationConfigurationManager()
+lease_manager = ActionLeaseManager()
 logger = logging.getLogger(__name__)
 
 
@@ -39,9 +42,9 @@ async def _handle_error(
     error_details = {
         "integration_id": integration_id,
         "action_id": action_id,
-        "config_data": config_data or {},
-        "error": message,
-        "error_traceback": traceback.format_exc()
+        "config_data": get_config_data_for_event(config_data),
+        "error": truncate(message),
+        "error_traceback": truncate(traceback.format_exc())
     }
 
     # Extract additional request/response details if available
@@ -49,12 +52,12 @@ async def _handle_error(
         error_details.update({
             "request_verb": str(request.method),
             "request_url": str(request.url),
-            "request_data": str(getattr(request, "content", getattr(request, "body", None)) or "")
+            "request_data": truncate(str(getattr(request, "content", getattr(request, "body", None)) or ""))
         })
     if (response := getattr(exc, "response", None)) is not None:  # bool(response) on status errors returns False
         error_details.update({
             "server_response_status": getattr(response, "status_code", None),
-            "server_response_body": str(getattr(response, "text", getattr(response, "content", None)) or "")
+            "server_response_body": truncate(str(getattr(response, "text", getattr(response, "content", None)) or ""))
         })
 
     # Publish the error event
@@ -109,12 +112,49 @@ async def execute_action(integration_id: str, action_id: str, config_overrides:
     except pydantic.ValidationError as e:
         return await _handle_error(e, integration_id, action_id, config_data, status.HTTP_422_UNPROCESSABLE_ENTITY)
 
+    if settings.ACTION_LEASES_ENABLED:
+        async with lease_manager.lease(integration_id, action_id) as lease:
+            if not lease.acquired:
+                message = f"Action '{action_id}' for integration {integration_id} is already running. Skipped."
+                logger.warning(message)
+                return {"status": "skipped", "detail": message}
+            # If the lease is lost (i.e. it expired while Redis was unreachable), another execution may take it.
+            # The handler is stopped then, and until it notices, its state writes are fenced with the lease token.
+            lease_context = current_lease.set(lease)
+            try:  # The task runs with a copy of the current context, lease included
+                handler_task = asyncio.ensure_future(
+                    _run_handler(handler, integration, parsed_config, integration_id, action_id)
+                )
+            finally:
+                current_lease.reset(lease_context)
+            lease.add_lost_callback(handler_task.cancel)
+            try:
+                return await handler_task
+            except asyncio.CancelledError:
+                if not lease.lost:
+                    raise
+                return await _handle_error(
+                    ActionLeaseLost(f"Action '{action_id}' was stopped because its lease {lease.key} was lost"),
+                    integration_id, action_id,
+                    config_data={"configurations": [c.dict() for c in integration.configurations]},
+                    status_code=status.HTTP_409_CONFLICT
+                )
+    return await _run_handler(handler, integration, parsed_config, integration_id, action_id)
+
+
+async def _run_handler(handler, integration, parsed_config, integration_id: str, action_id: str):
     try:  # Execute the action handler with a timeout
         start_time = time.monotonic()
         result = await asyncio.wait_for(
             handler(integration=integration, action_config=parsed_config),
             timeout=settings.MAX_ACTION_EXECUTION_TIME
         )
+    except ActionLeaseLost as e:  # Another execution holds the lease now
+        return await _handle_error(
+            e, integration_id, action_id,
+            config_data={"configurations": [c.dict() for c in integration.configurations]},
+            status_code=status.HTTP_409_CONFLICT
+        )
     except asyncio.TimeoutError:
         return await _handle_error(
             asyncio.TimeoutError(f"Action '{action_id}' timed out"),
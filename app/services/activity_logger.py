@@ -1,11 +1,9 @@
 import asyncio
-import json
 import logging
 
 import aiohttp
 import stamina
 from functools import wraps
-from gcloud.aio import pubsub
 from gundi_core.events import (
     SystemEventBaseModel,
     IntegrationActionCustomLog,
@@ -26,12 +24,33 @@ from gundi_core.events import (
     CustomWebhookLog,
 )
 from app import settings
+from app.services.event_payloads import get_config_data_for_event, serialize_event, truncate
+from app.services.outbox import get_outbox
+from app.services.pubsub_publisher import event_publisher
+from app.services.utils import LazyModule
 
 
 logger = logging.getLogger(__name__)
+pubsub = LazyModule("gcloud.aio.pubsub")  # Imported when the first event is published
 
 
 # Publish events for other services or system components
+async def publish_event(event: SystemEventBaseModel, topic_name: str):
+    if settings.PUBSUB_BATCH_PUBLISHING and event_publisher.is_running:
+        # Sent later in a batch, out of the request latency path
+        if settings.ACTIVITY_LOGS_FIRE_AND_FORGET:
+            event_publisher.publish_nowait(event=event, topic_name=topic_name)
+            return None
+        return await event_publisher.publish(event=event, topic_name=topic_name)
+    try:
+        return await _publish_event_now(event=event, topic_name=topic_name)
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        if not (outbox := get_outbox()):
+            raise e
+        logger.warning(f"Event {type(event).__name__} saved in outbox after failing to publish it: {e}")
+        await outbox.append(topic_name, [serialize_event(event)])
+
+
 @stamina.retry(
     on=(aiohttp.ClientError, asyncio.TimeoutError),
     attempts=5,
@@ -39,7 +58,7 @@ logger = logging.getLogger(__name__)
     wait_max=60,
     wait_jitter=5.0
 )
-async def publish_event(event: SystemEventBaseModel, topic_name: str):
+async def _publish_event_now(event: SystemEventBaseModel, topic_name: str):
     timeout_settings = aiohttp.ClientTimeout(total=20.0)
     async with aiohttp.ClientSession(
         raise_for_status=True, timeout=timeout_settings
@@ -48,7 +67,7 @@ async def publish_event(event: SystemEventBaseModel, topic_name: str):
         # Get the topic
         topic = client.topic_path(settings.GCP_PROJECT_ID, topic_name)
         # Prepare the payload
-        binary_payload = json.dumps(event.dict(), default=str).encode("utf-8")
+        binary_payload = serialize_event(event).encode("utf-8")
         messages = [pubsub.PubsubMessage(binary_payload)]
         logger.debug(f"Sending event {event} to PubSub topic {topic_name}..")
         try:  # Send to pubsub
@@ -86,7 +105,7 @@ async def log_action_activity(integration_id: str, action_id: str, title: str, l
             payload=CustomActivityLog(
                 integration_id=integration_id,
                 action_id=action_id,
-                config_data=config_data or {},
+                config_data=get_config_data_for_event(config_data),
                 title=title,
                 level=level,
                 data=data
@@ -114,7 +133,7 @@ async def log_webhook_activity(
             payload=CustomWebhookLog(
                 integration_id=integration_id,
                 webhook_id=webhook_id,
-                config_data=config_data or {},
+                config_data=get_config_data_for_event(config_data),
                 title=title,
                 level=level,
                 data=data
@@ -132,7 +151,7 @@ def activity_logger(on_start=True, on_completion=True, on_error=True):
             integration_id = str(integration.id) if integration else None
             action_id = func.__name__.replace("action_", "")
             action_config = kwargs.get("action_config")
-            config_data = action_config.dict() if action_config else {} or {}
+            config_data = get_config_data_for_event(action_config)
             if on_start:
                 await publish_event(
                     event=IntegrationActionStarted(
@@ -154,7 +173,7 @@ def activity_logger(on_start=True, on_completion=True, on_error=True):
                                 integration_id=integration_id,
                                 action_id=action_id,
                                 config_data=config_data,
-                                error=str(e)
+                                error=truncate(str(e))
                             )
                         ),
                         topic_name=settings.INTEGRATION_EVENTS_TOPIC,
@@ -185,7 +204,7 @@ def webhook_activity_logger(on_start=True, on_completion=True, on_error=True):
             integration = kwargs.get("integration")
             integration_id = str(integration.id) if integration else None
             webhook_config = kwargs.get("webhook_config")
-            config_data = webhook_config.dict() if webhook_config else {} or {}
+            config_data = get_config_data_for_event(webhook_config)
             webhook_id = str(integration.webhook_configuration.webhook.value) if integration and integration.webhook_configuration else "webhook"
             if on_start:
                 await publish_event(
@@ -208,7 +227,7 @@ def webhook_activity_logger(on_start=True, on_completion=True, on_error=True):
                                 integration_id=integration_id,
                                 webhook_id=webhook_id,
                                 config_data=config_data,
-                                error=str(e)
+                                error=truncate(str(e))
                             )
                         ),
                         topic_name=settings.INTEGRATION_EVENTS_TOPIC,
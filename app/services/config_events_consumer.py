@@ -12,6 +12,7 @@ from gundi_core.events import (
 
 
 from .config_manager import IntegrationConfigurationManager
+from .webhooks import invalidate_dynamic_payload_model
 
 
 logger = logging.getLogger(__name__)
@@ -29,10 +30,12 @@ async def handle_integration_updated_event(event: IntegrationUpdated):
         if hasattr(integration, key):
             setattr(integration, key, value)
     await config_manager.set_integration(integration=integration)
+    invalidate_dynamic_payload_model(integration_id=event_data.id)
 
 
 async def handle_integration_deleted_event(event: IntegrationDeleted):
     await config_manager.delete_integration(integration_id=event.payload.id)
+    invalidate_dynamic_payload_model(integration_id=event.payload.id)
 
 
 async def handle_action_config_created_event(event: ActionConfigCreated):
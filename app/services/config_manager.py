@@ -1,10 +1,59 @@
+import asyncio
 import json
+import logging
 import stamina
 import httpx
 import redis.asyncio as redis
-from gundi_core.schemas.v2 import Integration, IntegrationSummary, IntegrationActionConfiguration
+from gundi_core.schemas.v2 import Integration, IntegrationSummary, IntegrationActionConfiguration, WebhookConfiguration
 from gundi_client_v2 import GundiClient
 from app import settings
+from app.services.redis_pool import get_connection_pool
+from app.services.utils import TTLCache
+
+
+# Parsed integration details, shared by all the managers in the process so that
+# any configuration change applied through one of them invalidates the cached copy.
+_integration_details_cache = TTLCache(
+    maxsize=settings.INTEGRATION_CACHE_MAXSIZE if settings.INTEGRATION_CACHE_TTL > 0 else 0,
+    ttl=settings.INTEGRATION_CACHE_TTL
+)
+
+
+# Loads from Redis or Gundi in progress. Concurrent callers for the same integration await the same one.
+_requests_in_flight = {}
+# Increased on every configuration change, so that loads started before the change aren't cached after it
+_cache_generations = {}
+
+logger = logging.getLogger(__name__)
+
+
+def invalidate_integration_cache(integration_id):
+    integration_id = str(integration_id)
+    _cache_generations[integration_id] = _cache_generations.get(integration_id, 0) + 1
+    _integration_details_cache.pop(integration_id)
+    # New callers must not join a load that may have read the previous configuration
+    _requests_in_flight.pop(("details", integration_id), None)
+    _requests_in_flight.pop(("reload", integration_id), None)
+
+
+def _get_or_start_request(key, coroutine_function, *args) -> asyncio.Future:
+    """Returns the in-flight request for key, or starts coroutine_function(*args) as the new one."""
+    request = _requests_in_flight.get(key)
+    if request is None or request.get_loop() is not asyncio.get_running_loop():
+        request = asyncio.ensure_future(coroutine_function(*args))
+        _requests_in_flight[key] = request
+
+        def _forget(finished_request):
+            if _requests_in_flight.get(key) is finished_request:
+                del _requests_in_flight[key]
+
+        request.add_done_callback(_forget)
+    return request
+
+
+def _log_revalidation_error(request: asyncio.Future):
+    if not request.cancelled() and (exc := request.exception()):
+        logger.warning(f"Error refreshing integration details in background: {type(exc).__name__}: {exc}")
 
 
 class IntegrationConfigurationManager:
@@ -14,7 +63,7 @@ class IntegrationConfigurationManager:
         host = kwargs.get("host", settings.REDIS_HOST)
         port = kwargs.get("port", settings.REDIS_PORT)
         db = kwargs.get("db", settings.REDIS_CONFIGS_DB)
-        self.db_client = redis.Redis(host=host, port=port, db=db)
+        self.db_client = redis.Redis(connection_pool=get_connection_pool(host=host, port=port, db=db))
 
     def _get_integration_key(self, integration_id: str) -> str:
         return f"integration.{integration_id}"
@@ -22,21 +71,61 @@ class IntegrationConfigurationManager:
     def _get_integration_config_key(self, integration_id: str, action_id: str) -> str:
         return f"integrationconfig.{integration_id}.{action_id}"
 
+    def _get_webhook_config_key(self, integration_id: str) -> str:
+        return f"integrationwebhookconfig.{integration_id}"
+
     async def _reload_integration_from_gundi(self, integration_id: str) -> Integration:
+        # Only one request to the portal per integration at a time, i.e. on a cold cache
+        request = _get_or_start_request(
+            ("reload", str(integration_id)), self._fetch_integration_from_gundi, str(integration_id)
+        )
+        return await asyncio.shield(request)
+
+    async def _fetch_integration_from_gundi(self, integration_id: str) -> Integration:
         key = self._get_integration_key(integration_id)
         async with GundiClient() as gundi:
             async for attempt in stamina.retry_context(on=httpx.HTTPError, wait_initial=1.0, wait_jitter=5.0,  wait_max=32.0):
                 with attempt:
                     integration_details = await gundi.get_integration_details(integration_id)
             integration = IntegrationSummary.from_integration(integration_details)
-            await self.db_client.set(key, integration.json())
-            # Save configurations for individual actions
-            for config in integration_details.configurations:
-                config_key = self._get_integration_config_key(integration_id, config.action.value)
-                await self.db_client.set(config_key, config.json())
+            # Save the integration and the configurations for individual actions in one round trip
+            async with self.db_client.pipeline(transaction=False) as pipe:
+                pipe.set(key, integration.json())
+                for config in integration_details.configurations:
+                    config_key = self._get_integration_config_key(integration_id, config.action.value)
+                    pipe.set(config_key, config.json())
+                if integration.type.webhook:
+                    # There are no events for webhook config changes, so this one expires to be reloaded
+                    webhook_config = integration_details.webhook_configuration
+                    pipe.set(
+                        self._get_webhook_config_key(integration_id),
+                        webhook_config.json() if webhook_config else json.dumps(None),
+                        ex=settings.WEBHOOK_CONFIG_CACHE_TTL
+                    )
+                await pipe.execute()
             return integration_details
 
+    def _get_cached_integration_details(self, integration_id: str):
+        integration, is_fresh = _integration_details_cache.peek(str(integration_id))
+        if integration is None:
+            return None
+        if is_fresh:
+            return integration
+        if settings.INTEGRATION_CACHE_STALE_WHILE_REVALIDATE:
+            request = _get_or_start_request(
+                ("details", str(integration_id)), self._load_integration_details, str(integration_id)
+            )
+            request.add_done_callback(_log_revalidation_error)
+            return integration
+        # Plain expiry, not a configuration change: keep the generation and any load in flight
+        _integration_details_cache.pop(str(integration_id))
+        return None
+
     async def get_action_configuration(self, integration_id: str, action_id: str) -> IntegrationActionConfiguration:
+        if integration := self._get_cached_integration_details(integration_id):
+            # Copy, so that callers can't modify the cached configuration
+            config = integration.get_action_config(action_id)
+            return config.copy(deep=True) if config else None
         key = self._get_integration_config_key(integration_id, action_id)
         for attempt in stamina.retry_context(on=redis.RedisError, attempts=5, wait_initial=1.0, wait_max=30, wait_jitter=3.0):
             with attempt:
@@ -52,12 +141,15 @@ class IntegrationConfigurationManager:
         for attempt in stamina.retry_context(on=redis.RedisError, attempts=5, wait_initial=1.0, wait_max=30, wait_jitter=3.0):
             with attempt:
                 await self.db_client.set(key, config.json())
+        invalidate_integration_cache(integration_id)
 
     async def delete_action_configuration(self, integration_id: str, action_id: str):
         key = self._get_integration_config_key(integration_id, action_id)
         for attempt in stamina.retry_context(on=redis.RedisError, attempts=5, wait_initial=1.0, wait_max=30, wait_jitter=3.0):
             with attempt:
-                return await self.db_client.delete(key)
+                deleted = await self.db_client.delete(key)
+        invalidate_integration_cache(integration_id)
+        return deleted
 
     async def get_integration(self, integration_id: str) -> IntegrationSummary:
         key = self._get_integration_key(integration_id)
@@ -76,21 +168,55 @@ class IntegrationConfigurationManager:
         for attempt in stamina.retry_context(on=redis.RedisError, attempts=5, wait_initial=1.0, wait_max=30, wait_jitter=3.0):
             with attempt:
                 await self.db_client.set(key, integration.json())
+        invalidate_integration_cache(integration.id)
 
     async def delete_integration(self, integration_id: str):
         key = self._get_integration_key(integration_id)
         for attempt in stamina.retry_context(on=redis.RedisError, attempts=5, wait_initial=1.0, wait_max=30, wait_jitter=3.0):
             with attempt:
-                await self.db_client.delete(key)
+                await self.db_client.delete(key, self._get_webhook_config_key(integration_id))
+        invalidate_integration_cache(integration_id)
 
     async def get_integration_details(self, integration_id: str) -> Integration:
-        integration_summary = await self.get_integration(integration_id)
-        configurations = []
-        for action in integration_summary.type.actions:
-            config = await self.get_action_configuration(integration_id, action.value)
-            if config:
-                configurations.append(config)
-        return Integration(
+        if integration := self._get_cached_integration_details(integration_id):
+            return integration
+        request = _get_or_start_request(
+            ("details", str(integration_id)), self._load_integration_details, str(integration_id)
+        )
+        return await asyncio.shield(request)
+
+    async def _load_integration_details(self, integration_id: str) -> Integration:
+        generation = _cache_generations.get(str(integration_id), 0)
+        key = self._get_integration_key(integration_id)
+        for attempt in stamina.retry_context(on=redis.RedisError, attempts=5, wait_initial=1.0, wait_max=30, wait_jitter=3.0):
+            with attempt:
+                integration_data = await self.db_client.get(key)
+        if not integration_data:
+            return self._cache_integration_details(
+                integration_id, await self._reload_integration_from_gundi(integration_id), generation
+            )
+        integration_summary = IntegrationSummary.parse_raw(integration_data)
+        # Fetch the configurations of all the actions (and the webhook) at once
+        config_keys = [
+            self._get_integration_config_key(integration_id, action.value)
+            for action in integration_summary.type.actions
+        ]
+        has_webhook = bool(integration_summary.type.webhook)
+        keys = config_keys + [self._get_webhook_config_key(integration_id)] if has_webhook else config_keys
+        values = []
+        if keys:
+            for attempt in stamina.retry_context(on=redis.RedisError, attempts=5, wait_initial=1.0, wait_max=30, wait_jitter=3.0):
+                with attempt:
+                    values = await self.db_client.mget(keys)
+        configs_data, webhook_config_data = values[:len(config_keys)], values[len(config_keys):]
+        if not all(configs_data) or (has_webhook and not all(webhook_config_data)):
+            # Some configuration is not in the redis db, reload everything from Gundi once
+            return self._cache_integration_details(
+                integration_id, await self._reload_integration_from_gundi(integration_id), generation
+            )
+        configurations = [IntegrationActionConfiguration.parse_raw(data) for data in configs_data]
+        webhook_config = json.loads(webhook_config_data[0]) if has_webhook else None
+        integration = Integration(
             id=integration_summary.id,
             name=integration_summary.name,
             type=integration_summary.type,
@@ -100,5 +226,12 @@ class IntegrationConfigurationManager:
             default_route=integration_summary.default_route,
             additional=integration_summary.additional,
             configurations=configurations,
-            # ToDo: webhook_configuration
-        )
\ No newline at end of file
+            webhook_configuration=WebhookConfiguration.parse_obj(webhook_config) if webhook_config else None,
+        )
+        return self._cache_integration_details(integration_id, integration, generation)
+
+    def _cache_integration_details(self, integration_id: str, integration: Integration, generation: int) -> Integration:
+        # Not cached if the configuration changed while it was loading, it may be the previous one
+        if _cache_generations.get(str(integration_id), 0) == generation:
+            _integration_details_cache.set(str(integration_id), integration)
+        return integration
\ No newline at end of file
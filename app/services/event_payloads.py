@@ -0,0 +1,98 @@
+import hashlib
+import json
+import logging
+from typing import Any, Optional
+
+import pydantic
+from gundi_core.events import SystemEventBaseModel
+from app import settings
+
+
+logger = logging.getLogger(__name__)
+
+CONFIG_DATA_MODE_FULL = "full"
+CONFIG_DATA_MODE_SUMMARY = "summary"
+
+
+def serialize_event(event: SystemEventBaseModel) -> str:
+    """Compact JSON of a system event. Values that aren't JSON types (i.e. datetimes) are written with str()."""
+    return json.dumps(event.dict(), default=str, separators=(",", ":"))
+
+
+def truncate(value: Any, max_length: Optional[int] = None, max_items: Optional[int] = None) -> Any:
+    """
+    Shortens long strings and lists, recursively, so that system events stay small.
+    Limits default to SYSTEM_EVENTS_MAX_STRING_LENGTH and SYSTEM_EVENTS_MAX_LIST_ITEMS. 0 means no limit.
+    """
+    max_length = settings.SYSTEM_EVENTS_MAX_STRING_LENGTH if max_length is None else max_length
+    max_items = settings.SYSTEM_EVENTS_MAX_LIST_ITEMS if max_items is None else max_items
+    if isinstance(value, str):
+        if max_length and len(value) > max_length:
+            return f"{value[:max_length]}... ({len(value) - max_length} more chars)"
+        return value
+    if isinstance(value, dict):
+        return {k: truncate(v, max_length, max_items) for k, v in value.items()}
+    if isinstance(value, (list, tuple, set)):
+        items = list(value)
+        truncated = [truncate(v, max_length, max_items) for v in (items[:max_items] if max_items else items)]
+        if max_items and len(items) > max_items:
+            truncated.append(f"... ({len(items) - max_items} more items)")
+        return truncated
+    return value
+
+
+def get_config_hash(config_data: dict) -> str:
+    return hashlib.sha1(json.dumps(config_data, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def _get_changed_fields(config: pydantic.BaseModel) -> dict:
+    changed = {}
+    for name, field in config.__fields__.items():
+        value = getattr(config, name)
+        default = field.get_default()
+        if field.required or value != default:
+            changed[name] = value
+    return json.loads(json.dumps(changed, default=str))
+
+
+def _summarize_config_dict(config_data: dict) -> dict:
+    configurations = config_data.get("configurations")
+    if isinstance(configurations, list):
+        # Configurations of an integration: the action and a hash of its data, for each one
+        return {
+            "configurations": [
+                {
+                    "action_id": (c.get("action") or {}).get("value"),
+                    "config_hash": get_config_hash(c.get("data") or {}),
+                }
+                if isinstance(c, dict) else get_config_hash(c)
+                for c in configurations
+            ]
+        }
+    # Without a model there are no defaults to compare with, so only the names of the fields are sent
+    return {"fields": sorted(str(k) for k in config_data)}
+
+
+def get_config_data_for_event(config: Any) -> dict:
+    """
+    Configuration to be attached to system events (a pydantic model or a dict).
+    In "full" mode (SYSTEM_EVENTS_CONFIG_DATA_MODE) the whole configuration is sent, as it is.
+    In "summary" mode a hash of the full configuration is sent, plus the fields that differ from their
+    defaults for models, or the action and hash of each configuration for dicts of integration configurations.
+    """
+    if not config:
+        return {}
+    is_model = isinstance(config, pydantic.BaseModel)
+    config_data = config.dict() if is_model else dict(config)
+    if settings.SYSTEM_EVENTS_CONFIG_DATA_MODE != CONFIG_DATA_MODE_SUMMARY:
+        return config_data
+    try:
+        if is_model:
+            return {
+                "config_hash": get_config_hash(config_data),
+                "changed_fields": truncate(_get_changed_fields(config)),
+            }
+        return {"config_hash": get_config_hash(config_data), **_summarize_config_dict(config_data)}
+    except Exception as e:  # Summaries must never break the action
+        logger.warning(f"Error summarizing config data: {type(e).__name__}: {e}")
+        return {"config_hash": get_config_hash(config_data)}
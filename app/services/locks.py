@@ -0,0 +1,143 @@
+import asyncio
+import contextvars
+import logging
+from contextlib import asynccontextmanager
+from typing import Callable, List, Optional
+
+import redis.asyncio as redis
+from app import settings
+from app.services.redis_pool import get_connection_pool
+
+
+logger = logging.getLogger(__name__)
+
+# Delete or extend the lease only if it still holds our token, i.e. it didn't expire and get taken by someone else
+RELEASE_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+RENEW_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("pexpire", KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+
+# Write only if the lease still holds our fencing token, so that an execution that lost its lease can't overwrite
+# what the one holding it now writes
+SET_IF_LEASE_HELD_SCRIPT = """
+if redis.call("get", KEYS[2]) == ARGV[2] then
+    return redis.call("set", KEYS[1], ARGV[1])
+end
+return 0
+"""
+
+
+class ActionLeaseLost(Exception):
+    pass
+
+
+class ActionLease:
+
+    def __init__(self, key: str, token: Optional[str] = None, acquired: bool = False):
+        self.key = key
+        self.token = token  # Fencing token, increases with every lease taken on the key
+        self.acquired = acquired
+        self.lost = False
+        self._lost_callbacks: List[Callable] = []
+
+    def add_lost_callback(self, callback: Callable):
+        """Calls callback() if the lease is lost, i.e. to stop the work it protects."""
+        self._lost_callbacks.append(callback)
+
+    def mark_lost(self):
+        self.lost = True
+        for callback in self._lost_callbacks:
+            callback()
+
+    def __repr__(self):
+        return f"ActionLease(key={self.key}, token={self.token}, acquired={self.acquired}, lost={self.lost})"
+
+
+# Lease of the action running in the current task, set by the action runner
+current_lease: contextvars.ContextVar[Optional[ActionLease]] = contextvars.ContextVar("current_lease", default=None)
+
+
+class ActionLeaseManager:
+    """
+    Distributed leases in Redis so that only one execution of an action runs at a time
+    per integration, across workers. Leases expire after ttl seconds unless they are renewed,
+    which happens in the background while the action runs. If Redis is unavailable, actions
+    run anyway (fail open), as they did before leases existed.
+    """
+
+    def __init__(self, **kwargs):
+        host = kwargs.get("host", settings.REDIS_HOST)
+        port = kwargs.get("port", settings.REDIS_PORT)
+        db = kwargs.get("db", settings.REDIS_STATE_DB)
+        self.ttl = kwargs.get("ttl", settings.ACTION_LEASE_TTL)
+        self.db_client = redis.Redis(connection_pool=get_connection_pool(host=host, port=port, db=db))
+
+    @staticmethod
+    def _get_lease_key(integration_id: str, action_id: str) -> str:
+        return f"action_lease.{integration_id}.{action_id}"
+
+    async def acquire(self, integration_id: str, action_id: str) -> ActionLease:
+        key = self._get_lease_key(integration_id, action_id)
+        try:
+            token = str(await self.db_client.incr(f"{key}.fencing_token"))
+            acquired = await self.db_client.set(key, token, nx=True, px=int(self.ttl * 1000))
+        except redis.RedisError as e:
+            logger.warning(f"Error acquiring lease {key}, running without it: {type(e).__name__}: {e}")
+            return ActionLease(key=key, acquired=True)
+        return ActionLease(key=key, token=token, acquired=bool(acquired))
+
+    async def renew(self, lease: ActionLease) -> bool:
+        renewed = await self.db_client.eval(RENEW_SCRIPT, 1, lease.key, lease.token, int(self.ttl * 1000))
+        return bool(renewed)
+
+    async def release(self, lease: ActionLease):
+        if not lease.acquired or lease.token is None:
+            return
+        try:
+            await self.db_client.eval(RELEASE_SCRIPT, 1, lease.key, lease.token)
+        except redis.RedisError as e:  # It will expire anyway
+            logger.warning(f"Error releasing lease {lease.key}: {type(e).__name__}: {e}")
+
+    async def _keep_renewed(self, lease: ActionLease):
+        while True:
+            await asyncio.sleep(self.ttl / 3)
+            try:
+                if not await self.renew(lease):
+                    logger.warning(f"Lease {lease.key} with token {lease.token} was lost before the action finished.")
+                    lease.mark_lost()
+                    return
+            except redis.RedisError as e:
+                logger.warning(f"Error renewing lease {lease.key}: {type(e).__name__}: {e}")
+
+    @asynccontextmanager
+    async def lease(self, integration_id: str, action_id: str):
+        """
+        Yields an ActionLease. Callers must check lease.acquired: when it's False, another execution
+        of the same action for the same integration holds the lease.
+        """
+        lease = await self.acquire(integration_id, action_id)
+        if not lease.acquired or lease.token is None:
+            yield lease
+            return
+        renewal = asyncio.create_task(self._keep_renewed(lease))
+        try:
+            yield lease
+        finally:
+            renewal.cancel()
+            await self.release(lease)
+
+    def __str__(self):
+        connection_kwargs = self.db_client.connection_pool.connection_kwargs
+        return f"ActionLeaseManager(host={connection_kwargs.get('host')}, port={connection_kwargs.get('port')}, db={connection_kwargs.get('db')})"
+
+    def __repr__(self):
+        return self.__str__()
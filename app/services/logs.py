@@ -0,0 +1,23 @@
+import json
+import random
+from typing import Any, Optional
+
+from app import settings
+from app.services.event_payloads import truncate
+
+
+def is_sampled(sample_rate: float) -> bool:
+    """True for a sample_rate fraction of the calls (0 never, 1 always)."""
+    return sample_rate >= 1 or (sample_rate > 0 and random.random() < sample_rate)
+
+
+def get_payload_preview(payload: Any, max_length: Optional[int] = None) -> str:
+    """Compact text of a payload for logs, cut to max_length chars (LOG_PAYLOAD_PREVIEW_MAX_LENGTH by default)."""
+    max_length = settings.LOG_PAYLOAD_PREVIEW_MAX_LENGTH if max_length is None else max_length
+    if isinstance(payload, bytes):
+        text = payload.decode("utf-8", errors="replace")
+    elif isinstance(payload, str):
+        text = payload
+    else:
+        text = json.dumps(payload, default=str, separators=(",", ":"))
+    return truncate(text, max_length=max_length)
@@ -0,0 +1,252 @@
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional
+
+from app import settings
+
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_PREFIX = "segment-"
+SEGMENT_SUFFIX = ".jsonl"
+
+
+class DiskOutbox:
+    """
+    Append-only buffer on disk for system events that couldn't be published.
+    Events are written as json lines into segment files that are rotated by size. Segments are
+    fsync'ed every fsync_batch_size events (and when closed), and the oldest ones are deleted
+    when the outbox grows over max_bytes. replay() sends the closed segments oldest first
+    and removes each one once all its events were published.
+    File I/O runs in worker threads, the sizes and event counts of the segments are kept in memory.
+    """
+
+    def __init__(
+            self,
+            directory: str,
+            max_bytes: int = 100 * 1024 * 1024,
+            segment_max_bytes: int = 4 * 1024 * 1024,
+            fsync_batch_size: int = 50,
+    ):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.segment_max_bytes = segment_max_bytes
+        self.fsync_batch_size = fsync_batch_size
+        self._lock = threading.Lock()
+        self._file = None
+        self._file_path = None
+        self._unsynced_count = 0
+        self._segment_seq = 0
+        self._stored_count = 0
+        self._replayed_count = 0
+        self._discarded_count = 0
+        os.makedirs(directory, exist_ok=True)
+        # Segment path -> [size in bytes, number of events], oldest first.
+        # Events in segments left by a previous process are counted only if they are discarded.
+        self._segments: Dict[str, list] = {path: [self._size(path), None] for path in self._list_segments()}
+        self._total_bytes = sum(size for size, _ in self._segments.values())
+
+    async def append(self, topic_name: str, payloads: Iterable[str]):
+        """Stores serialized events to be published later on the given topic."""
+        await asyncio.to_thread(self._append, topic_name, list(payloads))
+
+    async def flush(self):
+        await asyncio.to_thread(self._flush)
+
+    async def replay(
+            self,
+            publish: Callable[[str, List[str]], Awaitable],
+            batch_size: int = 100,
+            max_events_per_second: Optional[float] = None,
+    ) -> int:
+        """
+        Sends the stored events with await publish(topic_name, payloads), batch_size events at a time.
+        Stops at the first error, keeping the events not published yet. Returns the number of events sent.
+        """
+        await self.flush()  # Events stored from now on go to a new segment
+        with self._lock:
+            segments = list(self._segments)
+        replayed = 0
+        for segment in segments:
+            try:
+                records = await asyncio.to_thread(self._read_segment, segment)
+            except FileNotFoundError:  # Discarded by the size limit meanwhile
+                continue
+            for i in range(0, len(records), batch_size):
+                batch = records[i:i + batch_size]
+                started_at = time.monotonic()
+                try:
+                    for topic_name, payloads in self._group_by_topic(batch):
+                        await publish(topic_name, payloads)
+                except Exception as e:
+                    logger.warning(f"Error replaying events from outbox: {type(e).__name__}: {e}. Will retry later.")
+                    # Keep only what's left so that events aren't sent twice
+                    await asyncio.to_thread(self._rewrite_segment, segment, records[i:])
+                    return replayed
+                replayed += len(batch)
+                self._replayed_count += len(batch)
+                if max_events_per_second:
+                    min_duration = len(batch) / max_events_per_second
+                    if (elapsed := time.monotonic() - started_at) < min_duration:
+                        await asyncio.sleep(min_duration - elapsed)
+            await asyncio.to_thread(self._remove_segment, segment)
+        if replayed:
+            logger.info(f"Replayed {replayed} events from outbox.")
+        return replayed
+
+    def has_pending_events(self) -> bool:
+        with self._lock:
+            return bool(self._segments)
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {
+                "directory": self.directory,
+                "segments": len(self._segments),
+                "size_bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "stored_events": self._stored_count,
+                "replayed_events": self._replayed_count,
+                "discarded_events": self._discarded_count,
+            }
+
+    def _append(self, topic_name: str, payloads: List[str]):
+        with self._lock:
+            for payload in payloads:
+                line = (json.dumps({"topic": topic_name, "data": payload}) + "\n").encode("utf-8")
+                if self._file is None or self._segments[self._file_path][0] + len(line) > self.segment_max_bytes:
+                    self._open_new_segment()
+                self._file.write(line)
+                self._segments[self._file_path][0] += len(line)
+                self._segments[self._file_path][1] += 1
+                self._total_bytes += len(line)
+                self._unsynced_count += 1
+                self._stored_count += 1
+                if self._unsynced_count >= self.fsync_batch_size:
+                    self._sync()
+            if self._file is not None:
+                self._file.flush()
+            self._enforce_max_bytes()
+
+    def _flush(self):
+        with self._lock:
+            self._close_segment()
+
+    def _open_new_segment(self):
+        self._close_segment()
+        self._segment_seq += 1
+        name = f"{SEGMENT_PREFIX}{time.time_ns():020d}-{self._segment_seq:06d}{SEGMENT_SUFFIX}"
+        self._file_path = os.path.join(self.directory, name)
+        self._file = open(self._file_path, "ab")
+        self._segments[self._file_path] = [0, 0]
+
+    def _close_segment(self):
+        if self._file is None:
+            return
+        self._sync()
+        self._file.close()
+        self._file = self._file_path = None
+
+    def _sync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._unsynced_count = 0
+
+    def _list_segments(self) -> List[str]:
+        names = sorted(
+            n for n in os.listdir(self.directory) if n.startswith(SEGMENT_PREFIX) and n.endswith(SEGMENT_SUFFIX)
+        )
+        return [os.path.join(self.directory, n) for n in names]
+
+    def _enforce_max_bytes(self):
+        for segment, (size, count) in list(self._segments.items()):
+            if self._total_bytes <= self.max_bytes:
+                break
+            if segment == self._file_path:  # Never delete the segment being written
+                continue
+            discarded = count if count is not None else len(self._read_segment(segment))
+            self._forget_segment(segment)
+            self._remove(segment)
+            self._discarded_count += discarded
+            logger.warning(f"Outbox is over {self.max_bytes} bytes. {discarded} oldest events discarded.")
+
+    def _forget_segment(self, segment: str):
+        size, _ = self._segments.pop(segment, (0, None))
+        self._total_bytes -= size
+
+    def _remove_segment(self, segment: str):
+        with self._lock:
+            self._forget_segment(segment)
+        self._remove(segment)
+
+    def _rewrite_segment(self, segment: str, records: List[dict]):
+        tmp_path = f"{segment}.tmp"
+        with open(tmp_path, "wb") as f:
+            for record in records:
+                f.write((json.dumps(record) + "\n").encode("utf-8"))
+            f.flush()
+            os.fsync(f.fileno())
+        with self._lock:
+            if segment not in self._segments:  # Discarded by the size limit meanwhile
+                self._remove(tmp_path)
+                return
+            os.replace(tmp_path, segment)
+            size = self._size(segment)
+            self._total_bytes += size - self._segments[segment][0]
+            self._segments[segment] = [size, len(records)]
+
+    @staticmethod
+    def _read_segment(segment: str) -> List[dict]:
+        records = []
+        with open(segment, "rb") as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:  # i.e. a line partially written before a crash
+                    logger.warning(f"Skipping corrupted line in outbox segment {segment}")
+        return records
+
+    @staticmethod
+    def _group_by_topic(records: List[dict]):
+        # Keep the original order of events across topics
+        groups = []
+        for record in records:
+            if groups and groups[-1][0] == record["topic"]:
+                groups[-1][1].append(record["data"])
+            else:
+                groups.append((record["topic"], [record["data"]]))
+        return groups
+
+    @staticmethod
+    def _size(path: str) -> int:
+        try:
+            return os.path.getsize(path)
+        except FileNotFoundError:
+            return 0
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def get_outbox() -> Optional[DiskOutbox]:
+    """Returns the process-wide outbox, or None when EVENTS_OUTBOX_DIR isn't set."""
+    global _outbox
+    if _outbox is None and settings.EVENTS_OUTBOX_DIR:
+        _outbox = DiskOutbox(
+            directory=settings.EVENTS_OUTBOX_DIR,
+            max_bytes=settings.EVENTS_OUTBOX_MAX_BYTES,
+            segment_max_bytes=settings.EVENTS_OUTBOX_SEGMENT_MAX_BYTES,
+            fsync_batch_size=settings.EVENTS_OUTBOX_FSYNC_BATCH_SIZE,
+        )
+    return _outbox
+
+
+_outbox: Optional[DiskOutbox] = None
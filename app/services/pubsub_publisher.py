@@ -0,0 +1,266 @@
+import asyncio
+import logging
+from collections import defaultdict
+from typing import List, Optional, Tuple
+
+import aiohttp
+import stamina
+from gundi_core.events import SystemEventBaseModel
+from app import settings
+from app.services.event_payloads import serialize_event
+from app.services.outbox import get_outbox
+from app.services.utils import LazyModule
+
+
+logger = logging.getLogger(__name__)
+pubsub = LazyModule("gcloud.aio.pubsub")  # Imported when the publisher starts
+
+
+class BatchPublisher:
+    """
+    Publishes system events to PubSub in batches from a background task.
+    Events are queued and sent when max_batch_size events are waiting or max_latency seconds
+    have passed since the first one, using a single HTTP session for the whole process.
+    The queue is bounded: when it's full, callers wait until there's room (backpressure).
+    """
+
+    def __init__(
+            self,
+            max_batch_size: int = 100,
+            max_latency: float = 0.5,
+            max_queue_size: int = 1000,
+            drain_timeout: float = 10.0,
+            retry_attempts: int = 5,
+            retry_wait_initial: float = 4.0,
+            retry_wait_max: float = 60,
+    ):
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency
+        self.max_queue_size = max_queue_size
+        self.drain_timeout = drain_timeout
+        self.retry_attempts = retry_attempts
+        self.retry_wait_initial = retry_wait_initial
+        self.retry_wait_max = retry_wait_max
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._current_batch: List[Tuple[str, SystemEventBaseModel]] = []
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._client = None
+        self._published_count = 0
+        self._failed_count = 0
+        self._requests_count = 0
+        self._dropped_count = 0
+
+    @property
+    def is_running(self) -> bool:
+        return self._worker is not None and not self._worker.done()
+
+    async def start(self):
+        if self.is_running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._session = aiohttp.ClientSession(
+            raise_for_status=True, timeout=aiohttp.ClientTimeout(total=20.0)
+        )
+        self._client = pubsub.PublisherClient(session=self._session)
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """
+        Publishes the events still in the queue (up to drain_timeout seconds) and closes the session.
+        Events not published by then are saved in the outbox, if there's one.
+        """
+        if self._worker is None:
+            return
+        worker, self._worker = self._worker, None
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=self.drain_timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Timeout draining the PubSub publisher. {self._queue.qsize()} events are still queued.")
+        worker.cancel()
+        try:
+            await worker
+        except asyncio.CancelledError:
+            pass
+        await self._save_unpublished()
+        await self._session.close()
+        self._session = self._client = None
+
+    async def publish(self, event: SystemEventBaseModel, topic_name: str):
+        """Queues an event to be published. Waits if the queue is full."""
+        await self._queue.put((topic_name, event))
+
+    def publish_nowait(self, event: SystemEventBaseModel, topic_name: str) -> bool:
+        """Queues an event without waiting. If the queue is full the event is dropped and False is returned."""
+        try:
+            self._queue.put_nowait((topic_name, event))
+        except asyncio.QueueFull:
+            self._dropped_count += 1
+            logger.warning(f"PubSub publisher queue is full. Event {type(event).__name__} dropped.")
+            return False
+        return True
+
+    def get_stats(self) -> dict:
+        return {
+            "running": self.is_running,
+            "queue_size": self._queue.qsize() if self._queue else 0,
+            "max_queue_size": self.max_queue_size,
+            "published_events": self._published_count,
+            "failed_events": self._failed_count,
+            "dropped_events": self._dropped_count,
+            "publish_requests": self._requests_count,
+        }
+
+    async def _run(self):
+        while True:
+            batch = self._current_batch = await self._get_batch()
+            try:
+                await self._publish_batch(batch)
+            except Exception as e:  # Keep the worker alive, or callers waiting on a full queue would hang
+                self._failed_count += len(batch)
+                logger.exception(f"Error publishing {len(batch)} system events: {type(e).__name__}: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            self._current_batch = []  # Kept when the worker is cancelled while sending it
+
+    async def _save_unpublished(self):
+        # The batch being sent when the worker was cancelled may be sent again on replay (at least once delivery)
+        unpublished = list(self._current_batch)
+        self._current_batch = []
+        while not self._queue.empty():
+            unpublished.append(self._queue.get_nowait())
+            self._queue.task_done()
+        if not unpublished:
+            return
+        if not (outbox := get_outbox()):
+            self._dropped_count += len(unpublished)
+            logger.warning(f"{len(unpublished)} events were not published before shutdown and were dropped.")
+            return
+        events_by_topic = defaultdict(list)
+        for topic_name, event in unpublished:
+            events_by_topic[topic_name].append(event)
+        for topic_name, events in events_by_topic.items():
+            await outbox.append(topic_name, self._serialize(events))
+        logger.warning(f"{len(unpublished)} events were not published before shutdown and were saved in the outbox.")
+
+    async def _get_batch(self) -> List[Tuple[str, SystemEventBaseModel]]:
+        batch = [await self._queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_latency
+        while len(batch) < self.max_batch_size:
+            try:  # Take whatever is ready, then wait for more until the deadline
+                batch.append(self._queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout=timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _publish_batch(self, batch: List[Tuple[str, SystemEventBaseModel]]):
+        events_by_topic = defaultdict(list)
+        for topic_name, event in batch:
+            events_by_topic[topic_name].append(event)
+        for topic_name, events in events_by_topic.items():
+            payloads = self._serialize(events)
+            if not payloads:
+                continue
+            logger.debug(f"Sending {len(payloads)} events to PubSub topic {topic_name}..")
+            try:
+                async for attempt in stamina.retry_context(
+                        on=(aiohttp.ClientError, asyncio.TimeoutError),
+                        attempts=self.retry_attempts,
+                        wait_initial=self.retry_wait_initial,
+                        wait_max=self.retry_wait_max,
+                        wait_jitter=5.0
+                ):
+                    with attempt:
+                        await self._send(topic_name, payloads)
+            except Exception as e:
+                self._failed_count += len(payloads)
+                logger.exception(
+                    f"Error publishing {len(payloads)} system events to topic {topic_name}: {type(e).__name__}: {e}"
+                )
+                if outbox := get_outbox():  # Keep them on disk to be replayed later
+                    await outbox.append(topic_name, payloads)
+            else:
+                self._published_count += len(payloads)
+                logger.debug(f"{len(payloads)} system events published successfully to {topic_name}.")
+
+    def _serialize(self, events: List[SystemEventBaseModel]) -> List[str]:
+        payloads = []
+        for event in events:
+            try:
+                payloads.append(serialize_event(event))
+            except Exception as e:  # Drop only the event that can't be serialized
+                self._failed_count += 1
+                logger.exception(f"Error serializing system event {type(event).__name__}: {type(e).__name__}: {e}")
+        return payloads
+
+    async def _send(self, topic_name: str, payloads: List[str]):
+        topic = self._client.topic_path(settings.GCP_PROJECT_ID, topic_name)
+        messages = [pubsub.PubsubMessage(payload.encode("utf-8")) for payload in payloads]
+        self._requests_count += 1
+        return await self._client.publish(topic, messages)
+
+
+event_publisher = BatchPublisher(
+    max_batch_size=settings.PUBSUB_PUBLISHER_MAX_BATCH_SIZE,
+    max_latency=settings.PUBSUB_PUBLISHER_MAX_LATENCY,
+    max_queue_size=settings.PUBSUB_PUBLISHER_MAX_QUEUE_SIZE,
+    drain_timeout=settings.PUBSUB_PUBLISHER_DRAIN_TIMEOUT,
+    retry_attempts=settings.PUBSUB_PUBLISHER_RETRY_ATTEMPTS,
+    retry_wait_initial=settings.PUBSUB_PUBLISHER_RETRY_WAIT_INITIAL,
+    retry_wait_max=settings.PUBSUB_PUBLISHER_RETRY_WAIT_MAX,
+)
+
+
+_outbox_replay_task: Optional[asyncio.Task] = None
+
+
+def start_outbox_replay():
+    """Starts replaying the events stored in the outbox periodically, if there's an outbox."""
+    global _outbox_replay_task
+    if get_outbox() and _outbox_replay_task is None:
+        _outbox_replay_task = asyncio.create_task(_replay_outbox_periodically())
+
+
+async def stop_outbox_replay():
+    global _outbox_replay_task
+    if _outbox_replay_task is None:
+        return
+    task, _outbox_replay_task = _outbox_replay_task, None
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+
+
+async def _replay_outbox_periodically():
+    outbox = get_outbox()
+    while True:
+        await asyncio.sleep(settings.EVENTS_OUTBOX_REPLAY_INTERVAL)
+        try:
+            if outbox.has_pending_events():
+                await outbox.replay(
+                    # Through the batch publisher's session when it's running, or with a new session
+                    publish=event_publisher._send if event_publisher.is_running else _publish_payloads_now,
+                    batch_size=event_publisher.max_batch_size,
+                    max_events_per_second=settings.EVENTS_OUTBOX_REPLAY_MAX_RATE,
+                )
+        except Exception as e:
+            logger.exception(f"Error replaying events from outbox: {type(e).__name__}: {e}")
+
+
+async def _publish_payloads_now(topic_name: str, payloads: List[str]):
+    async with aiohttp.ClientSession(raise_for_status=True, timeout=aiohttp.ClientTimeout(total=20.0)) as session:
+        client = pubsub.PublisherClient(session=session)
+        topic = client.topic_path(settings.GCP_PROJECT_ID, topic_name)
+        return await client.publish(topic, [pubsub.PubsubMessage(payload.encode("utf-8")) for payload in payloads])
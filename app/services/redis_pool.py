@@ -0,0 +1,62 @@
+import logging
+from typing import Dict, List, Tuple
+
+import redis.asyncio as redis
+from app import settings
+
+
+logger = logging.getLogger(__name__)
+
+# One pool per (host, port, db), shared by every state and config manager in the process
+_connection_pools: Dict[Tuple[str, int, int], redis.BlockingConnectionPool] = {}
+
+
+def get_connection_pool(host: str = None, port: int = None, db: int = 0) -> redis.BlockingConnectionPool:
+    """
+    Returns the process-wide connection pool for a Redis database, creating it on first use.
+    When all connections are busy, callers wait up to REDIS_POOL_TIMEOUT seconds for one to be released.
+    """
+    host = host or settings.REDIS_HOST
+    port = port or settings.REDIS_PORT
+    key = (host, port, db)
+    if (pool := _connection_pools.get(key)) is None:
+        pool = redis.BlockingConnectionPool(
+            host=host,
+            port=port,
+            db=db,
+            max_connections=settings.REDIS_MAX_CONNECTIONS,
+            timeout=settings.REDIS_POOL_TIMEOUT,
+            health_check_interval=settings.REDIS_HEALTH_CHECK_INTERVAL,
+            socket_keepalive=settings.REDIS_SOCKET_KEEPALIVE,
+            socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+            socket_connect_timeout=settings.REDIS_SOCKET_CONNECT_TIMEOUT,
+        )
+        _connection_pools[key] = pool
+    return pool
+
+
+def get_connection_pools_stats() -> List[dict]:
+    """Connection usage of each pool, for monitoring."""
+    stats = []
+    for (host, port, db), pool in _connection_pools.items():
+        in_use = len(pool._in_use_connections)
+        stats.append({
+            "host": host,
+            "port": port,
+            "db": db,
+            "max_connections": pool.max_connections,
+            "in_use_connections": in_use,
+            "available_connections": len(pool._available_connections),
+            "utilization": in_use / pool.max_connections if pool.max_connections else 0.0,
+        })
+    return stats
+
+
+async def close_connection_pools():
+    """Disconnects and forgets all the pools. Called on application shutdown."""
+    while _connection_pools:
+        key, pool = _connection_pools.popitem()
+        try:
+            await pool.disconnect()
+        except Exception as e:
+            logger.warning(f"Error closing Redis connection pool {key}: {type(e).__name__}: {e}")
@@ -1,8 +1,12 @@
 import json
+from typing import Optional
+
 import stamina
 import httpx
 import redis.asyncio as redis
 from app import settings
+from app.services.locks import SET_IF_LEASE_HELD_SCRIPT, ActionLease, ActionLeaseLost
+from app.services.redis_pool import get_connection_pool
 
 
 class IntegrationStateManager:
@@ -11,7 +15,7 @@ class IntegrationStateManager:
         host = kwargs.get("host", settings.REDIS_HOST)
         port = kwargs.get("port", settings.REDIS_PORT)
         db = kwargs.get("db", settings.REDIS_STATE_DB)
-        self.db_client = redis.Redis(host=host, port=port, db=db)
+        self.db_client = redis.Redis(connection_pool=get_connection_pool(host=host, port=port, db=db))
 
     async def get_state(self, integration_id: str, action_id: str, source_id: str = "no-source") -> dict:
         for attempt in stamina.retry_context(on=redis.RedisError, attempts=5, wait_initial=1.0, wait_max=30, wait_jitter=3.0):
@@ -20,13 +24,24 @@ class IntegrationStateManager:
         value = json.loads(json_value) if json_value else {}
         return value
 
-    async def set_state(self, integration_id: str, action_id: str, state: dict, source_id: str = "no-source"):
+    async def set_state(
+            self, integration_id: str, action_id: str, state: dict, source_id: str = "no-source",
+            lease: Optional[ActionLease] = None
+    ):
+        """
+        Saves the state. With a lease, it's saved only if the lease still holds its fencing token,
+        otherwise ActionLeaseLost is raised.
+        """
+        key = f"integration_state.{integration_id}.{action_id}.{source_id}"
+        value = json.dumps(state, default=str)
         for attempt in stamina.retry_context(on=redis.RedisError, attempts=5, wait_initial=1.0, wait_max=30, wait_jitter=3.0):
             with attempt:
-                await self.db_client.set(
-                    f"integration_state.{integration_id}.{action_id}.{source_id}",
-                    json.dumps(state, default=str)
-                )
+                if lease is None or lease.token is None:
+                    await self.db_client.set(key, value)
+                    return
+                saved = await self.db_client.eval(SET_IF_LEASE_HELD_SCRIPT, 2, key, lease.key, value, lease.token)
+        if not saved:
+            raise ActionLeaseLost(f"State {key} not saved: lease {lease.key} with token {lease.token} was lost")
 
     async def delete_state(self, integration_id: str, action_id: str, source_id: str = "no-source"):
         for attempt in stamina.retry_context(on=redis.RedisError, attempts=5, wait_initial=1.0, wait_max=30, wait_jitter=3.0):
@@ -36,7 +51,8 @@ class IntegrationStateManager:
                 )
 
     def __str__(self):
-        return f"IntegrationStateManager(host={self.db_client.host}, port={self.db_client.port}, db={self.db_client.db})"
+        connection_kwargs = self.db_client.connection_pool.connection_kwargs
+        return f"IntegrationStateManager(host={connection_kwargs.get('host')}, port={connection_kwargs.get('port')}, db={connection_kwargs.get('db')})"
 
     def __repr__(self):
         return self.__str__()
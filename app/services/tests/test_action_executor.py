@@ -0,0 +1,108 @@
+import asyncio
+
+import pytest
+
+from app.services.action_executor import ActionExecutor, ActionExecutorSaturated, IntegrationBusy
+
+
+class ActionProbe:
+    def __init__(self):
+        self.running = set()
+        self.max_running = 0
+        self.release = asyncio.Event()
+
+    async def __call__(self, integration_id, action_id):
+        self.running.add((integration_id, action_id))
+        self.max_running = max(self.max_running, len(self.running))
+        await self.release.wait()
+        self.running.discard((integration_id, action_id))
+        return action_id
+
+
+@pytest.mark.asyncio
+async def test_action_executor_limits_concurrency():
+    executor = ActionExecutor(max_concurrency=2, max_queue_size=10)
+    action = ActionProbe()
+
+    tasks = [
+        executor.run_in_background(
+            executor.submit(f"integration-{i}", action, integration_id=f"integration-{i}", action_id="pull_events")
+        )
+        for i in range(5)
+    ]
+    await asyncio.sleep(0.01)
+    assert executor.get_stats()["running"] == 2
+    assert executor.get_stats()["queued"] == 3
+    action.release.set()
+    await asyncio.gather(*tasks)
+
+    assert action.max_running == 2
+    assert executor.get_stats()["completed"] == 5
+
+
+@pytest.mark.asyncio
+async def test_action_executor_rejects_actions_of_a_busy_integration():
+    executor = ActionExecutor(max_concurrency=5, max_queue_size=10)
+    action = ActionProbe()
+    task = executor.submit("integration-1", action, integration_id="integration-1", action_id="action-0")
+
+    with pytest.raises(IntegrationBusy):
+        executor.submit("integration-1", action, integration_id="integration-1", action_id="action-1")
+    other_task = executor.submit("integration-2", action, integration_id="integration-2", action_id="action-0")
+
+    action.release.set()
+    assert await asyncio.gather(task, other_task) == ["action-0", "action-0"]
+    assert executor.get_stats()["rejected"] == 1
+    # Accepted again once the first one finished
+    assert await executor.submit("integration-1", action, integration_id="integration-1", action_id="action-1") == "action-1"
+
+
+@pytest.mark.asyncio
+async def test_action_executor_counters_do_not_leak_when_cancelled_before_starting():
+    executor = ActionExecutor(max_concurrency=1, max_queue_size=10)
+    action = ActionProbe()
+    tasks = [executor.submit(f"integration-{i}", action, integration_id=f"i{i}", action_id="a") for i in range(3)]
+    for task in tasks:  # Before any of them had a chance to start
+        task.cancel()
+
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    stats = executor.get_stats()
+    assert stats["queued"] == 0
+    assert stats["running"] == 0
+    action.release.set()
+    assert await executor.submit("integration-0", action, integration_id="i0", action_id="a") == "a"
+
+
+@pytest.mark.asyncio
+async def test_action_executor_rejects_when_saturated():
+    executor = ActionExecutor(max_concurrency=1, max_queue_size=1)
+    action = ActionProbe()
+    tasks = [
+        executor.run_in_background(executor.submit(f"integration-{i}", action, integration_id=f"i{i}", action_id="a"))
+        for i in range(2)
+    ]
+
+    with pytest.raises(ActionExecutorSaturated):
+        executor.submit("integration-3", action, integration_id="i3", action_id="a")
+
+    assert executor.get_stats()["rejected"] == 1
+    action.release.set()
+    await asyncio.gather(*tasks)
+    assert not executor.is_saturated
+
+
+@pytest.mark.asyncio
+async def test_action_executor_cancels_running_actions_after_shutdown_timeout():
+    executor = ActionExecutor(max_concurrency=2, max_queue_size=10)
+    action = ActionProbe()
+    tasks = [
+        executor.run_in_background(executor.submit(f"integration-{i}", action, integration_id=f"i{i}", action_id="a"))
+        for i in range(2)
+    ]
+    await asyncio.sleep(0.01)
+
+    await asyncio.wait_for(executor.shutdown(timeout=0.05), timeout=2)
+
+    assert all(task.cancelled() for task in tasks)
+    assert executor.get_stats()["running"] == 0
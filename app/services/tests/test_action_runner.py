@@ -10,6 +10,7 @@ from gundi_core.events import IntegrationActionFailed
 from app import settings
 from app.conftest import MockSubActionConfiguration
 from app.main import app
+from app.services.action_executor import ActionExecutor
 from app.services.action_scheduler import trigger_action
 
 api_client = TestClient(app)
@@ -285,3 +286,51 @@ async def test_execute_action_with_handler_error(
     assert event.payload.server_response_status == expected_error.response.status_code
     assert event.payload.server_response_body == str(expected_error.response.text)
 
+
+
+@pytest.mark.asyncio
+async def test_execute_action_from_pubsub_is_rejected_when_saturated(
+        mocker, mock_publish_event, mock_action_handlers, mock_config_manager,
+        pubsub_message_request_headers, event_v2_pubsub_payload
+):
+    mocker.patch("app.services.action_runner.action_handlers", mock_action_handlers)
+    mocker.patch("app.services.action_runner.config_manager", mock_config_manager)
+    mocker.patch("app.services.action_runner.publish_event", mock_publish_event)
+    mocker.patch("app.main.action_executor", ActionExecutor(max_concurrency=0, max_queue_size=0))
+
+    response = api_client.post(
+        "/",
+        headers=pubsub_message_request_headers,
+        json=event_v2_pubsub_payload,
+    )
+
+    assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+    assert not mock_config_manager.get_integration_details.called
+
+
+@pytest.mark.asyncio
+async def test_execute_action_from_pubsub_logs_sampled_payload_preview(
+        mocker, caplog, mock_gundi_client_v2, mock_publish_event, mock_action_handlers, mock_config_manager,
+        pubsub_message_request_headers, event_v2_pubsub_payload
+):
+    mocker.patch("app.services.action_runner.action_handlers", mock_action_handlers)
+    mocker.patch("app.services.action_runner._portal", mock_gundi_client_v2)
+    mocker.patch("app.services.action_runner.config_manager", mock_config_manager)
+    mocker.patch("app.services.activity_logger.publish_event", mock_publish_event)
+    mocker.patch("app.services.action_runner.publish_event", mock_publish_event)
+    mocker.patch("app.main.settings.PUBSUB_MESSAGES_LOG_SAMPLE_RATE", 1.0)
+    mocker.patch("app.services.logs.settings.LOG_PAYLOAD_PREVIEW_MAX_LENGTH", 20)
+
+    with caplog.at_level("INFO", logger="app.main"):
+        response = api_client.post(
+            "/",
+            headers=pubsub_message_request_headers,
+            json=event_v2_pubsub_payload,
+        )
+
+    assert response.status_code == 200
+    record = next(r for r in caplog.records if r.name == "app.main" and r.getMessage() == "Message Received.")
+    payload_dict = json.loads(base64.b64decode(event_v2_pubsub_payload["message"]["data"]).decode("utf-8"))
+    assert record.integration_id == payload_dict["integration_id"]
+    assert record.payload_preview.startswith(json.dumps(payload_dict, separators=(",", ":"))[:20])
+    assert "more chars" in record.payload_preview
@@ -1,6 +1,12 @@
+import asyncio
+
 import pytest
 
+from app import settings
+from app.conftest import async_return
+
 from gundi_core.schemas.v2 import IntegrationSummary, IntegrationActionConfiguration, Integration
+from app.services import config_manager as config_manager_module
 from app.services.config_manager import IntegrationConfigurationManager
 
 
@@ -106,8 +112,254 @@ async def test_get_integration_details_with_empty_redis_db(
     assert isinstance(integration, Integration)
     assert len(integration.configurations) == len(integration_v2.configurations)
     assert integration.id == integration_v2.id
-    mock_gundi_client_v2_class.return_value.get_integration_details.assert_called_with(integration_id)
+    # The integration is not in the redis db, so it is reloaded (once) from Gundi with all its configurations
+    mock_gundi_client_v2_class.return_value.get_integration_details.assert_called_once_with(integration_id)
+    mock_redis_empty.Redis.return_value.get.assert_called_once_with(f"integration.{integration_id}")
+    mock_redis_empty.Redis.return_value.pipeline.return_value.set.assert_any_call(
+        f"integration.{integration_id}", IntegrationSummary.from_integration(integration_v2).json()
+    )
     for config in integration_v2.configurations:
-        action_id = config.action.value
-        mock_redis_empty.Redis.return_value.get.assert_any_call(f"integrationconfig.{integration_id}.{action_id}")
+        mock_redis_empty.Redis.return_value.pipeline.return_value.set.assert_any_call(
+            f"integrationconfig.{integration_id}.{config.action.value}", config.json()
+        )
+    assert mock_redis_empty.Redis.return_value.pipeline.return_value.execute.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_get_integration_details_fetches_all_configurations_at_once(
+        mocker, mock_redis_with_integration_config, mock_gundi_client_v2_class, integration_v2,
+):
+    mocker.patch("app.services.config_manager.redis", mock_redis_with_integration_config)
+    mocker.patch("app.services.config_manager.GundiClient", mock_gundi_client_v2_class)
+    config_manager = IntegrationConfigurationManager()
+    integration_id = str(integration_v2.id)
+
+    integration = await config_manager.get_integration_details(integration_id)
+
+    assert integration.configurations == integration_v2.configurations
+    redis_client = mock_redis_with_integration_config.Redis.return_value
+    redis_client.get.assert_called_once_with(f"integration.{integration_id}")
+    redis_client.mget.assert_called_once_with([
+        f"integrationconfig.{integration_id}.{action.value}" for action in integration_v2.type.actions
+    ])
+    assert not mock_gundi_client_v2_class.return_value.get_integration_details.called
+
+
+@pytest.mark.asyncio
+async def test_get_integration_details_reloads_once_when_a_configuration_is_missing(
+        mocker, mock_redis_with_integration_config, mock_gundi_client_v2_class, integration_v2,
+):
+    mocker.patch("app.services.config_manager.redis", mock_redis_with_integration_config)
+    mocker.patch("app.services.config_manager.GundiClient", mock_gundi_client_v2_class)
+    redis_client = mock_redis_with_integration_config.Redis.return_value
+    redis_client.mget.return_value = async_return([None] * len(integration_v2.type.actions))
+    config_manager = IntegrationConfigurationManager()
+    integration_id = str(integration_v2.id)
+
+    integration = await config_manager.get_integration_details(integration_id)
+
+    assert integration.configurations == integration_v2.configurations
+    mock_gundi_client_v2_class.return_value.get_integration_details.assert_called_once_with(integration_id)
+
+
+
+@pytest.mark.asyncio
+async def test_get_integration_details_is_cached_in_memory(
+        mocker, mock_redis_empty, mock_gundi_client_v2_class, integration_v2,
+):
+    mocker.patch("app.services.config_manager.redis", mock_redis_empty)
+    mocker.patch("app.services.config_manager.GundiClient", mock_gundi_client_v2_class)
+    config_manager = IntegrationConfigurationManager()
+    integration_id = str(integration_v2.id)
+    action_id = integration_v2.configurations[0].action.value
+
+    integration = await config_manager.get_integration_details(integration_id)
+    mock_redis_empty.Redis.return_value.get.reset_mock()
+    cached_integration = await config_manager.get_integration_details(integration_id)
+    action_config = await config_manager.get_action_configuration(integration_id, action_id)
+
+    assert cached_integration is integration
+    assert action_config == integration.get_action_config(action_id)
+    assert action_config is not integration.get_action_config(action_id)
+    assert not mock_redis_empty.Redis.return_value.get.called
+
+
+@pytest.mark.asyncio
+async def test_integration_details_cache_invalidated_on_config_change(
+        mocker, mock_redis_empty, mock_gundi_client_v2_class, integration_v2,
+):
+    mocker.patch("app.services.config_manager.redis", mock_redis_empty)
+    mocker.patch("app.services.config_manager.GundiClient", mock_gundi_client_v2_class)
+    config_manager = IntegrationConfigurationManager()
+    # A different manager (e.g. the config events consumer) applies the change
+    other_config_manager = IntegrationConfigurationManager()
+    integration_id = str(integration_v2.id)
+    action_config = integration_v2.configurations[0]
+
+    await config_manager.get_integration_details(integration_id)
+    await other_config_manager.set_action_configuration(integration_id, action_config.action.value, action_config)
+    mock_redis_empty.Redis.return_value.get.reset_mock()
+    await config_manager.get_integration_details(integration_id)
+
+    mock_redis_empty.Redis.return_value.get.assert_any_call(f"integration.{integration_id}")
+
+
+@pytest.fixture
+def mock_slow_gundi_client_class(mocker, integration_v2):
+    async def get_integration_details(integration_id):
+        await asyncio.sleep(0.01)
+        return integration_v2
+
+    mock_client = mocker.MagicMock()
+    mock_client.get_integration_details = mocker.MagicMock(side_effect=get_integration_details)
+    mock_client.__aenter__.return_value = mock_client
+    mock_client_class = mocker.MagicMock()
+    mock_client_class.return_value = mock_client
+    return mock_client_class
+
+
+@pytest.mark.asyncio
+async def test_concurrent_cache_misses_make_one_gundi_request(
+        mocker, mock_redis_empty, mock_slow_gundi_client_class, integration_v2,
+):
+    mocker.patch("app.services.config_manager.redis", mock_redis_empty)
+    mocker.patch("app.services.config_manager.GundiClient", mock_slow_gundi_client_class)
+    config_manager = IntegrationConfigurationManager()
+    integration_id = str(integration_v2.id)
+
+    results = await asyncio.gather(*[
+        config_manager.get_integration_details(integration_id) for _ in range(5)
+    ] + [
+        config_manager.get_action_configuration(integration_id, "pull_observations") for _ in range(5)
+    ])
+
+    assert all(r.id == integration_v2.id for r in results[:5])
+    mock_slow_gundi_client_class.return_value.get_integration_details.assert_called_once_with(integration_id)
+
+
+@pytest.mark.asyncio
+async def test_load_in_flight_during_config_change_is_not_cached(
+        mocker, mock_redis_empty, mock_slow_gundi_client_class, integration_v2,
+):
+    mocker.patch("app.services.config_manager.redis", mock_redis_empty)
+    mocker.patch("app.services.config_manager.GundiClient", mock_slow_gundi_client_class)
+    config_manager = IntegrationConfigurationManager()
+    integration_id = str(integration_v2.id)
+    action_config = integration_v2.configurations[0]
+
+    load = asyncio.ensure_future(config_manager.get_integration_details(integration_id))
+    await asyncio.sleep(0.001)  # The load is reading the previous configuration from Gundi
+    await config_manager.set_action_configuration(integration_id, action_config.action.value, action_config)
+    await load
+    mock_slow_gundi_client_class.return_value.get_integration_details.reset_mock()
+    await config_manager.get_integration_details(integration_id)
+
+    # Loaded again, the result of the load started before the change was dropped
+    mock_slow_gundi_client_class.return_value.get_integration_details.assert_called_once_with(integration_id)
+
+
+@pytest.mark.asyncio
+async def test_stale_integration_details_are_served_while_revalidating(
+        mocker, mock_redis_with_integration_config, mock_gundi_client_v2_class, integration_v2,
+):
+    mocker.patch("app.services.config_manager.redis", mock_redis_with_integration_config)
+    mocker.patch("app.services.config_manager.GundiClient", mock_gundi_client_v2_class)
+    mocker.patch("app.services.config_manager.settings.INTEGRATION_CACHE_STALE_WHILE_REVALIDATE", True)
+    mock_time = mocker.patch("app.services.utils.time")
+    mock_time.monotonic.return_value = 0.0
+    config_manager = IntegrationConfigurationManager()
+    integration_id = str(integration_v2.id)
+    redis_client = mock_redis_with_integration_config.Redis.return_value
+
+    stale_integration = await config_manager.get_integration_details(integration_id)
+    mock_time.monotonic.return_value = 10_000.0  # Past the TTL
+    redis_client.get.reset_mock()
+
+    integration = await config_manager.get_integration_details(integration_id)
+    assert integration is stale_integration
+    await asyncio.sleep(0)  # Let the background refresh run
+    refreshed_integration = await config_manager.get_integration_details(integration_id)
+
+    redis_client.get.assert_called_once_with(f"integration.{integration_id}")
+    assert refreshed_integration is not stale_integration
+
+
+@pytest.mark.asyncio
+async def test_expired_integration_details_keep_loads_in_flight(
+        mocker, mock_redis_with_integration_config, mock_gundi_client_v2_class, integration_v2,
+):
+    mocker.patch("app.services.config_manager.redis", mock_redis_with_integration_config)
+    mocker.patch("app.services.config_manager.GundiClient", mock_gundi_client_v2_class)
+    mocker.patch("app.services.config_manager.settings.INTEGRATION_CACHE_STALE_WHILE_REVALIDATE", False)
+    mock_time = mocker.patch("app.services.utils.time")
+    mock_time.monotonic.return_value = 0.0
+    config_manager = IntegrationConfigurationManager()
+    integration_id = str(integration_v2.id)
+
+    await config_manager.get_integration_details(integration_id)
+    generation = config_manager_module._cache_generations.get(integration_id, 0)
+    load_in_flight = asyncio.get_running_loop().create_future()
+    mocker.patch.dict(config_manager_module._requests_in_flight, {("reload", integration_id): load_in_flight})
+    mock_time.monotonic.return_value = 10_000.0  # Past the TTL
+
+    assert config_manager._get_cached_integration_details(integration_id) is None
+
+    # An expiry isn't a configuration change, concurrent callers can still join the same load
+    assert config_manager_module._cache_generations.get(integration_id, 0) == generation
+    assert config_manager_module._requests_in_flight[("reload", integration_id)] is load_in_flight
+    load_in_flight.cancel()
+
+
+@pytest.fixture
+def mock_gundi_client_for_webhooks_class(mocker, integration_v2_with_webhook):
+    mock_client = mocker.MagicMock()
+    mock_client.get_integration_details.return_value = async_return(integration_v2_with_webhook)
+    mock_client.__aenter__.return_value = mock_client
+    mock_client_class = mocker.MagicMock()
+    mock_client_class.return_value = mock_client
+    return mock_client_class
+
+
+@pytest.mark.asyncio
+async def test_reload_saves_webhook_configuration_with_ttl(
+        mocker, mock_redis_empty, mock_gundi_client_for_webhooks_class, integration_v2_with_webhook,
+):
+    mocker.patch("app.services.config_manager.redis", mock_redis_empty)
+    mocker.patch("app.services.config_manager.GundiClient", mock_gundi_client_for_webhooks_class)
+    config_manager = IntegrationConfigurationManager()
+    integration_id = str(integration_v2_with_webhook.id)
+
+    integration = await config_manager.get_integration_details(integration_id)
+
+    assert integration.webhook_configuration == integration_v2_with_webhook.webhook_configuration
+    mock_redis_empty.Redis.return_value.pipeline.return_value.set.assert_any_call(
+        f"integrationwebhookconfig.{integration_id}",
+        integration_v2_with_webhook.webhook_configuration.json(),
+        ex=settings.WEBHOOK_CONFIG_CACHE_TTL
+    )
+
+
+@pytest.mark.asyncio
+async def test_get_integration_details_includes_webhook_configuration_from_redis(
+        mocker, mock_redis_empty, mock_gundi_client_for_webhooks_class, integration_v2_with_webhook,
+):
+    mocker.patch("app.services.config_manager.redis", mock_redis_empty)
+    mocker.patch("app.services.config_manager.GundiClient", mock_gundi_client_for_webhooks_class)
+    integration_id = str(integration_v2_with_webhook.id)
+    redis_client = mock_redis_empty.Redis.return_value
+    redis_client.get.return_value = async_return(
+        IntegrationSummary.from_integration(integration_v2_with_webhook).json()
+    )
+    redis_client.mget.return_value = async_return(
+        [c.json() for c in integration_v2_with_webhook.configurations]
+        + [integration_v2_with_webhook.webhook_configuration.json()]
+    )
+    config_manager = IntegrationConfigurationManager()
+
+    integration = await config_manager.get_integration_details(integration_id)
 
+    assert integration.webhook_configuration == integration_v2_with_webhook.webhook_configuration
+    redis_client.mget.assert_called_once_with([
+        f"integrationconfig.{integration_id}.{action.value}" for action in integration_v2_with_webhook.type.actions
+    ] + [f"integrationwebhookconfig.{integration_id}"])
+    assert not mock_gundi_client_for_webhooks_class.return_value.get_integration_details.called
@@ -0,0 +1,84 @@
+import json
+
+from app.actions.configurations import PullEventsConfig
+from app.services.event_payloads import (
+    get_config_data_for_event, get_config_hash, serialize_event, truncate
+)
+
+
+def test_truncate_long_strings_and_lists():
+    value = {"taxa": list(range(10)), "error": "x" * 20, "nested": [{"name": "y" * 20}]}
+
+    truncated = truncate(value, max_length=5, max_items=3)
+
+    assert truncated["taxa"] == [0, 1, 2, "... (7 more items)"]
+    assert truncated["error"] == "xxxxx... (15 more chars)"
+    assert truncated["nested"] == [{"name": "yyyyy... (15 more chars)"}]
+
+
+def test_truncate_is_disabled_with_zero_limits():
+    value = {"taxa": list(range(10)), "error": "x" * 20}
+
+    assert truncate(value, max_length=0, max_items=0) == value
+
+
+def test_config_data_full_mode_sends_whole_config(mocker):
+    mocker.patch("app.services.event_payloads.settings.SYSTEM_EVENTS_CONFIG_DATA_MODE", "full")
+    config = PullEventsConfig(taxa="1,2,3", days_to_load=5)
+
+    assert get_config_data_for_event(config) == config.dict()
+
+
+def test_config_data_summary_mode_sends_hash_and_changed_fields(mocker):
+    mocker.patch("app.services.event_payloads.settings.SYSTEM_EVENTS_CONFIG_DATA_MODE", "summary")
+    config = PullEventsConfig(taxa="1,2,3", days_to_load=5)
+
+    config_data = get_config_data_for_event(config)
+
+    assert config_data["config_hash"] == get_config_hash(config.dict())
+    assert config_data["changed_fields"]["taxa"] == "1,2,3"
+    assert config_data["changed_fields"]["days_to_load"] == 5
+    assert "event_prefix" not in config_data["changed_fields"]  # Default value
+
+
+def test_config_data_full_mode_does_not_truncate(mocker):
+    mocker.patch("app.services.event_payloads.settings.SYSTEM_EVENTS_CONFIG_DATA_MODE", "full")
+    config_data = {"taxa": list(range(500))}
+
+    assert get_config_data_for_event(config_data) == config_data
+
+
+def test_config_data_summary_mode_summarizes_integration_configurations(mocker):
+    mocker.patch("app.services.event_payloads.settings.SYSTEM_EVENTS_CONFIG_DATA_MODE", "summary")
+    configurations = [
+        {"id": "c1", "action": {"value": "pull_events"}, "data": {"taxa": list(range(500))}},
+        {"id": "c2", "action": {"value": "auth"}, "data": {"api_key": "secret"}},
+    ]
+
+    config_data = get_config_data_for_event({"configurations": configurations})
+
+    assert config_data["configurations"] == [
+        {"action_id": "pull_events", "config_hash": get_config_hash({"taxa": list(range(500))})},
+        {"action_id": "auth", "config_hash": get_config_hash({"api_key": "secret"})},
+    ]
+    assert config_data["config_hash"] == get_config_hash({"configurations": configurations})
+    assert len(json.dumps(config_data)) < len(json.dumps({"configurations": configurations}))
+
+
+def test_config_data_for_empty_config():
+    assert get_config_data_for_event(None) == {}
+
+
+def test_serialize_event(action_started_event):
+    payload = serialize_event(action_started_event)
+
+    data = json.loads(payload)
+    assert data["event_id"] == str(action_started_event.event_id)
+    assert data["payload"]["action_id"] == action_started_event.payload.action_id
+
+
+def test_serialize_event_writes_datetimes_as_before(action_started_event):
+    payload = serialize_event(action_started_event)
+
+    assert json.loads(payload)["timestamp"] == str(action_started_event.timestamp)
+    assert payload == json.dumps(action_started_event.dict(), default=str, separators=(",", ":"))
@@ -0,0 +1,139 @@
+import asyncio
+
+import pytest
+import redis.asyncio as redis
+
+from app.conftest import async_return, MockPullActionConfiguration
+from app.services.action_runner import execute_action
+from app.services.locks import ActionLeaseManager, ActionLeaseLost, RELEASE_SCRIPT, current_lease
+
+
+@pytest.fixture
+def mock_lease_db_client(mocker):
+    db_client = mocker.MagicMock()
+    db_client.incr.return_value = async_return(7)
+    db_client.set.return_value = async_return(True)
+    db_client.eval.side_effect = lambda *args: async_return(1)
+    return db_client
+
+
+@pytest.fixture
+def lease_manager(mock_lease_db_client):
+    manager = ActionLeaseManager(ttl=30)
+    manager.db_client = mock_lease_db_client
+    return manager
+
+
+@pytest.mark.asyncio
+async def test_lease_is_acquired_with_fencing_token(lease_manager, mock_lease_db_client, integration_v2):
+    integration_id = str(integration_v2.id)
+
+    async with lease_manager.lease(integration_id, "pull_observations") as lease:
+        assert lease.acquired
+        assert lease.token == "7"
+
+    key = f"action_lease.{integration_id}.pull_observations"
+    mock_lease_db_client.incr.assert_called_once_with(f"{key}.fencing_token")
+    mock_lease_db_client.set.assert_called_once_with(key, "7", nx=True, px=30000)
+    mock_lease_db_client.eval.assert_called_once_with(RELEASE_SCRIPT, 1, key, "7")
+
+
+@pytest.mark.asyncio
+async def test_lease_is_not_acquired_when_held(lease_manager, mock_lease_db_client, integration_v2):
+    mock_lease_db_client.set.return_value = async_return(None)
+
+    async with lease_manager.lease(str(integration_v2.id), "pull_observations") as lease:
+        assert not lease.acquired
+
+    assert not mock_lease_db_client.eval.called  # Never release someone else's lease
+
+
+@pytest.mark.asyncio
+async def test_lease_fails_open_when_redis_is_unavailable(lease_manager, mock_lease_db_client, integration_v2):
+    mock_lease_db_client.incr.side_effect = redis.ConnectionError("Connection refused")
+
+    async with lease_manager.lease(str(integration_v2.id), "pull_observations") as lease:
+        assert lease.acquired
+        assert lease.token is None
+
+
+@pytest.mark.asyncio
+async def test_lease_is_marked_lost_when_renewal_fails(mocker, lease_manager, mock_lease_db_client, integration_v2):
+    mocker.patch("app.services.locks.asyncio.sleep", side_effect=lambda *args: async_return(None))
+    mock_lease_db_client.eval.side_effect = lambda *args: async_return(0)
+    lease = await lease_manager.acquire(str(integration_v2.id), "pull_observations")
+
+    await lease_manager._keep_renewed(lease)
+
+    assert lease.lost
+
+
+@pytest.mark.asyncio
+async def test_execute_action_skips_duplicate_execution(
+        mocker, lease_manager, mock_lease_db_client, mock_action_handlers, mock_config_manager,
+        mock_publish_event, integration_v2
+):
+    mock_lease_db_client.set.return_value = async_return(None)
+    mocker.patch("app.services.action_runner.lease_manager", lease_manager)
+    mocker.patch("app.services.action_runner.action_handlers", mock_action_handlers)
+    mocker.patch("app.services.action_runner.config_manager", mock_config_manager)
+    mocker.patch("app.services.action_runner.publish_event", mock_publish_event)
+
+    result = await execute_action(integration_id=str(integration_v2.id), action_id="pull_observations")
+
+    assert result["status"] == "skipped"
+    mock_action_handler, _ = mock_action_handlers["pull_observations"]
+    assert not mock_action_handler.called
+
+
+@pytest.mark.asyncio
+async def test_execute_action_is_stopped_when_the_lease_is_lost(
+        mocker, mock_lease_manager, mock_config_manager, mock_publish_event, integration_v2
+):
+    handler_cancelled = asyncio.Event()
+
+    async def slow_action_handler(integration, action_config):
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            handler_cancelled.set()
+            raise
+
+    mock_lease_manager.ttl = 0.03
+    mock_lease_manager.db_client.eval.side_effect = lambda *args, **kwargs: async_return(0)  # Renewal fails
+    mocker.patch(
+        "app.services.action_runner.action_handlers",
+        {"pull_observations": (slow_action_handler, MockPullActionConfiguration)}
+    )
+    mocker.patch("app.services.action_runner.config_manager", mock_config_manager)
+    mocker.patch("app.services.action_runner.publish_event", mock_publish_event)
+
+    response = await execute_action(integration_id=str(integration_v2.id), action_id="pull_observations")
+
+    assert handler_cancelled.is_set()
+    assert response.status_code == 409
+    assert mock_publish_event.called
+
+
+@pytest.mark.asyncio
+async def test_execute_action_runs_the_handler_with_its_lease(
+        mocker, mock_lease_manager, mock_config_manager, mock_publish_event, integration_v2
+):
+    leases = []
+
+    async def action_handler(integration, action_config):
+        leases.append(current_lease.get())
+        raise ActionLeaseLost("State not saved")  # i.e. a fenced state write was rejected
+
+    mocker.patch(
+        "app.services.action_runner.action_handlers",
+        {"pull_observations": (action_handler, MockPullActionConfiguration)}
+    )
+    mocker.patch("app.services.action_runner.config_manager", mock_config_manager)
+    mocker.patch("app.services.action_runner.publish_event", mock_publish_event)
+
+    response = await execute_action(integration_id=str(integration_v2.id), action_id="pull_observations")
+
+    assert leases[0].token == "1"
+    assert current_lease.get() is None
+    assert response.status_code == 409
@@ -0,0 +1,121 @@
+import json
+
+import aiohttp
+import pytest
+
+from app import settings
+from app.services.activity_logger import publish_event
+from app.services.outbox import DiskOutbox
+
+
+@pytest.fixture
+def outbox(tmp_path):
+    return DiskOutbox(directory=str(tmp_path), segment_max_bytes=200, fsync_batch_size=2)
+
+
+def _payloads(count):
+    return [json.dumps({"event_id": i}) for i in range(count)]
+
+
+@pytest.mark.asyncio
+async def test_outbox_replays_events_in_order(outbox):
+    await outbox.append("integration-events", _payloads(10))
+    published = []
+
+    async def publish(topic_name, payloads):
+        published.extend((topic_name, p) for p in payloads)
+
+    replayed = await outbox.replay(publish, batch_size=3)
+
+    assert replayed == 10
+    assert published == [("integration-events", p) for p in _payloads(10)]
+    assert not outbox.has_pending_events()
+
+
+@pytest.mark.asyncio
+async def test_outbox_rotates_segments_by_size(outbox, tmp_path):
+    await outbox.append("integration-events", _payloads(10))
+
+    assert len(list(tmp_path.iterdir())) > 1
+    assert all(f.stat().st_size <= 200 for f in tmp_path.iterdir())
+
+
+@pytest.mark.asyncio
+async def test_outbox_discards_oldest_events_over_max_bytes(tmp_path):
+    outbox = DiskOutbox(directory=str(tmp_path), max_bytes=500, segment_max_bytes=200)
+
+    await outbox.append("integration-events", _payloads(50))
+
+    stats = outbox.get_stats()
+    assert stats["size_bytes"] <= 500 + 200  # The segment being written is never discarded
+    assert stats["discarded_events"] > 0
+    assert stats["discarded_events"] + len(
+        [line for f in tmp_path.iterdir() for line in f.read_text().splitlines()]
+    ) == 50
+
+
+@pytest.mark.asyncio
+async def test_outbox_discards_segments_left_by_a_previous_process(tmp_path):
+    previous = DiskOutbox(directory=str(tmp_path), segment_max_bytes=200)
+    await previous.append("integration-events", _payloads(20))
+    await previous.flush()
+    size_bytes = sum(f.stat().st_size for f in tmp_path.iterdir())
+
+    outbox = DiskOutbox(directory=str(tmp_path), max_bytes=size_bytes, segment_max_bytes=200)
+    assert outbox.has_pending_events()
+    assert outbox.get_stats()["size_bytes"] == size_bytes
+    await outbox.append("integration-events", _payloads(5))
+
+    stats = outbox.get_stats()
+    assert stats["discarded_events"] > 0
+    assert stats["size_bytes"] == sum(f.stat().st_size for f in tmp_path.iterdir())
+    assert stats["discarded_events"] + len(
+        [line for f in tmp_path.iterdir() for line in f.read_text().splitlines()]
+    ) == 25
+
+
+@pytest.mark.asyncio
+async def test_outbox_keeps_unpublished_events_on_error(outbox):
+    await outbox.append("integration-events", _payloads(6))
+    published = []
+
+    async def publish(topic_name, payloads):
+        if len(published) >= 2:
+            raise aiohttp.ClientError("PubSub unavailable")
+        published.extend(payloads)
+
+    assert await outbox.replay(publish, batch_size=2) == 2
+
+    async def publish_ok(topic_name, payloads):
+        published.extend(payloads)
+
+    assert await outbox.replay(publish_ok, batch_size=2) == 4
+    assert published == _payloads(6)  # Nothing sent twice
+
+
+@pytest.mark.asyncio
+async def test_outbox_replay_is_rate_limited(mocker, tmp_path):
+    outbox = DiskOutbox(directory=str(tmp_path))
+    mock_sleep = mocker.patch("app.services.outbox.asyncio.sleep", mocker.AsyncMock())
+    await outbox.append("integration-events", _payloads(4))
+
+    async def publish(topic_name, payloads):
+        pass
+
+    await outbox.replay(publish, batch_size=2, max_events_per_second=10)
+
+    assert mock_sleep.call_count == 2
+    assert all(0 < call.args[0] <= 0.2 for call in mock_sleep.call_args_list)
+
+
+@pytest.mark.asyncio
+async def test_publish_event_saves_event_in_outbox_on_failure(mocker, outbox, action_started_event):
+    mocker.patch(
+        "app.services.activity_logger._publish_event_now",
+        mocker.AsyncMock(side_effect=aiohttp.ClientError("PubSub unavailable"))
+    )
+    mocker.patch("app.services.activity_logger.get_outbox", return_value=outbox)
+
+    await publish_event(event=action_started_event, topic_name=settings.INTEGRATION_EVENTS_TOPIC)
+
+    assert outbox.get_stats()["stored_events"] == 1
@@ -0,0 +1,186 @@
+import asyncio
+
+import pytest
+
+from app import settings
+from app.conftest import async_return
+from app.services.activity_logger import publish_event
+from app.services.outbox import DiskOutbox
+from app.services.pubsub_publisher import BatchPublisher, event_publisher, start_outbox_replay, stop_outbox_replay
+
+
+@pytest.fixture
+def mock_publisher_pubsub(mocker, mock_pubsub_client):
+    mocker.patch("app.services.pubsub_publisher.aiohttp.ClientSession", mocker.MagicMock(
+        return_value=mocker.MagicMock(close=mocker.MagicMock(side_effect=lambda: async_return(None)))
+    ))
+    mocker.patch("app.services.pubsub_publisher.pubsub", mock_pubsub_client)
+    publisher_client = mock_pubsub_client.PublisherClient.return_value
+    publisher_client.publish = mocker.AsyncMock(return_value={"messageIds": []})
+    return mock_pubsub_client
+
+
+@pytest.mark.asyncio
+async def test_batch_publisher_sends_events_in_one_request(mock_publisher_pubsub, action_started_event):
+    publisher = BatchPublisher(max_batch_size=10, max_latency=0.05)
+    await publisher.start()
+
+    for _ in range(5):
+        await publisher.publish(action_started_event, settings.INTEGRATION_EVENTS_TOPIC)
+    await publisher.stop()
+
+    publish = mock_publisher_pubsub.PublisherClient.return_value.publish
+    publish.assert_called_once()
+    topic, messages = publish.call_args.args
+    assert topic == f"projects/{settings.GCP_PROJECT_ID}/topics/{settings.INTEGRATION_EVENTS_TOPIC}"
+    assert len(messages) == 5
+    assert mock_publisher_pubsub.PublisherClient.call_count == 1  # Shared client
+    assert publisher.get_stats()["published_events"] == 5
+
+
+@pytest.mark.asyncio
+async def test_batch_publisher_flushes_by_batch_size(mock_publisher_pubsub, action_started_event):
+    publisher = BatchPublisher(max_batch_size=2, max_latency=10)
+    await publisher.start()
+
+    for _ in range(4):
+        await publisher.publish(action_started_event, settings.INTEGRATION_EVENTS_TOPIC)
+    await asyncio.wait_for(publisher._queue.join(), timeout=1)  # Flushed without waiting for max_latency
+
+    assert mock_publisher_pubsub.PublisherClient.return_value.publish.call_count == 2
+    await publisher.stop()
+
+
+@pytest.mark.asyncio
+async def test_batch_publisher_applies_backpressure(mock_publisher_pubsub, action_started_event):
+    release_publish = asyncio.Event()
+
+    async def slow_publish(topic, messages):
+        await release_publish.wait()
+
+    mock_publisher_pubsub.PublisherClient.return_value.publish.side_effect = slow_publish
+    publisher = BatchPublisher(max_batch_size=1, max_latency=0, max_queue_size=1)
+    await publisher.start()
+    await publisher.publish(action_started_event, settings.INTEGRATION_EVENTS_TOPIC)
+    await asyncio.sleep(0)  # The worker takes the first event and waits on PubSub
+    await publisher.publish(action_started_event, settings.INTEGRATION_EVENTS_TOPIC)  # Fills the queue
+
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(
+            publisher.publish(action_started_event, settings.INTEGRATION_EVENTS_TOPIC), timeout=0.05
+        )
+    release_publish.set()
+    await publisher.stop()
+    assert publisher.get_stats()["published_events"] == 2
+
+
+@pytest.mark.asyncio
+async def test_batch_publisher_keeps_running_after_serialization_error(
+        mocker, mock_publisher_pubsub, action_started_event
+):
+    mocker.patch(
+        "app.services.pubsub_publisher.serialize_event",
+        side_effect=[TypeError("not serializable"), "{}", "{}"],
+    )
+    publisher = BatchPublisher(max_batch_size=1, max_latency=0, max_queue_size=1)
+    await publisher.start()
+
+    for _ in range(3):
+        await asyncio.wait_for(
+            publisher.publish(action_started_event, settings.INTEGRATION_EVENTS_TOPIC), timeout=1
+        )
+    await publisher.stop()
+
+    stats = publisher.get_stats()
+    assert stats["failed_events"] == 1
+    assert stats["published_events"] == 2
+
+
+@pytest.mark.asyncio
+async def test_publish_event_uses_batch_publisher_when_running(
+        mocker, mock_publisher_pubsub, action_started_event
+):
+    publisher = BatchPublisher(max_batch_size=10, max_latency=0.05)
+    mocker.patch("app.services.activity_logger.event_publisher", publisher)
+    mock_publish_now = mocker.patch("app.services.activity_logger._publish_event_now")
+    await publisher.start()
+
+    await publish_event(event=action_started_event, topic_name=settings.INTEGRATION_EVENTS_TOPIC)
+    await publisher.stop()
+
+    assert not mock_publish_now.called
+    assert mock_publisher_pubsub.PublisherClient.return_value.publish.called
+
+
+@pytest.mark.asyncio
+async def test_publish_event_does_not_wait_in_fire_and_forget_mode(
+        mocker, mock_publisher_pubsub, action_started_event
+):
+    release_publish = asyncio.Event()
+
+    async def slow_publish(topic, messages):
+        await release_publish.wait()
+
+    mock_publisher_pubsub.PublisherClient.return_value.publish.side_effect = slow_publish
+    publisher = BatchPublisher(max_batch_size=1, max_latency=0, max_queue_size=1)
+    mocker.patch("app.services.activity_logger.event_publisher", publisher)
+    mocker.patch("app.services.activity_logger.settings.ACTIVITY_LOGS_FIRE_AND_FORGET", True)
+    await publisher.start()
+
+    for _ in range(4):  # Would block on a full queue otherwise
+        await asyncio.wait_for(
+            publish_event(event=action_started_event, topic_name=settings.INTEGRATION_EVENTS_TOPIC), timeout=0.05
+        )
+        await asyncio.sleep(0)
+    release_publish.set()
+    await publisher.stop()
+
+    stats = publisher.get_stats()
+    assert stats["published_events"] == 2
+    assert stats["dropped_events"] == 2
+
+
+@pytest.mark.asyncio
+async def test_batch_publisher_saves_queued_events_in_outbox_on_drain_timeout(
+        mocker, mock_publisher_pubsub, action_started_event, tmp_path
+):
+    async def stuck_publish(topic, messages):
+        await asyncio.Event().wait()
+
+    mock_publisher_pubsub.PublisherClient.return_value.publish.side_effect = stuck_publish
+    outbox = DiskOutbox(directory=str(tmp_path))
+    mocker.patch("app.services.pubsub_publisher.get_outbox", return_value=outbox)
+    publisher = BatchPublisher(max_batch_size=2, max_latency=0, drain_timeout=0.05)
+    await publisher.start()
+    for _ in range(5):
+        await publisher.publish(action_started_event, settings.INTEGRATION_EVENTS_TOPIC)
+
+    await publisher.stop()
+
+    # The batch being sent and the queued events are kept
+    assert outbox.get_stats()["stored_events"] == 5
+
+
+@pytest.mark.asyncio
+async def test_outbox_is_replayed_without_the_batch_publisher(mocker, mock_publisher_pubsub, tmp_path):
+    outbox = DiskOutbox(directory=str(tmp_path))
+    await outbox.append(settings.INTEGRATION_EVENTS_TOPIC, ['{"event_id": 1}'])
+    mocker.patch("app.services.pubsub_publisher.get_outbox", return_value=outbox)
+    mocker.patch("app.services.pubsub_publisher.settings.EVENTS_OUTBOX_REPLAY_INTERVAL", 0)
+    mocker.patch("app.services.pubsub_publisher.aiohttp.ClientSession", mocker.MagicMock(
+        return_value=mocker.MagicMock(
+            __aenter__=mocker.AsyncMock(return_value=mocker.MagicMock()),
+            __aexit__=mocker.AsyncMock(return_value=None),
+        )
+    ))
+    assert not event_publisher.is_running
+
+    start_outbox_replay()
+    for _ in range(100):
+        if not outbox.has_pending_events():
+            break
+        await asyncio.sleep(0.01)
+    await stop_outbox_replay()
+
+    assert not outbox.has_pending_events()
+    mock_publisher_pubsub.PublisherClient.return_value.publish.assert_awaited_once()
@@ -0,0 +1,71 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services import redis_pool
+from app.services.state import IntegrationStateManager
+
+
+api_client = TestClient(app)
+
+
+@pytest.fixture
+def empty_connection_pools(mocker):
+    return mocker.patch.dict(redis_pool._connection_pools, clear=True)
+
+
+def test_get_connection_pool_is_shared_per_database(empty_connection_pools):
+    pool = redis_pool.get_connection_pool(host="redis.local", port=6379, db=0)
+
+    assert redis_pool.get_connection_pool(host="redis.local", port=6379, db=0) is pool
+    assert redis_pool.get_connection_pool(host="redis.local", port=6379, db=1) is not pool
+
+
+def test_get_connection_pool_uses_settings(mocker, empty_connection_pools):
+    mocker.patch("app.services.redis_pool.settings.REDIS_MAX_CONNECTIONS", 7)
+    mocker.patch("app.services.redis_pool.settings.REDIS_HEALTH_CHECK_INTERVAL", 15)
+
+    pool = redis_pool.get_connection_pool(host="redis.local", port=6379, db=0)
+
+    assert pool.max_connections == 7
+    assert pool.connection_kwargs["health_check_interval"] == 15
+    assert pool.connection_kwargs["socket_keepalive"] is True
+
+
+@pytest.mark.asyncio
+async def test_managers_share_connection_pool(mocker, mock_redis, empty_connection_pools):
+    mocker.patch("app.services.state.redis", mock_redis)
+
+    IntegrationStateManager()
+    IntegrationStateManager()
+
+    pools = [c.kwargs["connection_pool"] for c in mock_redis.Redis.call_args_list]
+    assert len(pools) == 2
+    assert pools[0] is pools[1]
+
+
+@pytest.mark.asyncio
+async def test_close_connection_pools(empty_connection_pools):
+    redis_pool.get_connection_pool(host="redis.local", port=6379, db=0)
+
+    await redis_pool.close_connection_pools()
+
+    assert redis_pool.get_connection_pools_stats() == []
+
+
+def test_metrics_include_connection_pool_stats(empty_connection_pools):
+    redis_pool.get_connection_pool(host="redis.local", port=6379, db=2)
+
+    response = api_client.get("/metrics/")
+
+    assert response.status_code == 200
+    stats = response.json()["redis_connection_pools"]
+    assert stats == [{
+        "host": "redis.local",
+        "port": 6379,
+        "db": 2,
+        "max_connections": 50,
+        "in_use_connections": 0,
+        "available_connections": 0,
+        "utilization": 0.0,
+    }]
@@ -2,6 +2,8 @@ import datetime
 import json
 
 import pytest
+from app.conftest import async_return
+from app.services.locks import SET_IF_LEASE_HELD_SCRIPT, ActionLease, ActionLeaseLost
 from app.services.state import IntegrationStateManager
 
 
@@ -26,6 +28,24 @@ async def test_set_integration_state(mocker, mock_redis, integration_v2):
     )
 
 
+@pytest.mark.asyncio
+async def test_set_integration_state_is_fenced_by_the_lease(mocker, mock_redis, integration_v2):
+    mocker.patch("app.services.state.redis", mock_redis)
+    mock_redis.Redis.return_value.eval.side_effect = [async_return("OK"), async_return(0)]
+    state_manager = IntegrationStateManager()
+    lease = ActionLease(key="action_lease.1.pull_events", token="7", acquired=True)
+    state_key = f"integration_state.{integration_v2.id}.pull_events.no-source"
+
+    await state_manager.set_state(str(integration_v2.id), "pull_events", {"last_run": "x"}, lease=lease)
+
+    mock_redis.Redis.return_value.eval.assert_called_once_with(
+        SET_IF_LEASE_HELD_SCRIPT, 2, state_key, lease.key, '{"last_run": "x"}', "7"
+    )
+    mock_redis.Redis.return_value.set.assert_not_called()
+    with pytest.raises(ActionLeaseLost):  # Another execution took the lease
+        await state_manager.set_state(str(integration_v2.id), "pull_events", {"last_run": "y"}, lease=lease)
+
+
 @pytest.mark.asyncio
 async def test_get_integration_state(mocker, mock_redis, integration_v2, mock_integration_state):
     mocker.patch("app.services.state.redis", mock_redis)
@@ -0,0 +1,153 @@
+import json
+
+import pytest
+
+from app.services.utils import TTLCache, StructHexString, HexFrameDecoder, LazyModule, get_hex_decoder, iter_json_array
+
+
+HEX_FORMAT = {
+    "byte_order": ">",
+    "fields": [
+        {"name": "start_bit", "format": "B", "output_type": "int"},
+        {"name": "v", "format": "I", "output_type": "int"},
+        {
+            "name": "status",
+            "format": "B",
+            "output_type": "hex",
+            "bit_fields": [
+                {"name": "alarm", "start_bit": 0, "end_bit": 0, "output_type": "bool"},
+                {"name": "mode", "start_bit": 1, "end_bit": 3, "output_type": "int"},
+            ]
+        },
+    ]
+}
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("a") == 1
+    assert "b" not in cache
+    assert cache.get("c") == 3
+
+
+def test_ttl_cache_expires_entries(mocker):
+    mock_time = mocker.patch("app.services.utils.time")
+    mock_time.monotonic.return_value = 100.0
+    cache = TTLCache(maxsize=2, ttl=10)
+    cache.set("a", 1)
+
+    mock_time.monotonic.return_value = 109.0
+    assert cache.get("a") == 1
+    mock_time.monotonic.return_value = 110.0
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_ttl_cache_with_zero_size_stores_nothing():
+    cache = TTLCache(maxsize=0)
+    cache.set("a", 1)
+    assert cache.get("a") is None
+
+
+def test_hex_decoder_decodes_fields_and_bit_fields():
+    decoder = get_hex_decoder(HEX_FORMAT)
+
+    assert decoder.decode("01000000FF0B") == {
+        "start_bit": 1, "v": 255, "status": "0xb", "alarm": True, "mode": 5
+    }
+
+
+def test_hex_decoder_is_reused_for_the_same_format():
+    same_format = {"byte_order": ">", "fields": HEX_FORMAT["fields"]}
+
+    assert get_hex_decoder(HEX_FORMAT) is get_hex_decoder(HEX_FORMAT)
+    assert get_hex_decoder(HEX_FORMAT) is get_hex_decoder(same_format)
+
+
+def test_hex_decoder_decodes_many_frames_in_one_pass():
+    decoder = get_hex_decoder(HEX_FORMAT)
+    values = ["01000000FF0B", "0000000001FF"]
+
+    assert decoder.decode_many(values) == [decoder.decode(v) for v in values]
+    with pytest.raises(ValueError):
+        decoder.decode_many(values + ["0100"])
+
+
+def test_hex_decoder_rejects_wrong_length():
+    with pytest.raises(ValueError, match="Hex string does not match the expected length for format"):
+        get_hex_decoder(HEX_FORMAT).decode("0100")
+
+
+def test_struct_hex_string_is_decoded_once_on_validation(mocker):
+    mock_decode = mocker.spy(HexFrameDecoder, "decode")
+
+    hex_string = StructHexString.validate("01000000FF0B", values={"hex_format": HEX_FORMAT}, field=None)
+
+    assert hex_string.unpacked_data == {"start_bit": 1, "v": 255, "status": "0xb", "alarm": True, "mode": 5}
+    assert mock_decode.call_count == 1
+
+
+def test_struct_hex_string_validation_error_message():
+    with pytest.raises(ValueError, match="Invalid hex string for format '>BIB'"):
+        StructHexString.validate("0100", values={"hex_format": HEX_FORMAT}, field=None)
+
+
+async def _iter_chunks(data: bytes, chunk_size: int):
+    for i in range(0, len(data), chunk_size):
+        yield data[i:i + chunk_size]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 5, 4096])
+@pytest.mark.asyncio
+async def test_iter_json_array_yields_items_split_across_chunks(chunk_size):
+    items = [{"device": "café", "value": 12345}, 67890, "text", [1, 2], None]
+    data = json.dumps(items, ensure_ascii=False).encode("utf-8")
+
+    assert [item async for item in iter_json_array(_iter_chunks(data, chunk_size))] == items
+
+
+@pytest.mark.asyncio
+async def test_iter_json_array_with_body_split_at_every_offset():
+    items = [1, 2.5, -3e5, 0.25, True, None, False, "text", {"lat": -12.5e-3}, [1, 2]]
+    data = json.dumps(items).encode("utf-8")
+
+    async def iter_split(position):
+        yield data[:position]
+        yield data[position:]
+
+    for position in range(len(data) + 1):
+        assert [item async for item in iter_json_array(iter_split(position))] == items, f"Split at {position}"
+
+
+@pytest.mark.asyncio
+async def test_iter_json_array_decodes_large_item_a_few_times(mocker):
+    items = [{"payload": "x" * 100_000}, {"payload": "y"}]
+    data = json.dumps(items).encode("utf-8")
+    raw_decode = mocker.spy(json.JSONDecoder, "raw_decode")
+
+    assert [item async for item in iter_json_array(_iter_chunks(data, 100))] == items
+    # Retried as the buffered item doubles, not on each of the ~1000 chunks
+    assert raw_decode.call_count < 30
+
+
+@pytest.mark.parametrize("data", [b'{"a": 1}', b'[1, 2', b'[1 2]', b'[1, {"a": }]'])
+@pytest.mark.asyncio
+async def test_iter_json_array_rejects_invalid_arrays(data):
+    with pytest.raises(ValueError):
+        [item async for item in iter_json_array(_iter_chunks(data, 3))]
+
+
+def test_lazy_module_is_imported_on_first_use(mocker):
+    mock_import_module = mocker.patch("app.services.utils.importlib.import_module")
+    module = LazyModule("gcloud.aio.pubsub")
+    assert not mock_import_module.called
+
+    module.PubsubMessage(b"data")
+    module.PublisherClient()
+
+    mock_import_module.assert_called_once_with("gcloud.aio.pubsub")
@@ -2,24 +2,30 @@ import base64
 import json
 from unittest.mock import ANY
 
+import pydantic
 import pytest
 from fastapi.testclient import TestClient
 
 from app.conftest import MockWebhookPayloadModel, MockWebhookConfigModel
 from app.main import app
-from app.webhooks import GenericJsonTransformConfig
+from app.services.utils import DyntamicFactory, StructHexString, get_hex_decoder
+from app.services.webhooks import get_dynamic_payload_model
+from app.webhooks.core import get_batch_jq_filter, get_jq_program
+from app.webhooks import (
+    GenericJsonTransformConfig, GenericJsonPayload, HexStringPayload, WebhookBatch, JQTransformConfig
+)
 
 api_client = TestClient(app)
 
 
 @pytest.mark.asyncio
 async def test_process_webhook_request_with_fixed_schema(
-        mocker, integration_v2_with_webhook, mock_gundi_client_v2_for_webhooks, mock_publish_event,
+        mocker, integration_v2_with_webhook, mock_config_manager_for_webhooks, mock_publish_event,
         mock_get_webhook_handler_for_fixed_json_payload, mock_webhook_handler,
         mock_webhook_request_headers_onyesha, mock_webhook_request_payload_for_fixed_schema
 ):
     mocker.patch("app.services.webhooks.get_webhook_handler", mock_get_webhook_handler_for_fixed_json_payload)
-    mocker.patch("app.services.webhooks._portal", mock_gundi_client_v2_for_webhooks)
+    mocker.patch("app.services.webhooks.config_manager", mock_config_manager_for_webhooks)
 
     response = api_client.post(
         "/webhooks",
@@ -28,7 +34,7 @@ async def test_process_webhook_request_with_fixed_schema(
     )
 
     assert response.status_code == 200
-    assert mock_gundi_client_v2_for_webhooks.get_integration_details.called
+    mock_config_manager_for_webhooks.get_integration_details.assert_called_once_with(integration_id="testintegrationid")
     assert mock_get_webhook_handler_for_fixed_json_payload.called
     expected_payload = MockWebhookPayloadModel.parse_obj(mock_webhook_request_payload_for_fixed_schema)
     expected_config = MockWebhookConfigModel.parse_obj(integration_v2_with_webhook.webhook_configuration.data)
@@ -41,12 +47,12 @@ async def test_process_webhook_request_with_fixed_schema(
 
 @pytest.mark.asyncio
 async def test_process_webhook_request_with_dynamic_schema(
-        mocker, integration_v2_with_webhook_generic, mock_gundi_client_v2_for_webhooks_generic, mock_publish_event,
+        mocker, integration_v2_with_webhook_generic, mock_config_manager_for_webhooks_generic, mock_publish_event,
         mock_get_webhook_handler_for_generic_json_payload, mock_webhook_handler,
         mock_webhook_request_headers_onyesha, mock_webhook_request_payload_for_dynamic_schema
 ):
     mocker.patch("app.services.webhooks.get_webhook_handler", mock_get_webhook_handler_for_generic_json_payload)
-    mocker.patch("app.services.webhooks._portal", mock_gundi_client_v2_for_webhooks_generic)
+    mocker.patch("app.services.webhooks.config_manager", mock_config_manager_for_webhooks_generic)
 
     response = api_client.post(
         "/webhooks",
@@ -55,7 +61,7 @@ async def test_process_webhook_request_with_dynamic_schema(
     )
 
     assert response.status_code == 200
-    assert mock_gundi_client_v2_for_webhooks_generic.get_integration_details.called
+    assert mock_config_manager_for_webhooks_generic.get_integration_details.called
     assert mock_get_webhook_handler_for_generic_json_payload.called
     expected_config = GenericJsonTransformConfig.parse_obj(integration_v2_with_webhook_generic.webhook_configuration.data)
     mock_webhook_handler.assert_called_once_with(
@@ -65,3 +71,210 @@ async def test_process_webhook_request_with_dynamic_schema(
     )
 
 
+
+
+@pytest.mark.asyncio
+async def test_dynamic_schema_model_is_built_once_per_schema(
+        mocker, integration_v2_with_webhook_generic, mock_config_manager_for_webhooks_generic, mock_publish_event,
+        mock_get_webhook_handler_for_generic_json_payload, mock_webhook_handler,
+        mock_webhook_request_headers_onyesha, mock_webhook_request_payload_for_dynamic_schema
+):
+    mocker.patch("app.services.webhooks.get_webhook_handler", mock_get_webhook_handler_for_generic_json_payload)
+    mocker.patch("app.services.webhooks.config_manager", mock_config_manager_for_webhooks_generic)
+    mock_factory_class = mocker.patch("app.services.webhooks.DyntamicFactory", wraps=DyntamicFactory)
+
+    for _ in range(3):
+        response = api_client.post(
+            "/webhooks",
+            headers=mock_webhook_request_headers_onyesha,
+            json=mock_webhook_request_payload_for_dynamic_schema,
+        )
+        assert response.status_code == 200
+
+    assert mock_factory_class.call_count == 1
+    assert mock_webhook_handler.call_count == 3
+    # A different schema for the same integration builds a new model
+    json_schema = {**integration_v2_with_webhook_generic.webhook_configuration.data["json_schema"], "title": "Other"}
+    get_dynamic_payload_model(integration_v2_with_webhook_generic.id, json_schema, GenericJsonPayload)
+    assert mock_factory_class.call_count == 2
+
+
+class MockBatchItem(pydantic.BaseModel):
+    device_id: str
+    value: int
+
+
+@pytest.mark.parametrize("parallel_threshold", [1000, 1])
+@pytest.mark.asyncio
+async def test_webhook_batch_yields_valid_items_in_chunks(parallel_threshold):
+    items = [{"device_id": f"device-{i}", "value": i} for i in range(7)]
+    items[3] = {"device_id": "device-3", "value": "not a number"}
+    batch = WebhookBatch(items=items, model=MockBatchItem, chunk_size=3, parallel_threshold=parallel_threshold)
+
+    chunks = [chunk async for chunk in batch]
+
+    assert [len(chunk) for chunk in chunks] == [3, 2, 1]
+    assert [item.value for chunk in chunks for item in chunk] == [0, 1, 2, 4, 5, 6]
+    assert len(batch.errors) == 1
+    assert batch.errors[0]["index"] == 3
+
+
+class MockHexBatchItem(HexStringPayload):
+    device_id: str
+    data: StructHexString
+
+
+BATCH_HEX_FORMAT = {"byte_order": ">", "fields": [{"name": "v", "format": "H", "output_type": "int"}]}
+
+
+@pytest.mark.asyncio
+async def test_webhook_batch_decodes_hex_strings_in_bulk(mocker):
+    items = [{"device_id": f"device-{i}", "data": f"{i:04X}"} for i in range(5)]
+    decoder = get_hex_decoder(BATCH_HEX_FORMAT)
+    decode_many = mocker.spy(decoder, "decode_many")
+    decode = mocker.spy(decoder, "decode")
+    batch = WebhookBatch(
+        items=items, model=MockHexBatchItem, chunk_size=3, hex_format=BATCH_HEX_FORMAT, hex_data_field="data"
+    )
+
+    parsed_items = await batch.collect()
+
+    assert [item.data.unpacked_data for item in parsed_items] == [{"v": i} for i in range(5)]
+    assert decode_many.call_count == 2  # Once per chunk
+    decode.assert_not_called()
+    assert "hex_format" not in items[0]  # The body isn't modified
+
+
+@pytest.mark.asyncio
+async def test_webhook_batch_reports_invalid_hex_strings_per_item():
+    items = [{"device_id": f"device-{i}", "data": f"{i:04X}"} for i in range(3)]
+    items[1]["data"] = "01"
+    batch = WebhookBatch(
+        items=items, model=MockHexBatchItem, chunk_size=3, hex_format=BATCH_HEX_FORMAT, hex_data_field="data"
+    )
+
+    parsed_items = await batch.collect()
+
+    assert [item.device_id for item in parsed_items] == ["device-0", "device-2"]
+    assert [e["index"] for e in batch.errors] == [1]
+
+
+@pytest.fixture
+def mock_pyjq(mocker):
+    mock_pyjq = mocker.MagicMock()
+    mock_pyjq.compile.side_effect = lambda jq_filter: mocker.MagicMock(name=jq_filter)
+    mocker.patch.dict("sys.modules", {"pyjq": mock_pyjq})
+    return mock_pyjq
+
+
+def test_jq_filter_is_compiled_once(mock_pyjq):
+    config = JQTransformConfig(jq_filter="{source: .device_id}")
+
+    config.transform({"device_id": "device-1"})
+    config.transform({"device_id": "device-2"})
+    JQTransformConfig(jq_filter="{source: .device_id}").transform({"device_id": "device-3"})
+
+    mock_pyjq.compile.assert_called_once_with("{source: .device_id}")
+
+
+def test_jq_filter_runs_once_per_batch(mock_pyjq):
+    config = JQTransformConfig(jq_filter="{source: .device_id}")
+    items = [MockBatchItem(device_id=f"device-{i}", value=i) for i in range(3)]
+
+    config.transform_batch(items)
+    config.transform_batch(items)
+
+    mock_pyjq.compile.assert_called_once_with("[.[] | ({source: .device_id}\n)]")
+    program = get_jq_program("[.[] | ({source: .device_id}\n)]")
+    program.first.assert_called_with([item.dict() for item in items])
+
+
+def test_batch_jq_filter_keeps_trailing_comments_apart():
+    batch_filter = get_batch_jq_filter("{id: .a} # keep only id")
+
+    assert batch_filter.splitlines() == ["[.[] | ({id: .a} # keep only id", ")]"]
+
+
+def test_jq_filter_with_trailing_comment_runs_on_batches():
+    pyjq = pytest.importorskip("pyjq")
+    get_jq_program.cache_clear()
+    config = JQTransformConfig(jq_filter="{id: .a} # keep only id")
+
+    assert config.transform_batch([{"a": 1, "b": 2}, {"a": 3}]) == [{"id": 1}, {"id": 3}]
+
+
+@pytest.mark.asyncio
+async def test_process_webhook_request_in_batch_mode(
+        mocker, integration_v2_with_webhook_generic, mock_config_manager_for_webhooks_generic,
+        mock_webhook_request_headers_onyesha, mock_webhook_request_payload_for_dynamic_schema
+):
+    received_batches = []
+
+    async def webhook_handler(payload, integration=None, webhook_config=None):
+        received_batches.append(payload)
+        async for chunk in payload:  # Items are validated as the handler iterates
+            assert all(isinstance(item, GenericJsonPayload) for item in chunk)
+
+    mocker.patch("app.services.webhooks.settings.WEBHOOK_BATCH_MODE", True)
+    mocker.patch(
+        "app.services.webhooks.get_webhook_handler",
+        return_value=(webhook_handler, GenericJsonPayload, GenericJsonTransformConfig)
+    )
+    mocker.patch("app.services.webhooks.config_manager", mock_config_manager_for_webhooks_generic)
+    mock_log_webhook_activity = mocker.patch("app.services.webhooks.log_webhook_activity", mocker.AsyncMock())
+
+    response = api_client.post(
+        "/webhooks",
+        headers=mock_webhook_request_headers_onyesha,
+        json=[mock_webhook_request_payload_for_dynamic_schema] * 3 + ["invalid"],
+    )
+
+    assert response.status_code == 200
+    batch = received_batches[0]
+    assert isinstance(batch, WebhookBatch)
+    assert len(batch) == 4
+    assert batch.errors[0]["index"] == 3
+    assert mock_log_webhook_activity.called
+
+
+def test_webhook_request_over_max_body_size_is_rejected(mocker, mock_webhook_request_headers_onyesha):
+    mocker.patch("app.services.webhooks.settings.WEBHOOK_MAX_BODY_SIZE", 100)
+    mock_process_webhook = mocker.patch("app.routers.webhooks.process_webhook", mocker.AsyncMock())
+
+    response = api_client.post(
+        "/webhooks",
+        headers=mock_webhook_request_headers_onyesha,
+        json=[{"device_id": "device-1", "value": 1}] * 10,
+    )
+
+    assert response.status_code == 413
+    assert not mock_process_webhook.called
+
+
+@pytest.mark.asyncio
+async def test_process_webhook_request_streams_list_body_in_batch_mode(
+        mocker, integration_v2_with_webhook_generic, mock_config_manager_for_webhooks_generic,
+        mock_webhook_request_headers_onyesha, mock_webhook_request_payload_for_dynamic_schema
+):
+    received_items = []
+
+    async def webhook_handler(payload, integration=None, webhook_config=None):
+        assert not isinstance(payload.items, list)  # Items are parsed while the body is received
+        received_items.extend(await payload.collect())
+
+    mocker.patch("app.routers.webhooks.settings.PROCESS_WEBHOOKS_IN_BACKGROUND", False)
+    mocker.patch("app.services.webhooks.settings.WEBHOOK_BATCH_MODE", True)
+    mocker.patch(
+        "app.services.webhooks.get_webhook_handler",
+        return_value=(webhook_handler, GenericJsonPayload, GenericJsonTransformConfig)
+    )
+    mocker.patch("app.services.webhooks.config_manager", mock_config_manager_for_webhooks_generic)
+
+    response = api_client.post(
+        "/webhooks",
+        headers=mock_webhook_request_headers_onyesha,
+        json=[mock_webhook_request_payload_for_dynamic_schema] * 3,
+    )
+
+    assert response.status_code == 200
+    assert len(received_items) == 3
@@ -1,10 +1,31 @@
+import codecs
+import importlib
+import json
 import struct
+import time
 import typing
+from collections import OrderedDict
 from pydantic import create_model, BaseModel
 from pydantic.fields import Field, FieldInfo, Undefined, NoArgAnyCallable
 from typing import Any, Dict, Optional, Union, List, Annotated
 
 
+class LazyModule:
+    """Stands for a module that is imported on first use, to keep heavy dependencies out of the startup path."""
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attribute):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attribute)
+
+    def __repr__(self):
+        return f"LazyModule({self._name})"
+
+
 def find_config_for_action(configurations, action_id):
     return next(
         (
@@ -15,12 +36,151 @@ def find_config_for_action(configurations, action_id):
     )
 
 
+class TTLCache:
+    """
+    Small in-memory LRU cache with an optional time-to-live (in seconds) for its entries.
+    It isn't thread-safe; it's meant to be used from the event loop.
+    """
+
+    def __init__(self, maxsize: int = 128, ttl: Optional[float] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (expires_at, value)
+
+    def get(self, key, default=None):
+        try:
+            expires_at, value = self._data[key]
+        except KeyError:
+            return default
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._data[key]
+            return default
+        self._data.move_to_end(key)
+        return value
+
+    def peek(self, key, default=None):
+        """
+        Returns a (value, is_fresh) tuple. Unlike get(), expired entries are returned (and kept)
+        so that callers can serve a stale value while they refresh it.
+        """
+        try:
+            expires_at, value = self._data[key]
+        except KeyError:
+            return default, False
+        self._data.move_to_end(key)
+        return value, expires_at is None or expires_at > time.monotonic()
+
+    def set(self, key, value):
+        if self.maxsize <= 0:
+            return
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        expires_at, value = self._data.pop(key, (None, default))
+        return value
+
+    def clear(self):
+        self._data.clear()
+
+    def __contains__(self, key):
+        return self.get(key, _missing) is not _missing
+
+    def __len__(self):
+        return len(self._data)
+
+
+_missing = object()
+
+
+def _cast_output(value, output_type="hex"):
+    if output_type == "bool":
+        return bool(value)
+    elif output_type == "int":
+        return int(value)
+    else:  # hex string by default
+        return hex(value)
+
+
+class HexFrameDecoder:
+    """
+    Decoder for hex strings with a given hex_format, compiled once: the struct format,
+    the output casts and the masks of the bit fields are computed when it's created.
+    Use get_hex_decoder() to reuse the decoder of a hex_format.
+    """
+
+    def __init__(self, hex_format: dict):
+        fields = hex_format["fields"]
+        self.format_spec = hex_format.get("byte_order", "<") + ''.join(f["format"] for f in fields)
+        self.struct = struct.Struct(self.format_spec)
+        self.size = self.struct.size
+        self.field_names = [f["name"] for f in fields]
+        self._output_types = [f.get("output_type", "int") for f in fields]
+        # (index of the field, name, start bit, mask, output type)
+        self._bit_fields = [
+            (i, bit_field["name"], bit_field["start_bit"], 2 ** (bit_field["end_bit"] - bit_field["start_bit"] + 1) - 1,
+             bit_field.get("output_type", "bool"))
+            for i, f in enumerate(fields) for bit_field in f.get("bit_fields", [])
+        ]
+        self.names = self.field_names + [b[1] for b in self._bit_fields]
+
+    def to_bytes(self, value: str) -> bytes:
+        bytes_data = bytes.fromhex(value)
+        if len(bytes_data) != self.size:
+            raise ValueError("Hex string does not match the expected length for format")
+        return bytes_data
+
+    def decode(self, value: str) -> Dict[str, Any]:
+        return self._to_dict(self.struct.unpack(self.to_bytes(value)))
+
+    def decode_many(self, values: typing.Iterable[str]) -> List[Dict[str, Any]]:
+        """
+        Decodes many hex strings of this format in one pass over a single buffer.
+        Raises ValueError if any of them is invalid.
+        """
+        buffer = b"".join(self.to_bytes(v) for v in values)
+        return [self._to_dict(unpacked) for unpacked in self.struct.iter_unpack(buffer)]
+
+    def _to_dict(self, unpacked_fields: tuple) -> Dict[str, Any]:
+        values = [_cast_output(value=v, output_type=t) for v, t in zip(unpacked_fields, self._output_types)]
+        for index, _, start_bit, mask, output_type in self._bit_fields:
+            values.append(_cast_output(value=(unpacked_fields[index] >> start_bit) & mask, output_type=output_type))
+        return dict(zip(self.names, values))
+
+
+# Decoders by hex_format. Webhook configurations are reused across requests, so the dict is usually the same
+# object and is found by identity. Equal formats in other dicts are found by their repr.
+_hex_decoders_by_id: Dict[int, tuple] = {}  # id(hex_format) -> (hex_format, decoder), the dict is kept to hold its id
+_hex_decoders = TTLCache(maxsize=256)  # repr(hex_format) -> decoder
+
+
+def get_hex_decoder(hex_format: dict) -> HexFrameDecoder:
+    """Returns the (cached) decoder for a hex_format. Formats are expected not to change once used."""
+    cached = _hex_decoders_by_id.get(id(hex_format))
+    if cached is not None and cached[0] is hex_format:
+        return cached[1]
+    key = repr(hex_format)
+    decoder = _hex_decoders.get(key)
+    if decoder is None:
+        decoder = HexFrameDecoder(hex_format)
+        _hex_decoders.set(key, decoder)
+    if len(_hex_decoders_by_id) >= 256:
+        _hex_decoders_by_id.clear()
+    _hex_decoders_by_id[id(hex_format)] = (hex_format, decoder)
+    return decoder
+
+
 class StructHexString:
-    def __init__(self, value: str, hex_format):
+    def __init__(self, value: str, hex_format, decoder: HexFrameDecoder = None, unpacked_data: dict = None):
         self.value = value
         self.hex_format = hex_format
-        self.format_spec = hex_format.get("byte_order", "<") + ''.join(f["format"] for f in hex_format["fields"])
-        self.unpacked_data = self._unpack_data()
+        decoder = decoder or get_hex_decoder(hex_format)
+        self.format_spec = decoder.format_spec
+        # Validated values are decoded once, in validate()
+        self.unpacked_data = unpacked_data if unpacked_data is not None else decoder.decode(value)
 
     @classmethod
     def __get_validators__(cls):
@@ -28,46 +188,24 @@ class StructHexString:
 
     @classmethod
     def validate(cls, v: str, values, field):
+        if isinstance(v, StructHexString):  # Decoded in bulk already, i.e. in a webhook batch
+            return v
         hex_format = values['hex_format']  # Assumes format is already set in the parent model
-        format_spec = hex_format.get("byte_order", "<") + ''.join(d["format"] for d in hex_format["fields"])
         try:
-            bytes_data = bytes.fromhex(v)
-            if len(bytes_data) != struct.calcsize(format_spec):
-                raise ValueError("Hex string does not match the expected length for format")
+            decoder = get_hex_decoder(hex_format)
+            unpacked_data = decoder.decode(v)
         except (ValueError, struct.error) as e:
+            format_spec = hex_format.get("byte_order", "<") + ''.join(d["format"] for d in hex_format["fields"])
             raise ValueError(f"Invalid hex string for format '{format_spec}': {str(e)}")
 
-        return cls(v, hex_format)
+        return cls(v, hex_format, decoder=decoder, unpacked_data=unpacked_data)
 
     @classmethod
     def __modify_schema__(cls, field_schema):
         field_schema.update(type="hex_string", example="123456789ABCDEF", description="Hex string data")
 
-    def _unpack_data(self):
-        field_values = []
-        unpacked_fields = struct.unpack(self.format_spec, bytes.fromhex(self.value))
-        for s, v in zip(self.hex_format["fields"], unpacked_fields):
-            field_values.append(self._cast_output(value=v, output_type=s.get("output_type", "int")))
-        field_names = [f["name"] for f in self.hex_format["fields"]]
-        fields_with_bitfields = [f for f in self.hex_format["fields"] if "bit_fields" in f]
-        for field in fields_with_bitfields:
-            bit_fields = field["bit_fields"]
-            for bit_field in bit_fields:
-                start_bit = bit_field["start_bit"]
-                end_bit = bit_field["end_bit"]
-                field_value = unpacked_fields[field_names.index(field["name"])]
-                bits_value = (field_value >> start_bit) & (2 ** (end_bit - start_bit + 1) - 1)
-                field_values.append(self._cast_output(value=bits_value, output_type=bit_field.get("output_type", "bool")))
-                field_names.append(bit_field["name"])
-        return dict(zip(field_names, field_values))
-
     def _cast_output(self, value, output_type="hex"):
-        if output_type == "bool":
-            return bool(value)
-        elif output_type == "int":
-            return int(value)
-        else:  # hex string by default
-            return hex(value)
+        return _cast_output(value=value, output_type=output_type)
 
     def __repr__(self) -> str:
         return f"StructHexString(value={self.value}, hex_format={self.hex_format})"
@@ -377,3 +515,71 @@ class UISchemaModelMixin:
 def generate_batches(iterable, batch_size):
     for i in range(0, len(iterable), batch_size):
         yield iterable[i: i + batch_size]
+
+
+def _is_json_array_delimiter(char: str) -> bool:
+    return char in ",]" or char.isspace()
+
+
+async def iter_json_array(chunks: typing.AsyncIterable[bytes]) -> typing.AsyncIterator[Any]:
+    """
+    Yields the items of a JSON array while its bytes arrive, keeping only the part not parsed yet in memory.
+    Raises ValueError if the data isn't a valid JSON array.
+    """
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder("utf-8")()
+    chunks = chunks.__aiter__()
+    buffer, position = "", 0
+    state = "start"  # start -> first_item -> separator -> item -> separator ... -> end
+    finished = False
+    # An item spanning several chunks is decoded again only once its buffered text has doubled, so that
+    # parsing it takes linear rather than quadratic time in the number of chunks
+    retry_size = 0
+    while True:
+        while True:
+            while position < len(buffer) and buffer[position].isspace():
+                position += 1
+            if position >= len(buffer):
+                break
+            char = buffer[position]
+            if state == "start":
+                if char != "[":
+                    raise ValueError("Expected a JSON array")
+                position += 1
+                state = "first_item"
+            elif state == "first_item" and char == "]":
+                position += 1
+                state = "end"
+            elif state in ("first_item", "item"):
+                if not finished and len(buffer) - position < retry_size:
+                    break
+                try:
+                    item, end = decoder.raw_decode(buffer, position)
+                except json.JSONDecodeError:
+                    if finished:
+                        raise
+                    retry_size = 2 * (len(buffer) - position)
+                    break  # Wait for the rest of the item
+                retry_size = 0
+                # Numbers and literals don't delimit themselves: "2." or "-3e" may continue in the next chunk
+                is_scalar = not isinstance(item, (dict, list, str))
+                if is_scalar and not finished and (end == len(buffer) or not _is_json_array_delimiter(buffer[end])):
+                    break
+                position = end
+                state = "separator"
+                yield item
+            elif state == "separator" and char in ",]":
+                position += 1
+                state = "item" if char == "," else "end"
+            else:
+                raise ValueError(f"Unexpected character {char!r} at position {position} of the JSON array")
+        if finished:
+            break
+        buffer, position = buffer[position:], 0
+        try:
+            buffer += text_decoder.decode(await chunks.__anext__())
+        except StopAsyncIteration:
+            buffer += text_decoder.decode(b"", final=True)
+            finished = True
+    if state != "end":
+        raise ValueError("Incomplete JSON array")
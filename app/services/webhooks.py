@@ -1,16 +1,101 @@
+import hashlib
 import importlib
+import json
 import logging
+from typing import AsyncIterator
 from fastapi import Request
 from app import settings
-from app.services.activity_logger import log_activity, publish_event
-from gundi_client_v2 import GundiClient
+from app.services.activity_logger import log_activity, log_webhook_activity, publish_event
+from app.services.event_payloads import truncate
 from gundi_core.events import IntegrationWebhookFailed, WebhookExecutionFailed
-from app.services.utils import DyntamicFactory
-from app.webhooks.core import get_webhook_handler, DynamicSchemaConfig, HexStringConfig, GenericJsonPayload
+from app.services.config_manager import IntegrationConfigurationManager
+from app.services.utils import DyntamicFactory, TTLCache, iter_json_array
+from app.webhooks.core import (
+    get_webhook_handler, DynamicSchemaConfig, HexStringConfig, GenericJsonPayload, WebhookBatch
+)
 
-_portal = GundiClient()
+config_manager = IntegrationConfigurationManager()
 logger = logging.getLogger(__name__)
 
+# Payload models built from the json schema in webhook configurations: integration id -> (schema hash, model)
+_dynamic_payload_models = TTLCache(maxsize=settings.WEBHOOK_PAYLOAD_MODELS_CACHE_MAXSIZE)
+
+
+class WebhookBodyTooLarge(Exception):
+    pass
+
+
+def check_content_length(request: Request):
+    """Rejects requests declaring a body bigger than WEBHOOK_MAX_BODY_SIZE, before reading it."""
+    content_length = request.headers.get("content-length")
+    max_size = settings.WEBHOOK_MAX_BODY_SIZE
+    if max_size and content_length and content_length.isdigit() and int(content_length) > max_size:
+        raise WebhookBodyTooLarge(f"Request body of {content_length} bytes exceeds the limit of {max_size} bytes.")
+
+
+async def iter_body(request: Request):
+    """Yields the request body as it's received, enforcing WEBHOOK_MAX_BODY_SIZE."""
+    max_size = settings.WEBHOOK_MAX_BODY_SIZE
+    received = 0
+    async for chunk in request.stream():
+        received += len(chunk)
+        if max_size and received > max_size:
+            raise WebhookBodyTooLarge(f"Request body exceeds the limit of {max_size} bytes.")
+        yield chunk
+
+
+async def read_body(request: Request) -> bytes:
+    """Reads the whole body, which is kept in the request so that it can be processed after the response is sent."""
+    request._body = b"".join([chunk async for chunk in iter_body(request)])
+    return request._body
+
+
+async def _prepend(head: bytes, chunks):
+    yield head
+    async for chunk in chunks:
+        yield chunk
+
+
+async def read_json_content(request: Request):
+    """
+    Parses the JSON body once. In batch mode, list bodies are returned as an async iterator
+    of items parsed while the body is received, so that big requests aren't buffered.
+    """
+    chunks = iter_body(request)
+    head = b""
+    async for chunk in chunks:
+        head += chunk
+        if head.strip():
+            break
+    if settings.WEBHOOK_BATCH_MODE and head.lstrip().startswith(b"["):
+        return iter_json_array(_prepend(head, chunks))
+    return json.loads(head + b"".join([chunk async for chunk in chunks]))
+
+
+def invalidate_dynamic_payload_model(integration_id):
+    _dynamic_payload_models.pop(str(integration_id))
+
+
+def get_dynamic_payload_model(integration_id, json_schema: dict, base_model):
+    """
+    Returns the pydantic model for a json schema, building it only the first time
+    or when the schema in the integration's webhook configuration changes.
+    """
+    schema_hash = hashlib.sha1(
+        f"{base_model.__module__}.{base_model.__qualname__}:{json.dumps(json_schema, sort_keys=True)}".encode("utf-8")
+    ).hexdigest()
+    key = str(integration_id)
+    cached_hash, model = _dynamic_payload_models.get(key, (None, None))
+    if cached_hash != schema_hash:
+        model_factory = DyntamicFactory(
+            json_schema=json_schema,
+            base_model=base_model,
+            ref_template="definitions"
+        )
+        model = model_factory.make()
+        _dynamic_payload_models.set(key, (schema_hash, model))
+    return model
+
 
 async def get_integration(request):
     integration = None
@@ -19,23 +104,53 @@ async def get_integration(request):
     integration_id = consumer_integration or request.headers.get("x-gundi-integration-id") or request.query_params.get("integration_id")
     if integration_id:
         try:
-            integration = await _portal.get_integration_details(integration_id=integration_id)
+            # Cached in memory and redis, and reloaded from the portal when needed
+            integration = await config_manager.get_integration_details(integration_id=integration_id)
         except Exception as e:
-            logger.warning(f"Error retrieving integration '{integration_id}' from the portal: {e}")
+            logger.warning(f"Error retrieving integration '{integration_id}': {e}")
     return integration
 
 
+def _is_list_body(json_content) -> bool:
+    return isinstance(json_content, list) or isinstance(json_content, AsyncIterator)
+
+
+def _make_batch(items, model=None, config=None) -> WebhookBatch:
+    hex_config = isinstance(config, HexStringConfig)
+    return WebhookBatch(
+        items=items,
+        model=model,
+        chunk_size=settings.WEBHOOK_BATCH_CHUNK_SIZE,
+        parallel_threshold=settings.WEBHOOK_BATCH_PARALLEL_THRESHOLD,
+        hex_format=config.hex_format if hex_config else None,
+        hex_data_field=config.hex_data_field if hex_config else None,
+    )
+
+
+async def _log_batch_errors(batch: WebhookBatch, integration):
+    message = f"{len(batch.errors)} of {len(batch)} items in the webhook request were discarded because they are invalid."
+    logger.warning(message)
+    if integration:
+        await log_webhook_activity(
+            integration_id=str(integration.id),
+            webhook_id=str(integration.type.webhook.value) if integration.type.webhook else "webhook",
+            title=message,
+            level="WARNING",
+            data={"errors": truncate(batch.errors)},
+        )
+
+
 async def process_webhook(request: Request):
     try:
         # Try to relate the request to an integration
         integration = await get_integration(request=request)
         # Look for the handler function in webhooks/handlers.py
         webhook_handler, payload_model, config_model = get_webhook_handler()
-        json_content = await request.json()
         # Parse config if a model was defined in webhooks/configurations.py
         webhook_config_data = integration.webhook_configuration.data if integration and integration.webhook_configuration else {}
         parsed_config = config_model.parse_obj(webhook_config_data) if config_model else {}
-        if parsed_config and issubclass(config_model, HexStringConfig):
+        json_content = await read_json_content(request)
+        if parsed_config and issubclass(config_model, HexStringConfig) and isinstance(json_content, dict):
             json_content["hex_data_field"] = json_content.get("hex_data_field", parsed_config.hex_data_field)
             json_content["hex_format"] = json_content.get("hex_format", parsed_config.hex_format)
         # Parse payload if a model was defined in webhooks/configurations.py
@@ -43,16 +158,19 @@ async def process_webhook(request: Request):
             try:
                 if issubclass(payload_model, GenericJsonPayload) and issubclass(config_model, DynamicSchemaConfig):
                     # Build the model from a json schema
-                    model_factory = DyntamicFactory(
+                    dynamic_payload_model = get_dynamic_payload_model(
+                        integration_id=integration.id if integration else None,
                         json_schema=parsed_config.json_schema,
                         base_model=payload_model,
-                        ref_template="definitions"
                     )
-                    dynamic_payload_model = model_factory.make()
-                    if isinstance(json_content, list):
+                    if _is_list_body(json_content) and settings.WEBHOOK_BATCH_MODE:
+                        parsed_payload = _make_batch(json_content, model=dynamic_payload_model, config=parsed_config)
+                    elif isinstance(json_content, list):
                         parsed_payload = [dynamic_payload_model.parse_obj(d) for d in json_content]
                     else:
                         parsed_payload = dynamic_payload_model.parse_obj(json_content)
+                elif _is_list_body(json_content) and settings.WEBHOOK_BATCH_MODE:
+                    parsed_payload = _make_batch(json_content, model=payload_model, config=parsed_config)
                 else:
                     parsed_payload = payload_model.parse_obj(json_content)
             except Exception as e:
@@ -70,9 +188,15 @@ async def process_webhook(request: Request):
                     topic_name=settings.INTEGRATION_EVENTS_TOPIC,
                 )
                 return {}
+        elif _is_list_body(json_content) and settings.WEBHOOK_BATCH_MODE:
+            parsed_payload = _make_batch(json_content)
         else:  # Pass the raw payload
             parsed_payload = json_content
         await webhook_handler(payload=parsed_payload, integration=integration, webhook_config=parsed_config)
+        if isinstance(parsed_payload, WebhookBatch) and parsed_payload.errors:
+            await _log_batch_errors(parsed_payload, integration)
+    except WebhookBodyTooLarge:
+        raise  # Answered with 413
     except (ImportError, AttributeError, NotImplementedError) as e:
         message = "Webhooks handler not found. Please implement a 'webhook_handler' function in app/webhooks/handlers.py"
         logger.exception(message)
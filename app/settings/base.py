@@ -1,20 +1,39 @@
+import atexit
 import logging.config
 import sys
 from environs import Env
+from app.settings.log_handlers import RateLimitFilter, start_queue_logging, stop_queue_logging
 
 env = Env()
 env.read_env()
 
 LOGGING_LEVEL = env.str("LOGGING_LEVEL", "INFO")
+LOGGING_FORMAT = env.str("LOGGING_FORMAT", "json")  # "json" for structured logs with the extra fields of each record, or "text"
+# Write logs from a background thread, so that logging never blocks the event loop
+LOGGING_IN_BACKGROUND = env.bool("LOGGING_IN_BACKGROUND", True)
+# Max records per period (seconds) written for each logger, to limit messages logged in loops. Warnings and errors aren't limited.
+LOGGING_RATE_LIMIT = env.int("LOGGING_RATE_LIMIT", 0)  # 0 means no limit
+LOGGING_RATE_LIMITS = env.dict("LOGGING_RATE_LIMITS", {}, subcast_values=int)  # Per logger, i.e. "app.actions.handlers=10"
+LOGGING_RATE_LIMIT_PERIOD = env.float("LOGGING_RATE_LIMIT_PERIOD", 1.0)
+# Fraction of the received PubSub messages logged with a preview of their payload, and max length of previews
+PUBSUB_MESSAGES_LOG_SAMPLE_RATE = env.float("PUBSUB_MESSAGES_LOG_SAMPLE_RATE", 0.01)
+LOG_PAYLOAD_PREVIEW_MAX_LENGTH = env.int("LOG_PAYLOAD_PREVIEW_MAX_LENGTH", 1000)
 
 DEFAULT_LOGGING = {
     "version": 1,
     "disable_existing_loggers": False,
+    "formatters": {
+        "json": {
+            "()": "pythonjsonlogger.jsonlogger.JsonFormatter",
+            "fmt": "%(asctime)s %(levelname)s %(name)s %(message)s",
+        },
+    },
     "handlers": {
         "console": {
             "level": LOGGING_LEVEL,
             "class": "logging.StreamHandler",
-            "stream": sys.stdout
+            "stream": sys.stdout,
+            **({"formatter": "json"} if LOGGING_FORMAT == "json" else {}),
         },
     },
     "loggers": {
@@ -25,6 +44,13 @@ DEFAULT_LOGGING = {
     },
 }
 logging.config.dictConfig(DEFAULT_LOGGING)
+if LOGGING_IN_BACKGROUND:
+    start_queue_logging(
+        record_filter=RateLimitFilter(
+            rate_limit=LOGGING_RATE_LIMIT, period=LOGGING_RATE_LIMIT_PERIOD, rate_limits=LOGGING_RATE_LIMITS
+        )
+    )
+    atexit.register(stop_queue_logging)
 
 DEFAULT_REQUESTS_TIMEOUT = (10, 20)  # Connect, Read
 
@@ -60,6 +86,22 @@ REDIS_HOST = env.str("REDIS_HOST", "localhost")
 REDIS_PORT = env.int("REDIS_PORT", 6379)
 REDIS_STATE_DB = env.int("REDIS_STATE_DB", 0)
 REDIS_CONFIGS_DB = env.int("REDIS_CONFIGS_DB", 1)  # ToDo: define a convention for DB numbers across services
+# Connection pool shared by all the managers (one pool per database)
+REDIS_MAX_CONNECTIONS = env.int("REDIS_MAX_CONNECTIONS", 50)
+REDIS_POOL_TIMEOUT = env.int("REDIS_POOL_TIMEOUT", 20)  # Seconds to wait for a free connection
+REDIS_HEALTH_CHECK_INTERVAL = env.int("REDIS_HEALTH_CHECK_INTERVAL", 30)  # Seconds, 0 disables health checks
+REDIS_SOCKET_KEEPALIVE = env.bool("REDIS_SOCKET_KEEPALIVE", True)
+REDIS_SOCKET_TIMEOUT = env.float("REDIS_SOCKET_TIMEOUT", None)
+REDIS_SOCKET_CONNECT_TIMEOUT = env.float("REDIS_SOCKET_CONNECT_TIMEOUT", None)
+# In-memory cache of integration details used to dispatch actions (TTL in seconds, 0 disables it).
+# Changes are invalidated only in the instance that makes them, so other instances may use the
+# previous configuration for up to this long.
+INTEGRATION_CACHE_TTL = env.int("INTEGRATION_CACHE_TTL", 60)
+INTEGRATION_CACHE_MAXSIZE = env.int("INTEGRATION_CACHE_MAXSIZE", 256)
+# Serve expired integration details while they are refreshed in the background
+INTEGRATION_CACHE_STALE_WHILE_REVALIDATE = env.bool("INTEGRATION_CACHE_STALE_WHILE_REVALIDATE", False)
+# Webhook configurations are reloaded from the portal after this time (seconds), as they have no change events
+WEBHOOK_CONFIG_CACHE_TTL = env.int("WEBHOOK_CONFIG_CACHE_TTL", 300)
 
 
 REGISTER_ON_START = env.bool("REGISTER_ON_START", False)
@@ -67,10 +109,52 @@ INTEGRATION_TYPE_SLUG = env.str("INTEGRATION_TYPE_SLUG", None)  # Define a strin
 INTEGRATION_SERVICE_URL = env.str("INTEGRATION_SERVICE_URL", None)  # Define a string id here e.g. "my_tracker"
 PROCESS_PUBSUB_MESSAGES_IN_BACKGROUND = env.bool("PROCESS_PUBSUB_MESSAGES_IN_BACKGROUND", False)
 PROCESS_WEBHOOKS_IN_BACKGROUND = env.bool("PROCESS_WEBHOOKS_IN_BACKGROUND", True)
+# Bigger requests are rejected with 413 (bytes, 0 disables the limit)
+WEBHOOK_MAX_BODY_SIZE = env.int("WEBHOOK_MAX_BODY_SIZE", 20 * 1024 * 1024)
+WEBHOOK_PAYLOAD_MODELS_CACHE_MAXSIZE = env.int("WEBHOOK_PAYLOAD_MODELS_CACHE_MAXSIZE", 128)  # Models built from json schemas
+# Pass list bodies to the webhook handler as a WebhookBatch, validated in chunks (in worker threads for big batches)
+WEBHOOK_BATCH_MODE = env.bool("WEBHOOK_BATCH_MODE", False)
+WEBHOOK_BATCH_CHUNK_SIZE = env.int("WEBHOOK_BATCH_CHUNK_SIZE", 500)
+WEBHOOK_BATCH_PARALLEL_THRESHOLD = env.int("WEBHOOK_BATCH_PARALLEL_THRESHOLD", 1000)
+WEBHOOK_JQ_PROGRAMS_CACHE_MAXSIZE = env.int("WEBHOOK_JQ_PROGRAMS_CACHE_MAXSIZE", 128)  # Compiled jq filters
+# Start serving requests before the action and webhook handlers are imported (they load in a background thread)
+FAST_START = env.bool("FAST_START", False)
 MAX_ACTION_EXECUTION_TIME = env.int("MAX_ACTION_EXECUTION_TIME", 60 * 9)  # 10 minutes is the maximum ack timeout
+# Seconds to let running actions finish on shutdown, before cancelling them (PubSub redelivers their messages).
+# Keep it short so that pending events and logs are written within the grace period of the platform.
+ACTION_EXECUTOR_SHUTDOWN_TIMEOUT = env.float("ACTION_EXECUTOR_SHUTDOWN_TIMEOUT", 5.0)
+# Actions triggered through PubSub in this worker. Above the limits, messages are rejected (429) to be redelivered.
+MAX_CONCURRENT_ACTIONS = env.int("MAX_CONCURRENT_ACTIONS", 10)
+MAX_QUEUED_ACTIONS = env.int("MAX_QUEUED_ACTIONS", 20)
+# Run only one execution of an action per integration at a time, across workers (lease in Redis)
+ACTION_LEASES_ENABLED = env.bool("ACTION_LEASES_ENABLED", True)
+ACTION_LEASE_TTL = env.int("ACTION_LEASE_TTL", 60)  # Seconds, renewed while the action runs
 
 # Settings for system events & commands (EDA)
 INTEGRATION_EVENTS_TOPIC = env.str("INTEGRATION_EVENTS_TOPIC", "integration-events")
 default_commands_topic = f"{INTEGRATION_TYPE_SLUG}-actions-topic" if INTEGRATION_TYPE_SLUG else None
 INTEGRATION_COMMANDS_TOPIC = env.str("INTEGRATION_COMMANDS_TOPIC", default_commands_topic)
 TRIGGER_ACTIONS_ALWAYS_SYNC = env.bool("TRIGGER_ACTIONS_ALWAYS_SYNC", False)
+# Publish system events in batches from a background task (started in the app lifespan)
+PUBSUB_BATCH_PUBLISHING = env.bool("PUBSUB_BATCH_PUBLISHING", True)
+PUBSUB_PUBLISHER_MAX_BATCH_SIZE = env.int("PUBSUB_PUBLISHER_MAX_BATCH_SIZE", 100)  # PubSub allows up to 1000
+PUBSUB_PUBLISHER_MAX_LATENCY = env.float("PUBSUB_PUBLISHER_MAX_LATENCY", 0.5)  # Seconds
+PUBSUB_PUBLISHER_MAX_QUEUE_SIZE = env.int("PUBSUB_PUBLISHER_MAX_QUEUE_SIZE", 1000)
+PUBSUB_PUBLISHER_DRAIN_TIMEOUT = env.float("PUBSUB_PUBLISHER_DRAIN_TIMEOUT", 10.0)  # Seconds, on shutdown
+PUBSUB_PUBLISHER_RETRY_ATTEMPTS = env.int("PUBSUB_PUBLISHER_RETRY_ATTEMPTS", 5)
+PUBSUB_PUBLISHER_RETRY_WAIT_INITIAL = env.float("PUBSUB_PUBLISHER_RETRY_WAIT_INITIAL", 4.0)  # Seconds
+PUBSUB_PUBLISHER_RETRY_WAIT_MAX = env.float("PUBSUB_PUBLISHER_RETRY_WAIT_MAX", 60.0)  # Seconds
+# Don't wait for room in the publisher queue when logging activity; events are dropped if it's full
+ACTIVITY_LOGS_FIRE_AND_FORGET = env.bool("ACTIVITY_LOGS_FIRE_AND_FORGET", False)
+# Size of system events: "full" sends the whole configuration (not truncated), "summary" a hash and the fields
+# changed from defaults (or the action and hash of each integration configuration)
+SYSTEM_EVENTS_CONFIG_DATA_MODE = env.str("SYSTEM_EVENTS_CONFIG_DATA_MODE", "full")
+SYSTEM_EVENTS_MAX_STRING_LENGTH = env.int("SYSTEM_EVENTS_MAX_STRING_LENGTH", 10000)  # Longer strings are truncated, 0 disables it
+SYSTEM_EVENTS_MAX_LIST_ITEMS = env.int("SYSTEM_EVENTS_MAX_LIST_ITEMS", 100)  # Longer lists are truncated, 0 disables it
+# Local directory to keep events that couldn't be published, to replay them later. Unset disables it.
+EVENTS_OUTBOX_DIR = env.str("EVENTS_OUTBOX_DIR", None)
+EVENTS_OUTBOX_MAX_BYTES = env.int("EVENTS_OUTBOX_MAX_BYTES", 100 * 1024 * 1024)  # Oldest events are discarded above this
+EVENTS_OUTBOX_SEGMENT_MAX_BYTES = env.int("EVENTS_OUTBOX_SEGMENT_MAX_BYTES", 4 * 1024 * 1024)
+EVENTS_OUTBOX_FSYNC_BATCH_SIZE = env.int("EVENTS_OUTBOX_FSYNC_BATCH_SIZE", 50)  # Events written between fsync calls
+EVENTS_OUTBOX_REPLAY_INTERVAL = env.float("EVENTS_OUTBOX_REPLAY_INTERVAL", 30.0)  # Seconds
+EVENTS_OUTBOX_REPLAY_MAX_RATE = env.float("EVENTS_OUTBOX_REPLAY_MAX_RATE", 500.0)  # Events per second
@@ -1 +1,8 @@
+from .base import env
+
 # Add your integration-specific settings here
+
+# Pull events: when the stored cursor is further behind than this, the window is loaded as a sliced backfill
+INAT_BACKFILL_THRESHOLD_DAYS = env.int("INAT_BACKFILL_THRESHOLD_DAYS", 7)
+INAT_BACKFILL_SLICE_HOURS = env.int("INAT_BACKFILL_SLICE_HOURS", 24)
+INAT_BACKFILL_MAX_CONCURRENCY = env.int("INAT_BACKFILL_MAX_CONCURRENCY", 4)
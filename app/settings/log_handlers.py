@@ -0,0 +1,111 @@
+import copy
+import logging
+import logging.handlers
+import queue
+import threading
+import time
+from typing import Dict, Optional
+
+# Only standard library imports here: this module configures logging while settings are loaded,
+# so it can't depend on the services (which import the settings).
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_listener_handlers = []
+_queue_handler: Optional[logging.handlers.QueueHandler] = None
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    # Keeps tracebacks apart from the message (in exc_text) so that formatters can still place them in their own field
+    _exception_formatter = logging.Formatter()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = self._exception_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Lets through at most rate_limit records per period (seconds) of each logger, so that messages logged
+    in hot loops (i.e. per item or per chunk) don't flood the logs. Limits can be set per logger name in
+    rate_limits, applying to the logger and its children. Warnings and errors are never dropped.
+    The first record let through after dropping some carries the count in its suppressed_messages field.
+    """
+
+    def __init__(self, rate_limit: int = 0, period: float = 1.0, rate_limits: Dict[str, int] = None):
+        super().__init__()
+        self.rate_limit = rate_limit
+        self.period = period
+        self.rate_limits = rate_limits or {}
+        self._windows: Dict[str, list] = {}  # logger name -> [window start, records, suppressed]
+        self._lock = threading.Lock()
+
+    def _get_rate_limit(self, logger_name: str) -> int:
+        name = logger_name
+        while name:
+            if name in self.rate_limits:
+                return self.rate_limits[name]
+            name = name.rpartition(".")[0]
+        return self.rate_limit
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        rate_limit = self._get_rate_limit(record.name)
+        if not rate_limit:
+            return True
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.setdefault(record.name, [now, 0, 0])
+            if now - window[0] >= self.period:
+                window[0], window[1] = now, 0
+            if window[1] >= rate_limit:
+                window[2] += 1
+                return False
+            window[1] += 1
+            if window[2]:
+                record.suppressed_messages = window[2]
+                window[2] = 0
+        return True
+
+
+def start_queue_logging(record_filter: logging.Filter = None) -> logging.handlers.QueueListener:
+    """
+    Moves the handlers of the root logger to a background thread. Loggers only put records in a queue,
+    so that writing logs never blocks the event loop. Call stop_queue_logging() on shutdown to write pending records.
+    """
+    global _listener, _listener_handlers, _queue_handler
+    if _listener is not None:
+        return _listener
+    root_logger = logging.getLogger()
+    _listener_handlers = list(root_logger.handlers)
+    _queue_handler = _QueueHandler(queue.SimpleQueue())
+    if record_filter is not None:
+        _queue_handler.addFilter(record_filter)
+    for handler in _listener_handlers:
+        root_logger.removeHandler(handler)
+    root_logger.addHandler(_queue_handler)
+    _listener = logging.handlers.QueueListener(_queue_handler.queue, *_listener_handlers, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+def stop_queue_logging():
+    """Writes the records still in the queue and gives the handlers back to the root logger."""
+    global _listener, _listener_handlers, _queue_handler
+    if _listener is None:
+        return
+    _listener.stop()  # Processes all the records in the queue before returning
+    root_logger = logging.getLogger()
+    root_logger.removeHandler(_queue_handler)
+    for handler in _listener_handlers:
+        root_logger.addHandler(handler)
+        try:
+            handler.flush()
+        except ValueError:  # The stream was closed already, i.e. when called at exit after pytest's capture ends
+            pass
+    _listener, _listener_handlers, _queue_handler = None, [], None
@@ -0,0 +1,61 @@
+import logging
+
+from app.settings.log_handlers import RateLimitFilter, start_queue_logging, stop_queue_logging
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+def _make_record(name, level=logging.INFO, msg="message"):
+    return logging.LogRecord(name, level, __file__, 1, msg, None, None)
+
+
+def test_rate_limit_filter_drops_records_over_the_limit(mocker):
+    mock_time = mocker.patch("app.settings.log_handlers.time")
+    mock_time.monotonic.return_value = 100.0
+    record_filter = RateLimitFilter(rate_limit=2, period=1.0)
+
+    assert [record_filter.filter(_make_record("app.actions")) for _ in range(4)] == [True, True, False, False]
+    assert record_filter.filter(_make_record("app.actions", level=logging.WARNING))  # Never dropped
+    assert record_filter.filter(_make_record("app.webhooks"))  # Counted per logger
+
+    mock_time.monotonic.return_value = 101.0
+    record = _make_record("app.actions")
+    assert record_filter.filter(record)
+    assert record.suppressed_messages == 2
+
+
+def test_rate_limit_filter_with_limits_per_logger():
+    record_filter = RateLimitFilter(rate_limits={"app.actions": 1})
+
+    assert [record_filter.filter(_make_record("app.actions.handlers")) for _ in range(2)] == [True, False]
+    assert all(record_filter.filter(_make_record("app.webhooks")) for _ in range(5))
+
+
+def test_queue_logging_writes_records_in_background():
+    root_logger = logging.getLogger()
+    stop_queue_logging()  # Started when settings are loaded
+    handler = ListHandler()
+    root_logger.addHandler(handler)
+    try:
+        start_queue_logging()
+        assert handler not in root_logger.handlers
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            logging.getLogger("app.tests").exception("Error %s", "logged in background")
+
+        stop_queue_logging()
+
+        assert handler in root_logger.handlers
+        assert [r.getMessage() for r in handler.records] == ["Error logged in background"]
+        assert "ValueError: boom" in handler.records[0].exc_text
+    finally:
+        stop_queue_logging()
+        root_logger.removeHandler(handler)
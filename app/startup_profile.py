@@ -0,0 +1,77 @@
+import subprocess
+import sys
+from collections import defaultdict
+
+import click
+
+
+def parse_import_times(output: str):
+    """
+    Parses the report of python -X importtime.
+    Returns (module, self time, cumulative time, nesting level) tuples, with times in microseconds.
+    """
+    imports = []
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_time, cumulative_time, name = line[len("import time:"):].split("|")
+        level = (len(name) - len(name.lstrip())) // 2
+        imports.append((name.strip(), int(self_time), int(cumulative_time), level))
+    return imports
+
+
+def get_import_times(module: str, load_handlers: bool = False):
+    code = f"import {module}"
+    if load_handlers:
+        code += "; import app.main; app.main.load_handlers()"
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise click.ClickException(f"Error importing {module}:\n{result.stderr[-2000:]}")
+    return parse_import_times(result.stderr)
+
+
+@click.command()
+@click.option('--module', default="app.main", help='Module to profile, the app by default')
+@click.option('--top', default=20, help='Number of packages and modules to show')
+@click.option(
+    '--with-handlers',
+    is_flag=True,
+    default=False,
+    help='Include loading the action and webhook handlers, as the app does on startup unless FAST_START is set'
+)
+def profile_startup(module, top, with_handlers):
+    """Shows where the startup time goes, as an import time breakdown by package and module."""
+    imports = get_import_times(module=module, load_handlers=with_handlers)
+    total = sum(self_time for _, self_time, _, _ in imports)
+    by_package = defaultdict(int)
+    for name, self_time, _, _ in imports:
+        by_package[name.split(".")[0]] += self_time
+    click.echo(f"Total import time: {total / 1000:.1f} ms ({len(imports)} modules)\n")
+    click.echo("Packages by import time (ms):")
+    for package, package_time in sorted(by_package.items(), key=lambda i: i[1], reverse=True)[:top]:
+        click.echo(f"  {package_time / 1000:10.1f}  {package}")
+    click.echo("\nModules imported directly by the app, by cumulative time (ms):")
+    app_imports = [i for i in imports if i[0].startswith("app.") or i[0] == "app"]
+    direct_imports = [
+        entry for position, entry in enumerate(imports)
+        if entry[3] > 0 and entry not in app_imports and _is_imported_by_app(position, imports)
+    ]
+    for name, _, cumulative_time, _ in sorted(app_imports + direct_imports, key=lambda i: i[2], reverse=True)[:top]:
+        click.echo(f"  {cumulative_time / 1000:10.1f}  {name}")
+
+
+def _is_imported_by_app(position: int, imports) -> bool:
+    # -X importtime lists modules after the ones they import, so the importer is the next entry one level up
+    for name, _, _, level in imports[position + 1:]:
+        if level == imports[position][3] - 1:
+            return name == "app" or name.startswith("app.")
+    return False
+
+
+# Main
+if __name__ == "__main__":
+    profile_startup()
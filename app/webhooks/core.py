@@ -1,10 +1,14 @@
+import asyncio
+import functools
 import importlib
 import inspect
 import json
-from typing import Optional, Union
-from pydantic import BaseModel
+import struct
+from typing import Any, AsyncIterator, List, Optional, Union
+from pydantic import BaseModel, ValidationError
 from fastapi.encoders import jsonable_encoder
-from app.services.utils import StructHexString, UISchemaModelMixin, FieldWithUIOptions, UIOptions
+from app import settings
+from app.services.utils import StructHexString, UISchemaModelMixin, FieldWithUIOptions, UIOptions, get_hex_decoder
 
 
 class WebhookConfiguration(UISchemaModelMixin, BaseModel):
@@ -37,6 +41,17 @@ class JQTransformConfig(UISchemaModelMixin, BaseModel):
         )
     )
 
+    def transform(self, data: Any) -> List[Any]:
+        """Runs the jq_filter on data and returns all the outputs."""
+        return get_jq_program(self.jq_filter).all(_to_jsonable(data))
+
+    def transform_batch(self, items: List[Any]) -> List[Any]:
+        """
+        Runs the jq_filter on every item with a single jq execution (i.e. a chunk of a WebhookBatch).
+        Returns the outputs of all the items, in order, as transform() would for each item.
+        """
+        return get_jq_program(get_batch_jq_filter(self.jq_filter)).first([_to_jsonable(i) for i in items])
+
 
 class GenericJsonTransformConfig(JQTransformConfig, DynamicSchemaConfig):
     output_type: str = FieldWithUIOptions(
@@ -93,19 +108,150 @@ class GenericJsonWithHexStrPayload(HexStringPayload, GenericJsonPayload):
     pass
 
 
+class WebhookBatch:
+    """
+    Items of a webhook request with a list as body, validated lazily in chunks while the handler iterates:
+        async for chunk in payload:
+            ...
+    Items that don't match the model are skipped and reported in errors, instead of failing the whole batch.
+    Batches of parallel_threshold items or more are validated in worker threads, one chunk ahead of the handler.
+    items can also be an async iterator, i.e. items parsed while the request body is received.
+    With a hex_format, the hex strings in the hex_data_field of the items are decoded in bulk, one chunk at a time.
+    """
+
+    def __init__(
+            self,
+            items: Union[list, AsyncIterator],
+            model=None,
+            chunk_size: int = 500,
+            parallel_threshold: int = 1000,
+            hex_format: Optional[dict] = None,
+            hex_data_field: Optional[str] = None,
+    ):
+        self.items = items
+        self.model = model
+        self.hex_format = hex_format
+        self.hex_data_field = hex_data_field
+        self.chunk_size = max(chunk_size, 1)
+        self.parallel_threshold = parallel_threshold
+        self.errors: List[dict] = []  # {"index": <position in the body>, "error": <message>}
+        self._received_count = 0
+
+    def __len__(self):
+        # Streamed batches only know the items received so far
+        return len(self.items) if isinstance(self.items, list) else self._received_count
+
+    async def __aiter__(self):
+        if not isinstance(self.items, list):
+            async for parsed_items in self._iter_stream():
+                yield parsed_items
+            return
+        offsets = range(0, len(self.items), self.chunk_size)
+        in_threads = len(self.items) >= self.parallel_threshold
+        next_chunk = None
+        for i, offset in enumerate(offsets):
+            chunk = next_chunk if next_chunk is not None else self._start_parsing(offset, in_threads)
+            next_chunk = self._start_parsing(offsets[i + 1], in_threads) if i + 1 < len(offsets) else None
+            parsed_items = await chunk
+            if parsed_items:
+                yield parsed_items
+
+    async def collect(self) -> List[Any]:
+        """Returns all the valid items at once."""
+        return [item async for chunk in self for item in chunk]
+
+    async def _iter_stream(self):
+        items = []
+        async for item in self.items:
+            items.append(item)
+            self._received_count += 1
+            if len(items) >= self.chunk_size:
+                parsed_items = self._parse_items(items, offset=self._received_count - len(items))
+                items = []
+                if parsed_items:
+                    yield parsed_items
+        if items and (parsed_items := self._parse_items(items, offset=self._received_count - len(items))):
+            yield parsed_items
+
+    def _start_parsing(self, offset: int, in_thread: bool) -> asyncio.Future:
+        if in_thread:
+            return asyncio.ensure_future(asyncio.to_thread(self._parse_chunk, offset))
+        future = asyncio.get_running_loop().create_future()
+        future.set_result(self._parse_chunk(offset))
+        return future
+
+    def _parse_chunk(self, offset: int) -> list:
+        return self._parse_items(self.items[offset:offset + self.chunk_size], offset=offset)
+
+    def _parse_items(self, items: list, offset: int) -> list:
+        if not self.model:
+            return items
+        if self.hex_format and self.hex_data_field:
+            items = self._decode_hex_data(items)
+        parsed_items = []
+        for index, item in enumerate(items, start=offset):
+            try:
+                parsed_items.append(self.model.parse_obj(item))
+            except (ValidationError, TypeError, ValueError) as e:
+                self.errors.append({"index": index, "error": str(e)})
+        return parsed_items
+
+    def _decode_hex_data(self, items: list) -> list:
+        # Sets the hex format in every item, as for a single payload, and decodes all their hex strings at once
+        items = [
+            {"hex_format": self.hex_format, "hex_data_field": self.hex_data_field, **item}
+            if isinstance(item, dict) else item
+            for item in items
+        ]
+        hex_items = [
+            item for item in items
+            if isinstance(item, dict) and item["hex_format"] is self.hex_format
+            and isinstance(item.get(self.hex_data_field), str)
+        ]
+        decoder = get_hex_decoder(self.hex_format)
+        try:
+            unpacked_data = decoder.decode_many(item[self.hex_data_field] for item in hex_items)
+        except (ValueError, struct.error):
+            return items  # Validated one by one, so that the invalid items are reported
+        for item, data in zip(hex_items, unpacked_data):
+            item[self.hex_data_field] = StructHexString(
+                item[self.hex_data_field], self.hex_format, decoder=decoder, unpacked_data=data
+            )
+        return items
+
+
+def _to_jsonable(data: Any) -> Any:
+    return data.dict() if isinstance(data, BaseModel) else data
+
+
+def get_batch_jq_filter(jq_filter: str) -> str:
+    # Closed on a new line so that a trailing "# comment" in the filter doesn't comment it out
+    return f"[.[] | ({jq_filter}\n)]"
+
+
+@functools.lru_cache(maxsize=settings.WEBHOOK_JQ_PROGRAMS_CACHE_MAXSIZE)
+def get_jq_program(jq_filter: str):
+    """Compiles a jq filter once. Compiled programs are kept by filter text, dropping the least recently used."""
+    import pyjq  # Imported on first use, only integrations that transform data with jq need it
+    return pyjq.compile(jq_filter)
+
+
+@functools.lru_cache(maxsize=None)
 def get_webhook_handler():
+    # Resolved once per process. Errors (i.e. no handler implemented) aren't cached.
 
     # Import the module using importlib
     module = importlib.import_module("app.webhooks.handlers")
     handler = module.webhook_handler
+    parameters = inspect.signature(handler).parameters
 
-    if (annotation := inspect.signature(handler).parameters.get("payload").annotation) != inspect._empty:
+    if (annotation := parameters.get("payload").annotation) != inspect._empty:
         payload_model = annotation
     else:
         payload_model = None
 
     # Introspect schemas
-    if (annotation := inspect.signature(handler).parameters.get("webhook_config").annotation) != inspect._empty:
+    if (annotation := parameters.get("webhook_config").annotation) != inspect._empty:
         config_model = annotation
     else:
         config_model = None